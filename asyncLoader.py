@@ -0,0 +1,526 @@
+import asyncio
+import inspect
+import random
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import httpx
+from dataLoader import extractRecords
+from jsonCodec import loads
+
+
+# Default pagination settings, overridden by pagination dict passed to loader
+PAGINATION_DEFAULTS = {
+    "cursor": {"cursor_param": "cursor", "cursor_field": "next_cursor", "start_cursor": None},
+    "offset": {"offset_param": "offset", "limit_param": "limit", "page_size": 100, "start": 0},
+    "link": {},
+}
+
+# Statuses retried with backoff, the throttle ones also cut concurrency
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+THROTTLE_STATUSES = frozenset([429, 503])
+# Longest Retry-After honoured, so a misbehaving server cannot stall a run indefinitely
+MAX_RETRY_AFTER = 60.0
+# Latency rise in seconds always treated as noise, fast responses jitter by more than their doubling
+LATENCY_NOISE = 0.005
+# Weight of each new sample in the latency baseline average
+BASELINE_SMOOTHING = 0.05
+
+_END = object()
+
+
+def _lookupField(data, path):
+    '''
+    Look up dotted field path in decoded response dict. Returns value or None if any part is missing.
+    '''
+    for part in path.split('.'):
+        if not isinstance(data, dict):
+            return None
+        data = data.get(part)
+
+    return data
+
+
+class AsyncAPILoader:
+    '''
+    Asyncio API loader with pooled keep-alive client and pagination support. Use as async context manager so connections are reused across pages and closed afterwards.
+    '''
+
+    def __init__(self, max_concurrency=8, timeout=10, headers=None):
+        if max_concurrency < 1:
+            raise ValueError(f"max_concurrency must be positive, got {max_concurrency}")
+
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.headers = headers or {}
+        self._client = None
+        self._semaphore = None
+        # Most recent non-empty pagination cursor, for resuming later runs
+        self.last_cursor = None
+
+    async def __aenter__(self):
+        limits = httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency)
+        self._client = httpx.AsyncClient(timeout=self.timeout, headers=self.headers, limits=limits)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self._client.aclose()
+        self._client = None
+
+    async def fetchPage(self, url, params=None):
+        '''
+        Fetch single page through pooled client, bounded by loader concurrency limit. Returns tuple of decoded payload and response. Raises httpx.HTTPError on failure.
+        '''
+        if self._client is None:
+            raise RuntimeError("AsyncAPILoader must be used as an async context manager")
+
+        async with self._semaphore:
+            response = await self._client.get(url, params=params)
+
+        response.raise_for_status()
+
+        return loads(response.content), response
+
+    def _windowSize(self):
+        '''
+        Offset pages requested ahead of the one being consumed. Returns int.
+        '''
+        return self.max_concurrency
+
+    async def iterPages(self, endpoint, params=None, pagination=None):
+        '''
+        Follow pagination from endpoint. Takes endpoint URL, optional query parameters, and optional pagination dict with type cursor, offset or link. Returns async generator of record lists in page order.
+        '''
+        params = dict(params or {})
+
+        if not pagination:
+            data, _ = await self.fetchPage(endpoint, params)
+            yield extractRecords(data)
+            return
+
+        page_type = pagination.get("type")
+
+        if page_type not in PAGINATION_DEFAULTS:
+            raise ValueError(f"Unsupported pagination type: {page_type}")
+
+        options = {**PAGINATION_DEFAULTS[page_type], **pagination}
+        max_pages = options.get("max_pages")
+
+        if page_type == "offset":
+            pages = self._iterOffsetPages(endpoint, params, options)
+        else:
+            pages = self._iterChainedPages(endpoint, params, options)
+
+        page_count = 0
+
+        async for records in pages:
+            yield records
+            page_count += 1
+
+            if max_pages is not None and page_count >= max_pages:
+                await pages.aclose()
+                return
+
+    async def iterRecords(self, endpoint, params=None, pagination=None):
+        '''
+        Follow pagination from endpoint and stream individual records. Returns async generator of records.
+        '''
+        async for records in self.iterPages(endpoint, params, pagination):
+            for record in records:
+                yield record
+
+    async def _iterOffsetPages(self, endpoint, params, options):
+        '''
+        Fetch offset-paginated pages with sliding window of concurrent requests. Stops at first page shorter than page size. Returns async generator of record lists in offset order.
+        '''
+        page_size = options["page_size"]
+        next_offset = options["start"]
+        window = deque()
+        exhausted = False
+
+        def schedule():
+            nonlocal next_offset
+            page_params = {**params, options["offset_param"]: next_offset, options["limit_param"]: page_size}
+            window.append(asyncio.ensure_future(self.fetchPage(endpoint, page_params)))
+            next_offset += page_size
+
+        try:
+            while True:
+                while not exhausted and len(window) < self._windowSize():
+                    schedule()
+
+                if not window:
+                    return
+
+                data, _ = await window.popleft()
+                records = extractRecords(data)
+
+                if len(records) < page_size:
+                    # Pages past the end are no longer needed
+                    exhausted = True
+                    for task in window:
+                        task.cancel()
+                    window.clear()
+
+                if records:
+                    yield records
+        finally:
+            for task in window:
+                task.cancel()
+
+    async def _iterChainedPages(self, endpoint, params, options):
+        '''
+        Fetch cursor or link-header paginated pages, requesting next page before yielding current one so fetching overlaps with consumption. Returns async generator of record lists.
+        '''
+        if options["type"] == "cursor" and options["start_cursor"]:
+            params = {**params, options["cursor_param"]: options["start_cursor"]}
+
+        pending = asyncio.ensure_future(self.fetchPage(endpoint, params))
+
+        try:
+            while pending is not None:
+                data, response = await pending
+                pending = None
+
+                if options["type"] == "cursor":
+                    cursor = _lookupField(data, options["cursor_field"])
+                    if cursor:
+                        self.last_cursor = cursor
+                        pending = asyncio.ensure_future(self.fetchPage(endpoint, {**params, options["cursor_param"]: cursor}))
+                else:
+                    next_url = response.links.get("next", {}).get("url")
+                    if next_url:
+                        # Next link already carries its own query string
+                        pending = asyncio.ensure_future(self.fetchPage(next_url))
+
+                records = extractRecords(data)
+
+                if records:
+                    yield records
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+
+def parseRetryAfter(value):
+    '''
+    Parse Retry-After header given as seconds or HTTP date, capped at MAX_RETRY_AFTER. Returns seconds to wait, or None when header is missing or invalid.
+    '''
+    if not value:
+        return None
+
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+        except (TypeError, ValueError):
+            return None
+
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+
+def backoffDelay(attempt, base_delay, max_delay, rng=random):
+    '''
+    Full-jitter exponential backoff for retry attempt starting at 1, so clients retrying together spread out. Returns seconds to wait.
+    '''
+    return rng.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1)))
+
+
+class AIMDLimiter:
+    '''
+    Adaptive limit on in-flight requests. Each success grows the limit by about one per round trip (additive increase). Throttling responses, or latency rising past latency_tolerance times its moving average plus LATENCY_NOISE, multiply it by backoff (multiplicative decrease), at most once per round trip. Retry-After pauses every new request until it has passed.
+    '''
+
+    def __init__(self, initial=4, min_limit=1, max_limit=64, backoff=0.5, latency_tolerance=2.0):
+        if not 1 <= min_limit <= initial <= max_limit:
+            raise ValueError("AIMDLimiter needs 1 <= min_limit <= initial <= max_limit")
+        if not 0 < backoff < 1:
+            raise ValueError("backoff must be between 0 and 1")
+
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.in_flight = 0
+        self.peak_limit = self.limit
+        self.decreases = 0
+        self.throttled = 0
+        # Slow moving average of latency
+        self.baseline = None
+        self._last_latency = 0.0
+        self._last_decrease = float('-inf')
+        self._resume_at = 0.0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self):
+        '''
+        Wait for a request slot, and for any Retry-After pause to pass
+        '''
+        async with self._condition:
+            while True:
+                pause = self._resume_at - time.monotonic()
+
+                if pause > 0:
+                    try:
+                        await asyncio.wait_for(self._condition.wait(), pause)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                if self.in_flight < max(self.min_limit, int(self.limit)):
+                    self.in_flight += 1
+                    return
+
+                await self._condition.wait()
+
+    async def release(self):
+        '''
+        Free request slot and wake waiters, which may also see a raised limit
+        '''
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def _decrease(self):
+        now = time.monotonic()
+
+        # Responses to requests sent before the last cut carry no news, so cut once per round trip
+        if now - self._last_decrease < self._last_latency:
+            return
+
+        self.limit = max(self.min_limit, self.limit * self.backoff)
+        self._last_decrease = now
+        self.decreases += 1
+
+    def onSuccess(self, latency):
+        '''
+        Record successful request latency in seconds, growing the limit unless latency shows the server queueing
+        '''
+        congested = self.baseline is not None and latency > self.baseline * self.latency_tolerance + LATENCY_NOISE
+        # Sustained slowdowns raise the baseline over time, throttling responses still cut the limit then
+        self.baseline = latency if self.baseline is None else self.baseline + (latency - self.baseline) * BASELINE_SMOOTHING
+
+        if congested:
+            self._decrease()
+        else:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self.peak_limit = max(self.peak_limit, self.limit)
+
+        self._last_latency = latency
+
+    def onThrottle(self, retry_after=None, latency=None):
+        '''
+        Record throttling response, cutting the limit and pausing new requests for retry_after seconds when given
+        '''
+        self.throttled += 1
+        self._decrease()
+
+        if latency is not None:
+            self._last_latency = latency
+
+        if retry_after:
+            self._resume_at = max(self._resume_at, time.monotonic() + retry_after)
+
+    def stats(self):
+        '''
+        Snapshot of limiter state. Returns dict.
+        '''
+        return {
+            "limit": int(self.limit),
+            "peak_limit": int(self.peak_limit),
+            "decreases": self.decreases,
+            "throttled": self.throttled,
+            "in_flight": self.in_flight,
+        }
+
+
+class AdaptiveAPILoader(AsyncAPILoader):
+    '''
+    AsyncAPILoader whose concurrency adapts to the server through AIMDLimiter, starting at initial_concurrency and never above max_concurrency. Throttled, failed and timed out requests are retried with full-jitter backoff, honouring Retry-After. Once retries run out the error is raised, never swallowed.
+    '''
+
+    def __init__(self, max_concurrency=32, timeout=10, headers=None, initial_concurrency=4, max_attempts=5, base_delay=0.1, max_delay=10.0, latency_tolerance=2.0, seed=None):
+        super().__init__(max_concurrency, timeout, headers)
+
+        if max_attempts < 1:
+            raise ValueError(f"max_attempts must be positive, got {max_attempts}")
+
+        self.initial_concurrency = min(initial_concurrency, max_concurrency)
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.latency_tolerance = latency_tolerance
+        self.retries = 0
+        self.limiter = None
+        self._rng = random.Random(seed)
+
+    async def __aenter__(self):
+        await super().__aenter__()
+        self.limiter = AIMDLimiter(self.initial_concurrency, 1, self.max_concurrency, latency_tolerance=self.latency_tolerance)
+        return self
+
+    def _windowSize(self):
+        # Requests past the current limit would only queue on the limiter
+        return max(1, int(self.limiter.limit))
+
+    async def fetchPage(self, url, params=None):
+        '''
+        Fetch single page within adaptive concurrency limit, retrying throttled, failed and timed out requests. Returns tuple of decoded payload and response. Raises httpx.HTTPError once max_attempts are used up, or at once for other error statuses.
+        '''
+        if self._client is None:
+            raise RuntimeError("AdaptiveAPILoader must be used as an async context manager")
+
+        limiter = self.limiter
+
+        for attempt in range(1, self.max_attempts + 1):
+            await limiter.acquire()
+            start = time.monotonic()
+
+            try:
+                response = await self._client.get(url, params=params)
+            except httpx.TransportError:
+                if attempt == self.max_attempts:
+                    raise
+                # Timeouts and refused connections mean the server is struggling
+                limiter.onThrottle(latency=time.monotonic() - start)
+            else:
+                if response.status_code < 400:
+                    limiter.onSuccess(time.monotonic() - start)
+                    return loads(response.content), response
+
+                if response.status_code not in RETRY_STATUSES or attempt == self.max_attempts:
+                    response.raise_for_status()
+
+                retry_after = parseRetryAfter(response.headers.get("Retry-After"))
+
+                if response.status_code in THROTTLE_STATUSES:
+                    limiter.onThrottle(retry_after, time.monotonic() - start)
+            finally:
+                await limiter.release()
+
+            self.retries += 1
+            # Retry-After is already enforced by the limiter for every request
+            await asyncio.sleep(backoffDelay(attempt, self.base_delay, self.max_delay, self._rng))
+
+    def stats(self):
+        '''
+        Snapshot of concurrency and retry counters. Returns dict.
+        '''
+        return {**(self.limiter.stats() if self.limiter else {}), "retries": self.retries}
+
+
+async def loadFromAPIAsync(endpoint, params=None, pagination=None, max_concurrency=8, timeout=10):
+    '''
+    Fetch all pages from paginated API endpoint with pooled connections. Returns list of records.
+    '''
+    records = []
+
+    async with AsyncAPILoader(max_concurrency=max_concurrency, timeout=timeout) as loader:
+        async for page in loader.iterPages(endpoint, params, pagination):
+            records.extend(page)
+
+    # Returns records from all pages in page order
+    return records
+
+
+def loadPaginatedAPI(endpoint, params=None, pagination=None, max_concurrency=8, timeout=10):
+    '''
+    Synchronous wrapper around loadFromAPIAsync for callers outside an event loop. Returns list of records.
+    '''
+    return asyncio.run(loadFromAPIAsync(endpoint, params, pagination, max_concurrency, timeout))
+
+
+def iterPaginatedAPI(endpoint, params=None, pagination=None, max_concurrency=8, timeout=10, progress=None, adaptive=None):
+    '''
+    Synchronous generator over pages from paginated API endpoint, driving its own event loop so it can run in a worker thread. Optional progress dict receives last_cursor as pages arrive. With adaptive set, True or dict of AdaptiveAPILoader options, concurrency adapts to the server and failed requests are retried. Pages are only fetched as fast as the caller consumes them. Returns generator of record lists.
+    '''
+    loop = asyncio.new_event_loop()
+
+    async def openPages():
+        if adaptive:
+            loader = AdaptiveAPILoader(max_concurrency=max_concurrency, timeout=timeout, **(adaptive if isinstance(adaptive, dict) else {}))
+        else:
+            loader = AsyncAPILoader(max_concurrency=max_concurrency, timeout=timeout)
+        await loader.__aenter__()
+        return loader, loader.iterPages(endpoint, params, pagination)
+
+    loader, pages = loop.run_until_complete(openPages())
+
+    try:
+        while True:
+            try:
+                page = loop.run_until_complete(pages.__anext__())
+            except StopAsyncIteration:
+                return
+
+            if progress is not None and loader.last_cursor:
+                progress["last_cursor"] = loader.last_cursor
+
+            yield page
+    finally:
+        loop.run_until_complete(pages.aclose())
+        loop.run_until_complete(loader.__aexit__(None, None, None))
+        loop.close()
+
+
+async def ingestAsync(endpoint, consume, params=None, pagination=None, queue_size=4, consumers=1, **loader_options):
+    '''
+    Fetch pages with AdaptiveAPILoader and hand them to consumers through a bounded queue. consume takes a record list and may be a coroutine function. Plain functions, such as clean and write to database, run in worker threads. A full queue stops fetching, so a slow consumer throttles the producer instead of growing memory. With several consumers, pages may be consumed out of order. Any fetch or consume error stops the run and is raised. Returns dict of page, record, queue and loader counters.
+    '''
+    if queue_size < 1 or consumers < 1:
+        raise ValueError("queue_size and consumers must be positive")
+
+    pages = asyncio.Queue(maxsize=queue_size)
+    is_coroutine = inspect.iscoroutinefunction(consume)
+    stats = {"pages": 0, "records": 0, "max_queued": 0}
+
+    async def produce(loader):
+        async for page in loader.iterPages(endpoint, params, pagination):
+            await pages.put(page)
+            stats["max_queued"] = max(stats["max_queued"], pages.qsize())
+
+        for _ in range(consumers):
+            await pages.put(_END)
+
+    async def consumeLoop():
+        while True:
+            page = await pages.get()
+
+            if page is _END:
+                return
+
+            if is_coroutine:
+                await consume(page)
+            else:
+                await asyncio.to_thread(consume, page)
+
+            stats["pages"] += 1
+            stats["records"] += len(page)
+
+    async with AdaptiveAPILoader(**loader_options) as loader:
+        tasks = [asyncio.ensure_future(produce(loader))] + [asyncio.ensure_future(consumeLoop()) for _ in range(consumers)]
+
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+
+            for task in done:
+                # Raises first failure, remaining tasks are cancelled below
+                task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        # Returns counters of finished run
+        return {**stats, **loader.stats()}
+
+
+def ingest(endpoint, consume, params=None, pagination=None, queue_size=4, consumers=1, **loader_options):
+    '''
+    Synchronous wrapper around ingestAsync for callers outside an event loop. Returns dict of run counters.
+    '''
+    return asyncio.run(ingestAsync(endpoint, consume, params, pagination, queue_size, consumers, **loader_options))
@@ -0,0 +1,72 @@
+import time
+from benchmarks.syntheticData import generateRecords
+from jsonCodec import availableBackends, getCodec
+
+# Run from repository root: python -m benchmarks.benchJson [rows] [backend,...]
+
+DEFAULT_ROWS = 100000
+# Best of this many timed runs per operation, damping scheduler noise
+REPEATS = 3
+
+
+def _bestSeconds(func):
+    best = None
+
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best
+
+
+def benchBackend(name, records, array_bytes, lines):
+    '''
+    Time one backend decoding a JSON array document and JSON Lines, and encoding records one by one as NDJSON does. Returns dict of operation to megabytes per second.
+    '''
+    codec = getCodec(name)
+    line_bytes = sum(len(line) + 1 for line in lines)
+
+    def encodeLines():
+        for record in records:
+            codec.dumps(record, default=str)
+
+    return {
+        "decode_array": len(array_bytes) / _bestSeconds(lambda: codec.loads(array_bytes)) / 1e6,
+        "decode_lines": line_bytes / _bestSeconds(lambda: [codec.loads(line) for line in lines]) / 1e6,
+        "encode_lines": line_bytes / _bestSeconds(encodeLines) / 1e6,
+    }
+
+
+def benchBackends(row_count=DEFAULT_ROWS, backends=None):
+    '''
+    Benchmark installed backends, or the given names, on the same synthetic records. Returns dict of backend name to results from benchBackend.
+    '''
+    records = list(generateRecords(row_count))
+    reference = getCodec("json")
+    array_bytes = reference.dumps(records)
+    lines = [reference.dumps(record) for record in records]
+
+    return {name: benchBackend(name, records, array_bytes, lines) for name in backends or availableBackends()}
+
+
+def main(row_count=DEFAULT_ROWS, backends=None):
+    results = benchBackends(row_count, backends)
+    baseline = results.get("json")
+
+    print(f"{row_count} records, MB/s (speedup over json)")
+    print(f"{'backend':10} {'decode array':>20} {'decode lines':>20} {'encode lines':>20}")
+
+    for name, rates in results.items():
+        cells = []
+        for operation in ("decode_array", "decode_lines", "encode_lines"):
+            speedup = f" ({rates[operation] / baseline[operation]:.1f}x)" if baseline else ""
+            cells.append(f"{rates[operation]:.1f}{speedup}".rjust(20))
+        print(f"{name:10} {' '.join(cells)}")
+
+
+if __name__ == "__main__":
+    import sys
+
+    main(*(int(arg) for arg in sys.argv[1:2]), *(arg.split(',') for arg in sys.argv[2:3]))
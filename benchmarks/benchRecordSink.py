@@ -0,0 +1,75 @@
+import time
+from sqlalchemy import create_engine, Column, BigInteger, String, Float, Boolean
+from sqlalchemy.orm import declarative_base, sessionmaker
+from recordSink import RecordSink
+
+# Run from repository root: python -m benchmarks.benchRecordSink [database_url] [rows]
+
+COLUMN_TYPES = {"id": "integer", "name": "string", "score": "float", "active": "boolean"}
+OrmBase = declarative_base()
+
+
+class BenchRecord(OrmBase):
+    __tablename__ = "bench_orm_records"
+
+    id = Column(BigInteger, primary_key=True)
+    name = Column(String)
+    score = Column(Float)
+    active = Column(Boolean)
+
+
+def makeRecords(row_count):
+    '''
+    Generate synthetic cleaned records. Returns list of record dicts.
+    '''
+    return [{"id": i, "name": f"name{i}", "score": i * 0.25, "active": i % 2 == 0} for i in range(row_count)]
+
+
+def benchOrmAddAll(engine, records):
+    '''
+    Insert records through ORM add_all. Returns rows per second.
+    '''
+    OrmBase.metadata.drop_all(bind=engine)
+    OrmBase.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+
+    start = time.perf_counter()
+    session.add_all([BenchRecord(**record) for record in records])
+    session.commit()
+    elapsed = time.perf_counter() - start
+
+    session.close()
+    return len(records) / elapsed
+
+
+def benchRecordSink(engine, records):
+    '''
+    Insert records through RecordSink bulk path. Returns rows per second.
+    '''
+    sink = RecordSink(engine, "bench_sink_records", COLUMN_TYPES, key_fields=["id"])
+    sink.table.drop(bind=engine, checkfirst=True)
+    sink.createTable()
+
+    start = time.perf_counter()
+    sink.write(records)
+    elapsed = time.perf_counter() - start
+
+    return len(records) / elapsed
+
+
+def main(database_url="sqlite:///:memory:", row_count=100000):
+    engine = create_engine(database_url)
+    records = makeRecords(row_count)
+
+    orm_rate = benchOrmAddAll(engine, records)
+    sink_rate = benchRecordSink(engine, records)
+
+    print(f"{engine.dialect.name}, {row_count} rows")
+    print(f"ORM add_all:  {orm_rate:12,.0f} rows/sec")
+    print(f"RecordSink:   {sink_rate:12,.0f} rows/sec ({sink_rate / orm_rate:.1f}x)")
+
+
+if __name__ == "__main__":
+    import sys
+
+    main(*(sys.argv[1:2] or ["sqlite:///:memory:"]), *(int(arg) for arg in sys.argv[2:3]))
@@ -0,0 +1,207 @@
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from benchmarks.syntheticData import buildSchema, generateRecords, parseColumnMix, writeDataset
+from dataCleaner import cleanData, removeDuplicates
+from dataLoader import loadFromFile
+from featureEngine import normalizeNumeric, categorizeField, createRatioFeature
+
+# Run from repository root: python -m benchmarks.benchStages --sizes 10k,1m [--baseline benchmarks/baseline.json]
+
+SIZES = {"10k": 10000, "100k": 100000, "1m": 1000000, "10m": 10000000}
+DEFAULT_SIZES = "10k,1m"
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(__file__), "latest.json")
+DEFAULT_TOLERANCE = 0.3
+# Slowdowns smaller than this are timer noise, not regressions
+MIN_SECONDS_DELTA = 0.02
+# Peak growth smaller than this is allocator noise on stages that barely allocate, not regressions
+MIN_PEAK_BYTES_DELTA = 8192
+LOAD_FORMATS = ("csv", "json", "jsonl")
+CATEGORY_BINS = [100, 250, 500, 750]
+
+
+def measure(func, profile_memory=True, setup=None):
+    '''
+    Time func, then rerun it under tracemalloc for peak allocation when profile_memory is set. Optional setup builds a fresh argument for the memory run outside the traced section. Returns tuple of first run result and metrics dict.
+    '''
+    gc.collect()
+    # Stages print skip and duplicate counts, keep benchmark output readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = func()
+        seconds = time.perf_counter() - start
+
+        metrics = {"seconds": round(seconds, 4)}
+
+        if profile_memory:
+            args = (setup(),) if setup else ()
+            gc.collect()
+            tracemalloc.start()
+            func(*args)
+            metrics["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            del args
+
+    return result, metrics
+
+
+def benchSize(row_count, schema, work_dir, null_rate, duplicate_rate, seed, profile_memory=True):
+    '''
+    Benchmark each stage on one dataset size. Clean runs on CSV-loaded string records and every later stage on the output of the one before. Returns dict of stage name to metrics.
+    '''
+    results = {}
+    loaded = None
+
+    for file_format in LOAD_FORMATS:
+        path = os.path.join(work_dir, f"data_{row_count}.{file_format}")
+        writeDataset(path, generateRecords(row_count, schema, null_rate, duplicate_rate, seed), schema)
+
+        records, results[f"load_{file_format}"] = measure(lambda: loadFromFile(path), profile_memory)
+        if file_format == "csv":
+            loaded = records
+        else:
+            del records
+        os.unlink(path)
+
+    # Feature stages add fields in place, so memory reruns get fresh copies of their input
+    stages = [
+        ("clean", lambda records: cleanData(records, schema, ["id"]), False),
+        ("dedupe", lambda records: removeDuplicates(records, ["id"]), False),
+        ("normalize", lambda records: normalizeNumeric(records, "amount"), True),
+        ("categorize", lambda records: categorizeField(records, "amount", CATEGORY_BINS), True),
+        ("ratio", lambda records: createRatioFeature(records, "amount", "quantity", "unit_price"), True),
+    ]
+
+    records = loaded
+
+    for name, stage, mutates in stages:
+        stage_input = records
+        setup = (lambda: [dict(record) for record in stage_input]) if mutates else None
+        records, results[name] = measure(lambda records=stage_input: stage(records), profile_memory, setup)
+
+    for metrics in results.values():
+        metrics["rows"] = row_count
+        metrics["rows_per_sec"] = round(row_count / metrics["seconds"]) if metrics["seconds"] else None
+
+    return results
+
+
+def runSuite(sizes, extra_columns=None, null_rate=0.05, duplicate_rate=0.05, seed=42, profile_memory=True):
+    '''
+    Benchmark all stages at each named size. Returns results dict with run metadata.
+    '''
+    schema = buildSchema(extra_columns)
+    results = {}
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        for size in sizes:
+            results[size] = benchSize(SIZES[size], schema, work_dir, null_rate, duplicate_rate, seed, profile_memory)
+
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "schema": schema,
+            "null_rate": null_rate,
+            "duplicate_rate": duplicate_rate,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def compareResults(current, baseline, tolerance=DEFAULT_TOLERANCE):
+    '''
+    Compare stage metrics against baseline. A stage regresses when seconds or peak_bytes exceed baseline by more than tolerance fraction and by more than MIN_SECONDS_DELTA or MIN_PEAK_BYTES_DELTA. Returns list of regression description strings.
+    '''
+    regressions = []
+
+    for size, stages in current["results"].items():
+        for stage, metrics in stages.items():
+            expected = baseline.get("results", {}).get(size, {}).get(stage)
+
+            if not expected:
+                continue
+
+            for metric in ("seconds", "peak_bytes"):
+                if metric not in metrics or metric not in expected:
+                    continue
+
+                min_delta = MIN_SECONDS_DELTA if metric == "seconds" else MIN_PEAK_BYTES_DELTA
+                limit = max(expected[metric] * (1 + tolerance), expected[metric] + min_delta)
+
+                if metrics[metric] > limit:
+                    change = metrics[metric] / expected[metric] - 1 if expected[metric] else float("inf")
+                    regressions.append(f"{size} {stage} {metric}: {metrics[metric]} vs baseline {expected[metric]} (+{change:.0%})")
+
+    return regressions
+
+
+def printResults(results):
+    print(f"{'size':>6} {'stage':<12} {'seconds':>9} {'rows/sec':>12} {'peak MB':>9}")
+
+    for size, stages in results["results"].items():
+        for stage, metrics in stages.items():
+            peak = metrics.get("peak_bytes")
+            peak_text = f"{peak / 1e6:9.1f}" if peak is not None else f"{'-':>9}"
+            print(f"{size:>6} {stage:<12} {metrics['seconds']:9.3f} {metrics['rows_per_sec'] or 0:12,} {peak_text}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark loading, cleaning and feature stages on synthetic data")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help=f"Comma separated sizes from {', '.join(SIZES)}")
+    parser.add_argument("--columns", default=None, help="Extra column mix, e.g. string:3,float:2,boolean:1")
+    parser.add_argument("--null-rate", type=float, default=0.05)
+    parser.add_argument("--duplicate-rate", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-memory", action="store_true", help="Skip tracemalloc pass, halving run time")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--update-baseline", action="store_true", help="Store this run as the new baseline")
+    args = parser.parse_args(argv)
+
+    sizes = [size.strip().lower() for size in args.sizes.split(',') if size.strip()]
+    unknown = [size for size in sizes if size not in SIZES]
+    if unknown:
+        parser.error(f"Unknown sizes: {', '.join(unknown)}")
+
+    extra_columns = parseColumnMix(args.columns) if args.columns else None
+    results = runSuite(sizes, extra_columns, args.null_rate, args.duplicate_rate, args.seed, not args.no_memory)
+    printResults(results)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, skipping regression check")
+        return 0
+
+    with open(args.baseline) as f:
+        regressions = compareResults(results, json.load(f), args.tolerance)
+
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+import csv
+import json
+import random
+from collections import deque
+
+# Columns always generated, used by the feature stages under benchmark
+BASE_COLUMNS = {"id": "integer", "amount": "float", "quantity": "integer"}
+DEFAULT_EXTRA_COLUMNS = {"string": 2, "float": 1, "boolean": 1}
+# Earlier records kept around to draw duplicates from
+DUPLICATE_POOL_SIZE = 1024
+WORDS = ["alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel"]
+
+
+def parseColumnMix(spec):
+    '''
+    Parse column mix like "string:3,float:2" into counts per type. Returns dict of type to count.
+    '''
+    mix = {}
+
+    for part in filter(None, (item.strip() for item in spec.split(','))):
+        field_type, _, count = part.partition(':')
+        mix[field_type] = int(count or 1)
+
+    return mix
+
+
+def buildSchema(extra_columns=None):
+    '''
+    Schema of base columns plus extra columns named by type and position. Returns dict of field name to cleanRecord type.
+    '''
+    schema = dict(BASE_COLUMNS)
+
+    for field_type, count in (DEFAULT_EXTRA_COLUMNS if extra_columns is None else extra_columns).items():
+        for i in range(count):
+            schema[f"{field_type}_{i}"] = field_type
+
+    return schema
+
+
+def _randomValue(rng, field, field_type):
+    if field == "quantity":
+        # Includes zero so ratio features hit the division by zero path
+        return rng.randint(0, 20)
+    if field_type == "integer":
+        return rng.randint(0, 1000000)
+    if field_type == "float":
+        return round(rng.uniform(0, 1000), 2)
+    if field_type == "boolean":
+        return rng.random() < 0.5
+    return f"{rng.choice(WORDS)}-{rng.randint(0, 9999)}"
+
+
+def generateRecords(row_count, schema=None, null_rate=0.05, duplicate_rate=0.05, seed=42):
+    '''
+    Generate deterministic synthetic records. Non-id fields are None at null_rate and whole records repeat an earlier one at duplicate_rate. Returns generator of row_count record dicts.
+    '''
+    schema = schema or buildSchema()
+    rng = random.Random(seed)
+    pool = deque(maxlen=DUPLICATE_POOL_SIZE)
+    next_id = 0
+
+    for _ in range(row_count):
+        if pool and rng.random() < duplicate_rate:
+            yield dict(rng.choice(pool))
+            continue
+
+        record = {}
+        for field, field_type in schema.items():
+            if field == "id":
+                record[field] = next_id
+            elif rng.random() < null_rate:
+                record[field] = None
+            else:
+                record[field] = _randomValue(rng, field, field_type)
+
+        next_id += 1
+        pool.append(record)
+        yield record
+
+
+def _csvValue(value):
+    if value is None:
+        return ""
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    return value
+
+
+def writeDataset(path, records, schema):
+    '''
+    Stream records to CSV, JSON array or JSON Lines file chosen by extension. Returns number of records written.
+    '''
+    count = 0
+
+    with open(path, 'w', newline='') as f:
+        if path.endswith('.csv'):
+            writer = csv.writer(f)
+            writer.writerow(list(schema))
+            for record in records:
+                writer.writerow([_csvValue(record.get(field)) for field in schema])
+                count += 1
+        elif path.endswith('.json'):
+            f.write("[")
+            for record in records:
+                f.write(",\n" if count else "\n")
+                f.write(json.dumps(record))
+                count += 1
+            f.write("\n]\n")
+        elif path.endswith('.jsonl') or path.endswith('.ndjson'):
+            for record in records:
+                f.write(json.dumps(record))
+                f.write("\n")
+                count += 1
+        else:
+            raise ValueError(f"Unsupported dataset format: {path}")
+
+    return count
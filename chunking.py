@@ -0,0 +1,33 @@
+from itertools import islice
+
+
+# Default number of records per streamed batch
+DEFAULT_CHUNK_SIZE = 10000
+
+
+def isChunkStream(records):
+    '''
+    Check if records is a stream of record batches rather than a list or single record. Returns True for iterators and generators yielding chunks.
+    '''
+    if records is None or isinstance(records, (list, tuple, dict, str, bytes)):
+        return False
+
+    return hasattr(records, '__iter__')
+
+
+def chunkRecords(records, chunk_size=DEFAULT_CHUNK_SIZE):
+    '''
+    Split iterable of records into lists of at most chunk_size records. Returns generator of record lists.
+    '''
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+
+    iterator = iter(records)
+
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+
+        if not chunk:
+            return
+
+        yield chunk
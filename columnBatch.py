@@ -0,0 +1,189 @@
+# NumPy is optional and imported on first use, so record-based stages start without it
+np = None
+
+
+def _requireNumpy():
+    '''
+    Import NumPy on first use. Returns numpy module. Raises ImportError if NumPy is not installed.
+    '''
+    global np
+
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError("NumPy is required for column batches: pip install numpy")
+        np = numpy
+
+    return np
+
+
+class ColumnBatch:
+    '''
+    Column-oriented batch of records. Each column is a NumPy array paired with boolean null mask where True marks missing value.
+    '''
+
+    def __init__(self, columns, masks, length):
+        _requireNumpy()
+        self.columns = columns
+        self.masks = masks
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+    def setColumn(self, name, values, mask):
+        '''
+        Add or replace column with its null mask
+        '''
+        self.columns[name] = values
+        self.masks[name] = mask
+
+    def numericColumn(self, name, strict=False):
+        '''
+        Get column as float64 array. Values that cannot be converted are masked unless strict, in which case ValueError is raised. Returns tuple of values array and null mask.
+        '''
+        if name not in self.columns:
+            return np.zeros(self.length), np.ones(self.length, dtype=bool)
+
+        values = self.columns[name]
+        mask = self.masks[name]
+
+        if values.dtype.kind in 'fiub':
+            return values.astype(np.float64, copy=False), mask
+
+        filled = np.where(mask, 0.0, values)
+
+        try:
+            return filled.astype(np.float64), mask
+        except (ValueError, TypeError):
+            pass
+
+        converted = np.zeros(self.length)
+        mask = mask.copy()
+
+        for i in np.flatnonzero(~mask):
+            try:
+                converted[i] = float(values[i])
+            except (ValueError, TypeError):
+                if strict:
+                    raise
+                mask[i] = True
+
+        return converted, mask
+
+
+def recordsToColumns(records, fields=None):
+    '''
+    Convert list of record dicts to column batch. Takes records and optional list of fields, defaulting to all keys seen. Uniform bool, int and float columns become typed arrays, others object arrays. Returns ColumnBatch.
+    '''
+    _requireNumpy()
+
+    if fields is None:
+        fields = list(dict.fromkeys(key for record in records for key in record))
+
+    length = len(records)
+    columns = {}
+    masks = {}
+
+    for field in fields:
+        raw = [record.get(field) for record in records]
+        mask = np.fromiter((value is None for value in raw), dtype=bool, count=length)
+
+        present = [value for value in raw if value is not None]
+
+        if present and all(type(value) is bool for value in present):
+            values = np.array([bool(value) for value in raw], dtype=bool)
+        elif present and all(type(value) is int for value in present):
+            try:
+                values = np.array([value or 0 for value in raw], dtype=np.int64)
+            except OverflowError:
+                values = np.array(raw, dtype=object)
+        elif present and all(type(value) is float for value in present):
+            values = np.array([0.0 if value is None else value for value in raw], dtype=np.float64)
+        else:
+            # Strings and mixed columns stay as objects so they round-trip unchanged
+            values = np.array(raw, dtype=object)
+
+        columns[field] = values
+        masks[field] = mask
+
+    # Returns batch holding one array and null mask per field
+    return ColumnBatch(columns, masks, length)
+
+
+def columnsToRecords(batch):
+    '''
+    Convert column batch back to list of record dicts with None for masked values. Returns list of records.
+    '''
+    names = list(batch.columns)
+    column_lists = []
+
+    for name in names:
+        values = batch.columns[name].tolist()
+        for i in np.flatnonzero(batch.masks[name]).tolist():
+            values[i] = None
+        column_lists.append(values)
+
+    # Returns one dict per row in original order
+    return [dict(zip(names, row)) for row in zip(*column_lists)]
+
+
+def normalizeNumericColumns(batch, field):
+    '''
+    Vectorized min-max scaling of batch column, matching normalizeNumeric semantics. Returns batch with field_normalized column added.
+    '''
+    values, mask = batch.numericColumn(field, strict=True)
+    valid = values[~mask]
+
+    if valid.size == 0:
+        return batch
+
+    min_val = valid.min()
+    max_val = valid.max()
+    range_val = max_val - min_val
+
+    if range_val == 0:
+        batch.setColumn(f"{field}_normalized", np.full(batch.length, 0.5), np.zeros(batch.length, dtype=bool))
+        return batch
+
+    normalized = np.round((values - min_val) / range_val, 4)
+    batch.setColumn(f"{field}_normalized", normalized, mask.copy())
+
+    # Returns batch with new normalized column added
+    return batch
+
+
+def categorizeFieldColumns(batch, field, bins):
+    '''
+    Vectorized binning of batch column using binary search over sorted thresholds, matching categorizeField semantics. Returns batch with field_category column added.
+    '''
+    values, mask = batch.numericColumn(field)
+    thresholds = np.sort(np.asarray(bins, dtype=np.float64))
+
+    categories = np.searchsorted(thresholds, values, side='right').astype(np.int64)
+    # NaN compares false against every threshold
+    categories[np.isnan(values)] = 0
+
+    batch.setColumn(f"{field}_category", categories, mask.copy())
+
+    # Returns batch with new category column added
+    return batch
+
+
+def createRatioFeatureColumns(batch, numerator_field, denominator_field, feature_name):
+    '''
+    Vectorized ratio of two batch columns, matching createRatioFeature semantics where nulls and zero denominators produce None. Returns batch with ratio column added.
+    '''
+    numerators, numerator_mask = batch.numericColumn(numerator_field)
+    denominators, denominator_mask = batch.numericColumn(denominator_field)
+
+    mask = numerator_mask | denominator_mask | (denominators == 0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratios = np.round(numerators / np.where(mask, 1.0, denominators), 4)
+
+    batch.setColumn(feature_name, ratios, mask)
+
+    # Returns batch with new ratio column added
+    return batch
@@ -0,0 +1,499 @@
+import bz2
+import json
+import lzma
+import os
+import struct
+import sys
+import uuid
+import zlib
+from array import array
+from itertools import accumulate
+from chunking import DEFAULT_CHUNK_SIZE, chunkRecords, isChunkStream
+from columnBatch import ColumnBatch, _requireNumpy
+
+# Parquet output is optional and pyarrow is imported on first use, built-in column format needs only the standard library
+pa = None
+pq = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MAGIC = b"DPCOL001"
+# Footer length followed by magic at end of file
+TRAILER = struct.Struct("<Q8s")
+DEFAULT_COMPRESSION = "zlib"
+
+# Fixed-width array typecode for each cleanRecord schema type, other types stored as strings
+TYPECODES = {
+    'integer': 'q',
+    'float': 'd',
+    'boolean': 'B',
+}
+
+CODECS = {
+    'none': (lambda data: data, lambda data: data),
+    'zlib': (lambda data: zlib.compress(data, 1), zlib.decompress),
+    'bz2': (bz2.compress, bz2.decompress),
+    'lzma': (lzma.compress, lzma.decompress),
+}
+
+if zstandard is not None:
+    CODECS['zstd'] = (lambda data: zstandard.ZstdCompressor().compress(data), lambda data: zstandard.ZstdDecompressor().decompress(data))
+
+# Parquet name for built-in codec names that differ
+PARQUET_CODECS = {'zlib': 'gzip'}
+
+
+def _resolveCompression(column_types, compression):
+    '''
+    Expand compression setting to codec per column. Takes codec name or dict of column to codec, with "default" key for unlisted columns. Returns dict of column name to codec name.
+    '''
+    if isinstance(compression, dict):
+        default = compression.get("default", DEFAULT_COMPRESSION)
+        codecs = {column: compression.get(column, default) for column in column_types}
+    else:
+        codecs = {column: compression or DEFAULT_COMPRESSION for column in column_types}
+
+    return codecs
+
+
+def _encodeColumn(name, field_type, values):
+    '''
+    Encode column values as null mask bytes and typed value bytes. Returns tuple of mask bytes (empty when no nulls) and data bytes.
+    '''
+    nulls = [value is None for value in values]
+    mask = bytes(nulls) if any(nulls) else b""
+    typecode = TYPECODES.get(field_type)
+
+    try:
+        if typecode == 'q':
+            data = array('q', [0 if value is None else int(value) for value in values])
+        elif typecode == 'd':
+            data = array('d', [0.0 if value is None else float(value) for value in values])
+        elif typecode == 'B':
+            data = array('B', [1 if value else 0 for value in values])
+        else:
+            encoded = [b"" if value is None else str(value).encode() for value in values]
+            offsets = array('q', accumulate((len(item) for item in encoded), initial=0))
+            return mask, offsets.tobytes() + b"".join(encoded)
+    except (TypeError, ValueError, OverflowError) as e:
+        raise ValueError(f"Column {name} cannot be stored as {field_type}: {e}")
+
+    return mask, data.tobytes()
+
+
+def _decodeColumn(field_type, data, rows, swap):
+    '''
+    Decode typed value bytes for one row group. Returns list of values without nulls applied.
+    '''
+    typecode = TYPECODES.get(field_type)
+
+    if typecode == 'B':
+        return [byte == 1 for byte in data]
+
+    if typecode is None:
+        offsets = array('q')
+        offsets.frombytes(data[:8 * (rows + 1)])
+        if swap:
+            offsets.byteswap()
+        body = data[8 * (rows + 1):]
+        return [body[start:end].decode() for start, end in zip(offsets, offsets[1:])]
+
+    values = array(typecode)
+    values.frombytes(data)
+    if swap:
+        values.byteswap()
+    return values.tolist()
+
+
+class ColumnarWriter:
+    '''
+    Writes record batches to built-in columnar file. Each batch becomes a row group holding one compressed typed array per column, with a JSON footer of column types and byte offsets so readers can fetch only the columns they need. File is written under a temporary name, created on first write, and appears only when closed.
+    '''
+
+    def __init__(self, path, column_types, compression=DEFAULT_COMPRESSION):
+        self.path = path
+        self.column_types = dict(column_types)
+        self.codecs = _resolveCompression(self.column_types, compression)
+
+        unknown = set(self.codecs.values()) - set(CODECS)
+        if unknown:
+            raise ValueError(f"Unsupported compression: {', '.join(sorted(unknown))}")
+
+        self.row_groups = []
+        self.rows_written = 0
+        # Unique per writer, so concurrent writers to one path in the same process never share a temporary file
+        self._temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        self._file = None
+        self._finished = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _open(self):
+        '''
+        Create temporary file on first use, so writers that are never written to or closed leave no file behind. Returns file object.
+        '''
+        if self._file is None:
+            if self._finished:
+                raise ValueError(f"Columnar writer for {self.path} is closed")
+
+            self._file = open(self._temp_path, 'wb')
+            self._file.write(MAGIC)
+
+        return self._file
+
+    def writeBatch(self, records):
+        '''
+        Write records as one row group. Returns number of rows written.
+        '''
+        if not records:
+            return 0
+
+        f = self._open()
+        columns = {}
+
+        for name, field_type in self.column_types.items():
+            mask, data = _encodeColumn(name, field_type, [record.get(name) for record in records])
+            codec = self.codecs[name]
+            payload = CODECS[codec][0](mask + data)
+            columns[name] = {"offset": f.tell(), "length": len(payload), "mask": len(mask), "codec": codec}
+            f.write(payload)
+
+        self.row_groups.append({"rows": len(records), "columns": columns})
+        self.rows_written += len(records)
+
+        return len(records)
+
+    def write(self, records, chunk_size=DEFAULT_CHUNK_SIZE):
+        '''
+        Write list, iterable or chunk stream of records in row groups of up to chunk_size. Returns number of rows written.
+        '''
+        if not isChunkStream(records):
+            records = chunkRecords(records, chunk_size)
+
+        return sum(self.writeBatch(chunk) for chunk in records)
+
+    def close(self):
+        '''
+        Write footer and move finished file into place
+        '''
+        if self._finished:
+            return
+
+        f = self._open()
+        footer = json.dumps({"column_types": self.column_types, "byteorder": sys.byteorder, "row_groups": self.row_groups}).encode()
+        f.write(footer)
+        f.write(TRAILER.pack(len(footer), MAGIC))
+        f.close()
+        self._file = None
+        self._finished = True
+        os.replace(self._temp_path, self.path)
+
+    def abort(self):
+        '''
+        Discard partially written file
+        '''
+        self._finished = True
+
+        if self._file is None:
+            return
+
+        self._file.close()
+        self._file = None
+        os.unlink(self._temp_path)
+
+
+class ColumnarReader:
+    '''
+    Reads built-in columnar files, decoding only projected columns
+    '''
+
+    def __init__(self, path):
+        self.path = path
+
+        with open(path, 'rb') as f:
+            f.seek(-TRAILER.size, os.SEEK_END)
+            footer_length, magic = TRAILER.unpack(f.read(TRAILER.size))
+
+            if magic != MAGIC:
+                raise ValueError(f"Not a columnar file: {path}")
+
+            f.seek(-TRAILER.size - footer_length, os.SEEK_END)
+            footer = json.loads(f.read(footer_length))
+
+        self.column_types = footer["column_types"]
+        self.row_groups = footer["row_groups"]
+        self.num_rows = sum(group["rows"] for group in self.row_groups)
+        self._byteorder = footer["byteorder"]
+        self._swap = self._byteorder != sys.byteorder
+
+    def _projection(self, columns):
+        if columns is None:
+            return list(self.column_types)
+
+        missing = [column for column in columns if column not in self.column_types]
+        if missing:
+            raise KeyError(f"Columns not in file: {', '.join(missing)}")
+
+        return list(columns)
+
+    def _readRaw(self, f, group, name):
+        '''
+        Read and decompress one column chunk. Returns tuple of mask bytes and data bytes.
+        '''
+        meta = group["columns"][name]
+        f.seek(meta["offset"])
+        payload = CODECS[meta["codec"]][1](f.read(meta["length"]))
+        return payload[:meta["mask"]], payload[meta["mask"]:]
+
+    def _iterGroupColumns(self, columns):
+        '''
+        Decode projected columns one row group at a time. Returns generator of dicts of column name to value list.
+        '''
+        names = self._projection(columns)
+
+        with open(self.path, 'rb') as f:
+            for group in self.row_groups:
+                decoded = {}
+
+                for name in names:
+                    mask, data = self._readRaw(f, group, name)
+                    values = _decodeColumn(self.column_types[name], data, group["rows"], self._swap)
+                    if mask:
+                        values = [None if null else value for value, null in zip(values, mask)]
+                    decoded[name] = values
+
+                yield decoded
+
+    def iterChunks(self, columns=None):
+        '''
+        Stream row groups as record batches holding projected columns. Returns generator of record lists.
+        '''
+        for decoded in self._iterGroupColumns(columns):
+            names = list(decoded)
+            yield [dict(zip(names, row)) for row in zip(*decoded.values())]
+
+    def readRecords(self, columns=None):
+        '''
+        Read all rows with projected columns. Returns list of records.
+        '''
+        return [record for chunk in self.iterChunks(columns) for record in chunk]
+
+    def readColumns(self, columns=None):
+        '''
+        Read projected columns across all row groups. Returns dict of column name to value list.
+        '''
+        names = self._projection(columns)
+        result = {name: [] for name in names}
+
+        for decoded in self._iterGroupColumns(names):
+            for name in names:
+                result[name].extend(decoded[name])
+
+        return result
+
+    def readColumnBatch(self, columns=None):
+        '''
+        Read projected columns straight into NumPy arrays without building records. Returns ColumnBatch.
+        '''
+        np = _requireNumpy()
+        names = self._projection(columns)
+        order = '<' if self._byteorder == 'little' else '>'
+        dtypes = {'q': np.dtype(order + 'i8'), 'd': np.dtype(order + 'f8'), 'B': np.dtype(bool)}
+        parts = {name: ([], []) for name in names}
+
+        with open(self.path, 'rb') as f:
+            for group in self.row_groups:
+                rows = group["rows"]
+
+                for name in names:
+                    mask, data = self._readRaw(f, group, name)
+                    field_type = self.column_types[name]
+                    typecode = TYPECODES.get(field_type)
+
+                    if typecode is None:
+                        values = np.array(_decodeColumn(field_type, data, rows, self._swap), dtype=object)
+                    else:
+                        values = np.frombuffer(data, dtype=dtypes[typecode])
+
+                    null_mask = np.frombuffer(mask, dtype=bool) if mask else np.zeros(rows, dtype=bool)
+                    parts[name][0].append(values)
+                    parts[name][1].append(null_mask)
+
+        empty = {'q': np.int64, 'd': np.float64, 'B': bool}
+        value_columns = {}
+        masks = {}
+
+        for name, (values, null_masks) in parts.items():
+            dtype = empty.get(TYPECODES.get(self.column_types[name]), object)
+            value_columns[name] = np.concatenate(values).astype(dtype, copy=False) if values else np.array([], dtype=dtype)
+            masks[name] = np.concatenate(null_masks) if null_masks else np.array([], dtype=bool)
+
+        return ColumnBatch(value_columns, masks, self.num_rows)
+
+
+def _requirePyarrow():
+    '''
+    Import pyarrow on first use. Raises ImportError if pyarrow is not installed.
+    '''
+    global pa, pq
+
+    if pa is None:
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("pyarrow is required for Parquet files: pip install pyarrow")
+        pa, pq = pyarrow, pyarrow.parquet
+
+
+def _arrowType(field_type):
+    return {'integer': pa.int64(), 'float': pa.float64(), 'boolean': pa.bool_()}.get(field_type, pa.string())
+
+
+class ParquetColumnarWriter:
+    '''
+    Parquet equivalent of ColumnarWriter, used for .parquet paths when pyarrow is installed
+    '''
+
+    def __init__(self, path, column_types, compression=DEFAULT_COMPRESSION):
+        _requirePyarrow()
+        self.path = path
+        self.column_types = dict(column_types)
+        self.rows_written = 0
+        self.schema = pa.schema([(name, _arrowType(field_type)) for name, field_type in self.column_types.items()])
+        self.codecs = {name: PARQUET_CODECS.get(codec, codec) for name, codec in _resolveCompression(self.column_types, compression).items()}
+        self._temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        self._writer = None
+        self._finished = False
+
+    def _open(self):
+        if self._writer is None:
+            if self._finished:
+                raise ValueError(f"Columnar writer for {self.path} is closed")
+
+            self._writer = pq.ParquetWriter(self._temp_path, self.schema, compression=self.codecs)
+
+        return self._writer
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def writeBatch(self, records):
+        if not records:
+            return 0
+
+        columns = {name: [record.get(name) for record in records] for name in self.column_types}
+        self._open().write_table(pa.Table.from_pydict(columns, schema=self.schema))
+        self.rows_written += len(records)
+
+        return len(records)
+
+    def write(self, records, chunk_size=DEFAULT_CHUNK_SIZE):
+        if not isChunkStream(records):
+            records = chunkRecords(records, chunk_size)
+
+        return sum(self.writeBatch(chunk) for chunk in records)
+
+    def close(self):
+        if self._finished:
+            return
+
+        self._open().close()
+        self._writer = None
+        self._finished = True
+        os.replace(self._temp_path, self.path)
+
+    def abort(self):
+        self._finished = True
+
+        if self._writer is None:
+            return
+
+        self._writer.close()
+        self._writer = None
+        os.unlink(self._temp_path)
+
+
+class ParquetColumnarReader:
+    '''
+    Parquet equivalent of ColumnarReader
+    '''
+
+    def __init__(self, path):
+        _requirePyarrow()
+        self.path = path
+        self._file = pq.ParquetFile(path)
+        self.column_types = {field.name: self._schemaType(field.type) for field in self._file.schema_arrow}
+        self.num_rows = self._file.metadata.num_rows
+
+    @staticmethod
+    def _schemaType(arrow_type):
+        if pa.types.is_integer(arrow_type):
+            return 'integer'
+        if pa.types.is_floating(arrow_type):
+            return 'float'
+        if pa.types.is_boolean(arrow_type):
+            return 'boolean'
+        return 'string'
+
+    def iterChunks(self, columns=None):
+        for group in range(self._file.num_row_groups):
+            yield self._file.read_row_group(group, columns=columns).to_pylist()
+
+    def readRecords(self, columns=None):
+        return self._file.read(columns=columns).to_pylist()
+
+    def readColumns(self, columns=None):
+        return self._file.read(columns=columns).to_pydict()
+
+    def readColumnBatch(self, columns=None):
+        table = self._file.read(columns=columns)
+        fill_values = {'integer': 0, 'float': 0.0, 'boolean': False}
+        value_columns = {}
+        masks = {}
+
+        for name in table.column_names:
+            column = table.column(name)
+            fill_value = fill_values.get(self.column_types[name])
+            masks[name] = column.is_null().to_numpy(zero_copy_only=False)
+            if fill_value is not None:
+                column = column.fill_null(fill_value)
+            value_columns[name] = column.to_numpy(zero_copy_only=False)
+
+        return ColumnBatch(value_columns, masks, table.num_rows)
+
+
+def openColumnarWriter(path, column_types, compression=DEFAULT_COMPRESSION):
+    '''
+    Open writer for path, Parquet for .parquet paths and built-in format otherwise. Takes path, dict of column name to cleanRecord type, and codec name or dict of column to codec. Returns writer.
+    '''
+    if path.endswith('.parquet'):
+        return ParquetColumnarWriter(path, column_types, compression)
+
+    return ColumnarWriter(path, column_types, compression)
+
+
+def openColumnarReader(path):
+    '''
+    Open reader for columnar file written by openColumnarWriter. Returns reader.
+    '''
+    if path.endswith('.parquet'):
+        return ParquetColumnarReader(path)
+
+    return ColumnarReader(path)
@@ -0,0 +1,188 @@
+import keyword
+from collections.abc import MutableMapping
+from functools import lru_cache
+from operator import attrgetter
+
+
+class CompactRow(MutableMapping):
+    '''
+    Base of generated row types. Field values live in __slots__ named after the fields, so rows carry no per-row dict or key strings. Rows behave as mutable mappings, so code written against record dicts works unchanged. Slots never assigned read as missing keys. Keys outside the row type go to an overflow dict created on first use.
+    '''
+
+    __slots__ = ('_extra',)
+
+    # Set on generated subclasses
+    _fields = ()
+    _slot_of = {}
+    _init_count = 0
+
+    def get(self, field, default=None):
+        slot = self._slot_of.get(field)
+
+        if slot is None:
+            extra = self._extra
+            return default if extra is None else extra.get(field, default)
+
+        return getattr(self, slot, default)
+
+    def __getitem__(self, field):
+        slot = self._slot_of.get(field)
+
+        try:
+            if slot is None:
+                return self._extra[field]
+            return getattr(self, slot)
+        except (AttributeError, TypeError):
+            raise KeyError(field) from None
+
+    def __setitem__(self, field, value):
+        slot = self._slot_of.get(field)
+
+        if slot is not None:
+            setattr(self, slot, value)
+        elif self._extra is None:
+            self._extra = {field: value}
+        else:
+            self._extra[field] = value
+
+    def __delitem__(self, field):
+        slot = self._slot_of.get(field)
+
+        try:
+            if slot is None:
+                del self._extra[field]
+            else:
+                delattr(self, slot)
+        except (AttributeError, TypeError):
+            raise KeyError(field) from None
+
+    def __contains__(self, field):
+        slot = self._slot_of.get(field)
+
+        if slot is None:
+            return self._extra is not None and field in self._extra
+
+        return hasattr(self, slot)
+
+    def __iter__(self):
+        for field, slot in self._slot_of.items():
+            if hasattr(self, slot):
+                yield field
+
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(self)!r})"
+
+    def __reduce__(self):
+        # Generated classes cannot be pickled by name, so rows rebuild their type from its fields
+        return _restoreRow, (self._fields, self._init_count, dict(self))
+
+    def toDict(self):
+        '''
+        Build plain dict of set fields, for serialization boundaries. Returns dict.
+        '''
+        return dict(self)
+
+
+def _slotName(field, index):
+    '''
+    Attribute name for field, the field itself when it is a public identifier not shadowing a row method. Returns string.
+    '''
+    if field.isidentifier() and not keyword.iskeyword(field) and not field.startswith('_') and not hasattr(CompactRow, field):
+        return field
+
+    return f"_f{index}"
+
+
+@lru_cache(maxsize=128)
+def rowType(fields, init_count=None):
+    '''
+    Generate slotted row class for tuple of field names. The constructor takes values for the first init_count fields, all by default, positionally. Remaining fields stay unset until assigned. Classes are cached by fields, so equal field lists share one type. Returns CompactRow subclass.
+    '''
+    fields = tuple(fields)
+    init_count = len(fields) if init_count is None else init_count
+    slots = tuple(_slotName(field, index) for index, field in enumerate(fields))
+
+    if len(set(fields)) != len(fields):
+        raise ValueError("Row type fields must be unique")
+
+    params = ", ".join(f"_v{index}" for index in range(init_count))
+    body = "".join(f"    self.{slot} = _v{index}\n" for index, slot in enumerate(slots[:init_count]))
+    namespace = {}
+    # Generated like namedtuple so construction costs one call with no per-field loop
+    exec(f"def __init__(self, {params}):\n{body}    self._extra = None\n", namespace)
+
+    return type("Row", (CompactRow,), {
+        "__module__": __name__,
+        "__slots__": slots,
+        "__init__": namespace["__init__"],
+        "_fields": fields,
+        "_slot_of": dict(zip(fields, slots)),
+        "_init_count": init_count,
+    })
+
+
+def _restoreRow(fields, init_count, values):
+    row_type = rowType(fields, init_count)
+    row = row_type.__new__(row_type)
+    row._extra = None
+    row.update(values)
+    return row
+
+
+def featureOutputFields(feature_specs):
+    '''
+    Field names added by feature spec dicts as accepted by applyFeatures. Returns list of field names in spec order.
+    '''
+    outputs = []
+
+    for spec in feature_specs or ():
+        feature_type = spec.get("type")
+
+        if feature_type == "normalize":
+            outputs.append(f"{spec['field']}_normalized")
+        elif feature_type == "categorize":
+            outputs.append(f"{spec['field']}_category")
+        elif feature_type == "ratio":
+            outputs.append(spec["name"])
+
+    return outputs
+
+
+def rowTypeForSchema(schema, feature_specs=None):
+    '''
+    Generate row type for records cleaned with schema dict. Schema fields come first, in schema order, and are set by the constructor. Fields added by feature_specs get reserved slots. Returns CompactRow subclass.
+    '''
+    fields = tuple(schema)
+    outputs = tuple(field for field in dict.fromkeys(featureOutputFields(feature_specs)) if field not in schema)
+
+    return rowType(fields + outputs, len(fields))
+
+
+def keyGetter(record, key_fields):
+    '''
+    Build function extracting key tuple of key_fields from records shaped like record. Compact rows whose key fields are always set are read straight from their slots. Returns callable taking record and returning tuple.
+    '''
+    key_fields = tuple(key_fields)
+    row_type = type(record)
+
+    if isinstance(record, CompactRow) and all(field in row_type._fields[:row_type._init_count] for field in key_fields):
+        getter = attrgetter(*(row_type._slot_of[field] for field in key_fields))
+
+        if len(key_fields) == 1:
+            return lambda row: (getter(row),)
+        return getter
+
+    return lambda r: tuple(r.get(field) for field in key_fields)
+
+
+def toDicts(records):
+    '''
+    Convert compact rows to plain dicts at API and serialization boundaries, leaving dicts unchanged. Returns list of dicts.
+    '''
+    return [record.toDict() if isinstance(record, CompactRow) else record for record in records]
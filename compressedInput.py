@@ -0,0 +1,213 @@
+import bz2
+import io
+import lzma
+import os
+import queue
+import threading
+import zlib
+
+# Bytes per raw file read and buffered read handed to parsers
+READ_SIZE = 1 << 20
+# Decompressed blocks buffered ahead of the parser before the decompression thread blocks
+PREFETCH_BLOCKS = 4
+
+COMPRESSION_EXTENSIONS = {
+    ".gz": "gzip",
+    ".gzip": "gzip",
+    ".bz2": "bz2",
+    ".zst": "zstd",
+    ".zstd": "zstd",
+    ".xz": "xz",
+}
+# Leading bytes identifying compressed files without a compression extension. Only bz2 starts with printable text,
+# so its signature includes the block size digit and the magic of the first block, or of the end of an empty stream
+MAGIC_BYTES = (
+    (b"\x1f\x8b\x08", "gzip"),
+    *((b"BZh%d" % level + block_magic, "bz2") for level in range(1, 10) for block_magic in (b"1AY&SY", b"\x17rE8P\x90")),
+    (b"\x28\xb5\x2f\xfd", "zstd"),
+    (b"\xfd7zXZ\x00", "xz"),
+)
+
+_END = object()
+
+
+def detectCompression(file_path):
+    '''
+    Identify compression from file extension, falling back to magic bytes. Returns codec name, or None for uncompressed or unreadable files.
+    '''
+    codec = COMPRESSION_EXTENSIONS.get(os.path.splitext(file_path)[1].lower())
+
+    if codec is not None:
+        return codec
+
+    try:
+        with open(file_path, 'rb') as f:
+            head = f.read(10)
+    except OSError:
+        return None
+
+    for magic, codec in MAGIC_BYTES:
+        if head.startswith(magic):
+            return codec
+
+    return None
+
+
+def formatPath(file_path):
+    '''
+    Strip compression extension so the remaining extension names the record format, e.g. orders.csv.gz to orders.csv. Returns path string.
+    '''
+    root, extension = os.path.splitext(file_path)
+    return root if extension.lower() in COMPRESSION_EXTENSIONS else file_path
+
+
+def _newDecompressor(codec):
+    '''
+    Streaming decompressor for one gzip member, bz2 or xz stream, or zstd frame. Returns object with decompress, eof and unused_data.
+    '''
+    if codec == "gzip":
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if codec == "bz2":
+        return bz2.BZ2Decompressor()
+    if codec == "xz":
+        return lzma.LZMADecompressor()
+    if codec == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("zstandard is required for .zst files: pip install zstandard")
+        return zstandard.ZstdDecompressor().decompressobj()
+
+    raise ValueError(f"Unsupported compression: {codec}")
+
+
+def iterDecompressed(raw, codec, read_size=READ_SIZE):
+    '''
+    Decompress binary stream in large reads, continuing across concatenated gzip members, bz2 and xz streams and zstd frames. Returns generator of decompressed byte blocks. Raises EOFError if the data is truncated.
+    '''
+    decompressor = _newDecompressor(codec)
+    started = False
+
+    while True:
+        data = raw.read(read_size)
+
+        if not data:
+            break
+
+        while data:
+            started = True
+            output = decompressor.decompress(data)
+
+            if output:
+                yield output
+
+            if not decompressor.eof:
+                break
+
+            # Bytes past the end marker start the next member
+            data = decompressor.unused_data
+            decompressor = _newDecompressor(codec)
+            started = False
+
+    if started:
+        raise EOFError(f"Compressed {codec} data ended before end-of-stream marker")
+
+
+class DecompressingReader(io.RawIOBase):
+    '''
+    Read-only binary stream of decompressed file contents. With threaded set, a background thread reads and decompresses ahead into a bounded queue, so decompression overlaps with parsing. The codecs release the GIL while working.
+    '''
+
+    def __init__(self, file_path, codec, read_size=READ_SIZE, threaded=True, prefetch=PREFETCH_BLOCKS):
+        super().__init__()
+        self._raw = open(file_path, 'rb', buffering=0)
+        self._blocks = iterDecompressed(self._raw, codec, read_size)
+        self._pending = memoryview(b"")
+        self._queue = None
+
+        if threaded:
+            self._queue = queue.Queue(maxsize=prefetch)
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._produce, name=f"decompress-{os.path.basename(file_path)}", daemon=True)
+            self._thread.start()
+
+    def _put(self, item):
+        '''
+        Queue item, giving up if reader was closed. Returns True if item was queued.
+        '''
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self):
+        try:
+            for block in self._blocks:
+                if not self._put(block):
+                    return
+            self._put(_END)
+        except Exception as e:
+            # Re-raised in the reading thread
+            self._put(e)
+
+    def _nextBlock(self):
+        '''
+        Next decompressed block. Returns bytes, or None at end of data.
+        '''
+        if self._queue is None:
+            return next(self._blocks, None)
+
+        item = self._queue.get()
+
+        if item is _END or isinstance(item, Exception):
+            # Left in place so later reads see the same end or error
+            self._queue.put(item)
+            if item is _END:
+                return None
+            raise item
+
+        return item
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._pending:
+            block = self._nextBlock()
+            if block is None:
+                return 0
+            self._pending = memoryview(block)
+
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+
+        return size
+
+    def close(self):
+        if not self.closed:
+            if self._queue is not None:
+                self._stop.set()
+                self._thread.join()
+            self._raw.close()
+        super().close()
+
+
+def openInput(file_path, compression="auto", read_size=READ_SIZE, threaded=None, binary=False):
+    '''
+    Open file for text reading with large buffered reads, decompressing transparently. Compression is detected from extension or magic bytes unless given as codec name or None. Decompression runs on its own thread when threaded is set, by default when more than one CPU is available. With binary set, bytes are returned undecoded. Returns text or binary file object.
+    '''
+    if threaded is None:
+        threaded = (os.cpu_count() or 1) > 1
+
+    if compression == "auto":
+        compression = detectCompression(file_path)
+
+    if compression is None:
+        return open(file_path, 'rb' if binary else 'r', buffering=read_size)
+
+    raw = io.BufferedReader(DecompressingReader(file_path, compression, read_size, threaded), buffer_size=read_size)
+    return raw if binary else io.TextIOWrapper(raw)
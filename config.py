@@ -1,13 +1,25 @@
 import os
 from dotenv import load_dotenv
 import json
-import yaml
 
 load_dotenv()
 
 # Database connection string for PostgreSQL
 DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://localhost/data_pipeline")
 
+# Connection pool tuning for database engine
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))  # Seconds before connection is replaced
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "True").lower() == "true"
+
+# Create missing tables at API startup, disable when running migrate.py as a deploy step
+DB_AUTO_CREATE = os.getenv("DB_AUTO_CREATE", "True").lower() == "true"
+
+# Async driver URL, derived from DATABASE_URL when unset
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+
 # API configuration
 API_HOST = os.getenv("API_HOST", "0.0.0.0")
 API_PORT = int(os.getenv("API_PORT", 8000))
@@ -17,6 +29,9 @@ DEBUG = os.getenv("DEBUG", "False").lower() == "true"
 ENVIRONMENT = os.getenv("ENVIRONMENT", "development")  # development, testing, production
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 
+# File holding PIPELINES definitions used by pipeline run endpoints
+PIPELINE_CONFIG_PATH = os.getenv("PIPELINE_CONFIG_PATH", "config.yaml")
+
 
 def loadConfigFile(file_path):
     '''
@@ -29,6 +44,7 @@ def loadConfigFile(file_path):
     
     try:
         if file_ext == ".yaml" or file_ext == ".yml":
+            import yaml
             with open(file_path, 'r') as f:
                 config = yaml.safe_load(f) or {}
         elif file_ext == ".json":
@@ -56,7 +72,14 @@ def mergeConfigs(file_config):
         "API_PORT": os.getenv("API_PORT"),
         "DEBUG": os.getenv("DEBUG"),
         "ENVIRONMENT": os.getenv("ENVIRONMENT"),
-        "LOG_LEVEL": os.getenv("LOG_LEVEL")
+        "LOG_LEVEL": os.getenv("LOG_LEVEL"),
+        "DB_POOL_SIZE": os.getenv("DB_POOL_SIZE"),
+        "DB_MAX_OVERFLOW": os.getenv("DB_MAX_OVERFLOW"),
+        "DB_POOL_TIMEOUT": os.getenv("DB_POOL_TIMEOUT"),
+        "DB_POOL_RECYCLE": os.getenv("DB_POOL_RECYCLE"),
+        "DB_POOL_PRE_PING": os.getenv("DB_POOL_PRE_PING"),
+        "ASYNC_DATABASE_URL": os.getenv("ASYNC_DATABASE_URL"),
+        "DB_AUTO_CREATE": os.getenv("DB_AUTO_CREATE")
     }
     
     for key, value in env_vars.items():
@@ -0,0 +1,86 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import pytest
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    # Default backlog of 5 drops concurrent connects into a 1s SYN retry
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class StubServer:
+    '''
+    Local HTTP server for loader tests. Routes every GET to handler(path, query, headers) returning (status, headers, body). Records requests and the peak number handled concurrently.
+    '''
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.requests = []
+        # Requests being handled now and the most seen at once
+        self.active = 0
+        self.peak_active = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class RequestHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+                stub.requests.append((parsed.path, query, dict(self.headers)))
+
+                with stub._lock:
+                    stub.active += 1
+                    stub.peak_active = max(stub.peak_active, stub.active)
+
+                try:
+                    status, headers, body = stub.handler(parsed.path, query, self.headers)
+                finally:
+                    with stub._lock:
+                        stub.active -= 1
+
+                if not isinstance(body, (bytes, str)):
+                    body = json.dumps(body)
+                if isinstance(body, str):
+                    body = body.encode()
+
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = _StubHTTPServer(("127.0.0.1", 0), RequestHandler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stubServer():
+    '''
+    Start stub HTTP servers for a test and shut them down afterwards. Returns factory taking a handler function.
+    '''
+    servers = []
+
+    def start(handler):
+        server = StubServer(handler)
+        servers.append(server)
+        return server
+
+    yield start
+
+    for server in servers:
+        server.close()
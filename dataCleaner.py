@@ -1,4 +1,133 @@
 from typing import List, Dict, Any
+from functools import lru_cache
+from chunking import isChunkStream
+from compactRows import keyGetter
+from dedupeEngine import dedupeStream
+from nearDuplicates import NearDuplicateDetector, DEFAULT_THRESHOLD
+from metrics import instrumentStage
+
+
+# String values accepted as True when cleaning boolean fields
+TRUE_STRINGS = frozenset(['true', '1', 'yes', 'on'])
+
+
+def _isBlank(value):
+    '''
+    Check if value is None or only whitespace once converted to string
+    '''
+    if value is None:
+        return True
+
+    text = value if type(value) is str else str(value)
+    return text.strip() == ''
+
+
+def _convertString(value):
+    '''
+    Convert value to stripped string, None if blank
+    '''
+    if value is None:
+        return None
+
+    text = (value if type(value) is str else str(value)).strip()
+    return text if text else None
+
+
+def _convertInteger(value):
+    '''
+    Convert value to int, None if blank. Raises ValueError or TypeError if not convertible.
+    '''
+    if type(value) is int:
+        return value
+    if value is None:
+        return None
+
+    # Blank check only runs when conversion fails, which is rare for clean input
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        if _isBlank(value):
+            return None
+        raise
+
+
+def _convertFloat(value):
+    '''
+    Convert value to float, None if blank. Raises ValueError or TypeError if not convertible.
+    '''
+    if type(value) is float:
+        return value
+    if value is None:
+        return None
+
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        if _isBlank(value):
+            return None
+        raise
+
+
+def _convertBoolean(value):
+    '''
+    Convert value to bool using TRUE_STRINGS, None if blank
+    '''
+    if type(value) is bool:
+        return value
+    if value is None:
+        return None
+
+    text = value if type(value) is str else str(value)
+
+    if text.lower() in TRUE_STRINGS:
+        return True
+
+    return None if text.strip() == '' else False
+
+
+def _convertPassthrough(value):
+    '''
+    Keep value of unknown schema type unchanged, None if blank
+    '''
+    if _isBlank(value):
+        return None
+
+    return value
+
+
+# Converter for each schema field type, unknown types pass values through
+CONVERTERS = {
+    'string': _convertString,
+    'integer': _convertInteger,
+    'float': _convertFloat,
+    'boolean': _convertBoolean,
+}
+
+
+@lru_cache(maxsize=128)
+def _compileSchemaItems(schema_items):
+    '''
+    Build cleaning plan from hashable schema items. Returns tuple of (field, field_type, converter) entries.
+    '''
+    return tuple((field, field_type, CONVERTERS.get(field_type, _convertPassthrough)) for field, field_type in schema_items)
+
+
+def compileSchema(schema):
+    '''
+    Compile schema dict into cleaning plan so type dispatch happens once per schema instead of once per value. Plans are cached by schema contents. Returns tuple of (field, field_type, converter) entries.
+    '''
+    return _compileSchemaItems(tuple(schema.items()))
+
+
+def _missingRequired(record, required_fields):
+    '''
+    Find first required field that is absent or blank in record. Returns field name, or None if all present.
+    '''
+    for field in required_fields:
+        if field not in record or _isBlank(record[field]):
+            return field
+
+    return None
 
 
 def checkRequired(record, required_fields):
@@ -8,11 +137,51 @@ def checkRequired(record, required_fields):
     if not record:
         return False
     
-    for field in required_fields:
-        if field not in record or record[field] is None or str(record[field]).strip() == '':
-            return False
-    
-    return True
+    return _missingRequired(record, required_fields) is None
+
+
+class SchemaViolation(ValueError):
+    '''
+    Raised when a field value cannot be converted to its schema type
+    '''
+
+    def __init__(self, field, field_type):
+        super().__init__(f"invalid {field_type}")
+        self.field = field
+        self.field_type = field_type
+
+
+def _applyPlan(record, plan):
+    '''
+    Run compiled plan over record. Returns cleaned record dict. Raises SchemaViolation on first field that fails conversion.
+    '''
+    cleaned = {}
+    get = record.get
+
+    for field, field_type, convert in plan:
+        try:
+            cleaned[field] = convert(get(field))
+        except (ValueError, TypeError):
+            raise SchemaViolation(field, field_type)
+
+    return cleaned
+
+
+def _applyPlanRow(record, plan, row_type):
+    '''
+    Run compiled plan over record into compact row. Returns row_type instance. Raises SchemaViolation on first field that fails conversion.
+    '''
+    values = []
+    append = values.append
+    get = record.get
+
+    for field, field_type, convert in plan:
+        try:
+            append(convert(get(field)))
+        except (ValueError, TypeError):
+            raise SchemaViolation(field, field_type)
+
+    return row_type(*values)
 
 
 def cleanRecord(record, schema):
@@ -22,86 +191,102 @@ def cleanRecord(record, schema):
     if not record or not isinstance(record, dict):
         return None
     
-    cleaned = {}
-    
-    for field, field_type in schema.items():
-        value = record.get(field)
-        
-        if value is None or str(value).strip() == '':
-            cleaned[field] = None
-            continue
-        
-        try:
-            if field_type == 'string':
-                cleaned[field] = str(value).strip()
-            
-            elif field_type == 'integer':
-                cleaned[field] = int(value)
-            
-            elif field_type == 'float':
-                cleaned[field] = float(value)
-            
-            elif field_type == 'boolean':
-                if isinstance(value, bool):
-                    cleaned[field] = value
-                else:
-                    str_val = str(value).lower()
-                    cleaned[field] = str_val in ['true', '1', 'yes', 'on']
-            
-            else:
-                cleaned[field] = value
-        
-        except (ValueError, TypeError):
-            return None
-    
-    # Returns cleaned record if all fields processed successfully
-    return cleaned
+    try:
+        # Returns cleaned record if all fields processed successfully
+        return _applyPlan(record, compileSchema(schema))
+    except SchemaViolation:
+        return None
 
 
-def cleanData(records, schema, required_fields=None):
+def cleanDataWithReport(records, schema, required_fields=None, row_offset=0, row_type=None):
     '''
-    Clean and validate list of records against schema. Takes list of record dicts, schema dict, optional required fields list. Returns list of valid cleaned records.
+    Clean and validate list of records against schema, recording why each rejected record was dropped. Takes list of record dicts, schema dict, optional required fields list and index of first row. Optional row_type from compactRows.rowTypeForSchema(schema) makes cleaned records compact rows instead of dicts. Returns tuple of cleaned records list and rejection list of dicts with row, field and reason. Chunk streams return generator of such tuples with row indices counted across batches.
     '''
+    if isChunkStream(records):
+        return _cleanStreamWithReport(records, schema, required_fields, row_offset, row_type)
+
     if not records or not schema:
-        return []
+        return [], []
     
     if not isinstance(records, list):
         records = [records]
     
+    plan = compileSchema(schema)
+
+    if row_type is not None and row_type._fields[:row_type._init_count] != tuple(schema):
+        raise ValueError("row_type must start with the schema fields, build it with rowTypeForSchema")
+
     cleaned_records = []
-    skipped_count = 0
+    rejections = []
+    append = cleaned_records.append
     
-    for record in records:
-        if required_fields and not checkRequired(record, required_fields):
-            skipped_count += 1
+    for row, record in enumerate(records, start=row_offset):
+        if not record or not isinstance(record, dict):
+            rejections.append({"row": row, "field": None, "reason": "record is not a non-empty dict"})
             continue
         
-        cleaned = cleanRecord(record, schema)
+        if required_fields:
+            missing = _missingRequired(record, required_fields)
+            if missing is not None:
+                rejections.append({"row": row, "field": missing, "reason": "missing required field"})
+                continue
         
-        if cleaned is not None:
-            cleaned_records.append(cleaned)
-        else:
-            skipped_count += 1
+        try:
+            append(_applyPlan(record, plan) if row_type is None else _applyPlanRow(record, plan, row_type))
+        except SchemaViolation as e:
+            rejections.append({"row": row, "field": e.field, "reason": str(e)})
+    
+    # Returns cleaned records with structured rejection report
+    return cleaned_records, rejections
+
+
+def _cleanStreamWithReport(chunks, schema, required_fields, row_offset, row_type=None):
+    '''
+    Clean stream of record batches keeping row indices global across batches. Returns generator of (cleaned records, rejections) tuples.
+    '''
+    for chunk in chunks:
+        yield cleanDataWithReport(chunk, schema, required_fields, row_offset, row_type)
+        row_offset += len(chunk)
+
+
+@instrumentStage("cleanData", dropped_reason="rejected")
+def cleanData(records, schema, required_fields=None, row_type=None):
+    '''
+    Clean and validate list of records against schema. Takes list of record dicts, schema dict, optional required fields list and optional compact row type as for cleanDataWithReport. Returns list of valid cleaned records, or generator of cleaned batches when records is a chunk stream.
+    '''
+    if isChunkStream(records):
+        return (cleanData(chunk, schema, required_fields, row_type) for chunk in records)
+
+    cleaned_records, rejections = cleanDataWithReport(records, schema, required_fields, row_type=row_type)
     
-    if skipped_count > 0:
-        print(f"Skipped {skipped_count} invalid records during cleaning")
+    if rejections:
+        print(f"Skipped {len(rejections)} invalid records during cleaning")
     
     # Returns list of successfully cleaned and validated records
     return cleaned_records
 
 
-def removeDuplicates(records, key_fields):
+@instrumentStage("removeDuplicates", dropped_reason="duplicate")
+def removeDuplicates(records, key_fields, max_memory_keys=None):
     '''
-    Remove duplicate records based on key fields. Takes list of records and list of field names to check for duplicates. Returns list with duplicates removed, keeping first occurrence.
+    Remove duplicate records based on key fields. Takes list of records, list of field names to check for duplicates, and optional in-memory key budget for chunk streams. Returns list with duplicates removed, keeping first occurrence, or generator of deduplicated batches when records is a chunk stream.
     '''
+    if isChunkStream(records):
+        if max_memory_keys is not None and key_fields:
+            # Spills key digests to disk once budget is exceeded
+            return dedupeStream(records, key_fields, max_memory_keys)
+        return _removeDuplicatesStream(records, key_fields)
+
     if not records or not key_fields:
         return records
     
     seen = set()
     unique_records = []
+    # Compact rows are keyed straight from their slots
+    key_of = keyGetter(records[0], key_fields)
     
     for record in records:
-        key_tuple = tuple(record.get(field) for field in key_fields)
+        key_tuple = key_of(record)
         
         if key_tuple not in seen:
             seen.add(key_tuple)
@@ -112,4 +297,84 @@ def removeDuplicates(records, key_fields):
         print(f"Removed {duplicates_removed} duplicate records")
     
     # Returns deduplicated list of records
-    return unique_records
\ No newline at end of file
+    return unique_records
+
+
+def _removeDuplicatesStream(chunks, key_fields):
+    '''
+    Remove duplicates across stream of record batches, sharing seen keys between batches. Returns generator of deduplicated batches.
+    '''
+    if not key_fields:
+        yield from chunks
+        return
+
+    seen = set()
+    duplicates_removed = 0
+
+    for chunk in chunks:
+        unique_records = []
+        key_of = keyGetter(chunk[0], key_fields) if chunk else None
+
+        for record in chunk:
+            key_tuple = key_of(record)
+
+            if key_tuple not in seen:
+                seen.add(key_tuple)
+                unique_records.append(record)
+
+        duplicates_removed += len(chunk) - len(unique_records)
+
+        # Yields deduplicated batch as soon as it is processed
+        yield unique_records
+
+    if duplicates_removed > 0:
+        print(f"Removed {duplicates_removed} duplicate records")
+
+
+@instrumentStage("removeNearDuplicates", dropped_reason="near_duplicate")
+def removeNearDuplicates(records, fields, threshold=DEFAULT_THRESHOLD, **options):
+    '''
+    Remove records whose chosen string fields are near-duplicates of an earlier record, ignoring casing and whitespace. Candidates come from MinHash LSH buckets and are kept apart unless estimated Jaccard similarity reaches threshold. Options are passed to NearDuplicateDetector. Returns list of cluster representatives, keeping first occurrence, or generator of representative batches when records is a chunk stream.
+    '''
+    if isChunkStream(records):
+        return _removeNearDuplicatesStream(records, fields, threshold, options)
+
+    if not records or not fields:
+        return records
+
+    detector = NearDuplicateDetector(fields, threshold, **options)
+    representatives = detector.filter(records)
+
+    if detector.duplicates_removed > 0:
+        print(f"Removed {detector.duplicates_removed} near-duplicate records")
+
+    # Returns one representative record per near-duplicate cluster
+    return representatives
+
+
+def _removeNearDuplicatesStream(chunks, fields, threshold, options):
+    '''
+    Remove near-duplicates across stream of record batches, sharing LSH buckets between batches. Returns generator of representative batches.
+    '''
+    if not fields:
+        yield from chunks
+        return
+
+    detector = NearDuplicateDetector(fields, threshold, **options)
+    yield from detector.filterChunks(chunks)
+
+    if detector.duplicates_removed > 0:
+        print(f"Removed {detector.duplicates_removed} near-duplicate records")
+
+
+def findNearDuplicateClusters(records, fields, threshold=DEFAULT_THRESHOLD, **options):
+    '''
+    Group near-duplicate records without removing them. Takes list of records, string fields to compare and Jaccard threshold. Returns list of dicts with representative row and member rows, for clusters of two or more records.
+    '''
+    if not records or not fields:
+        return []
+
+    detector = NearDuplicateDetector(fields, threshold, **options)
+    detector.filter(records)
+
+    return [{"representative": representative, "rows": rows} for representative, rows in detector.clusters().items()]
@@ -1,74 +1,281 @@
-import requests
 import json
 import csv
+import re
 from typing import List, Dict, Any
+from chunking import DEFAULT_CHUNK_SIZE, chunkRecords
+from compressedInput import detectCompression, formatPath, openInput
+from jsonCodec import loads
+from jsonlIndex import iterJsonlRange
+from metrics import instrumentStage
 
+# Bytes read per refill when incrementally parsing JSON arrays
+JSON_READ_SIZE = 1 << 16
+NUMBER_DELIMITERS = frozenset(' \t\r\n,]')
+# Closing brace of one array object followed by the opening brace of the next
+OBJECT_BOUNDARY = re.compile(rb'\}[ \t\r\n]*,[ \t\r\n]*\{')
+# Candidate boundaries tried per read before waiting for more data, bounding failed decodes on nested objects
+BOUNDARY_ATTEMPTS = 2
 
-def loadFromAPI(endpoint, params=None):
+
+def __getattr__(name):
+    # requests is imported on first API call so file loading starts without it
+    if name == "requests":
+        import requests
+        return requests
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def extractRecords(data):
     '''
-    Fetch data from API endpoint with optional query parameters. Returns list of dictionaries representing JSON response data.
+    Extract records from decoded API payload. Handles bare lists and dicts wrapping records under results, data or items. Returns list of records.
     '''
+    # Handle both dict and list responses
+    if isinstance(data, list):
+        return data
+    elif isinstance(data, dict):
+        # Try to extract items from common response structures
+        if "results" in data:
+            return data["results"]
+        elif "data" in data:
+            return data["data"]
+        elif "items" in data:
+            return data["items"]
+        else:
+            # Returns wrapped response as single item
+            return [data]
+    
+    return []
+
+
+@instrumentStage("loadFromAPI", counts_input=False)
+def loadFromAPI(endpoint, params=None, cache=None):
+    '''
+    Fetch data from API endpoint with optional query parameters. Optional ResponseCache serves fresh responses locally and revalidates stale ones with conditional requests. Returns list of dictionaries representing JSON response data.
+    '''
+    import requests
+
     try:
-        response = requests.get(endpoint, params=params, timeout=10)
-        response.raise_for_status()
-        
-        data = response.json()
-        
-        # Handle both dict and list responses
-        if isinstance(data, list):
-            # Returns list of records from API
-            return data
-        elif isinstance(data, dict):
-            # Try to extract items from common response structures
-            if "results" in data:
-                return data["results"]
-            elif "data" in data:
-                return data["data"]
-            elif "items" in data:
-                return data["items"]
-            else:
-                # Returns wrapped response as single item
-                return [data]
+        if cache is not None:
+            data = loads(cache.fetch(requests, endpoint, params, timeout=10))
+        else:
+            response = requests.get(endpoint, params=params, timeout=10)
+            response.raise_for_status()
+
+            # Raw body bytes skip the str decode response.json would do
+            data = loads(response.content)
         
-        return []
+        # Returns list of records from API
+        return extractRecords(data)
     except requests.exceptions.RequestException as e:
         print(f"Error loading from API {endpoint}: {e}")
         return []
 
 
+def readFile(file_path):
+    '''
+    Read all records from CSV, JSON or JSON Lines file, optionally gzip, bz2, zstd or xz compressed, letting errors propagate so callers can report them per file. Returns list of dictionaries representing file records. Raises ValueError for unsupported formats.
+    '''
+    compression = detectCompression(file_path)
+    format_path = formatPath(file_path)
+
+    if format_path.endswith('.json'):
+        with openInput(file_path, compression, binary=True) as f:
+            # Returns records decoded block by block, so the raw file is never held whole next to them
+            return [record for batch in _iterJsonBatches(f) for record in batch]
+
+    if format_path.endswith('.jsonl') or format_path.endswith('.ndjson'):
+        if compression is None:
+            # Returns list of records from memory-mapped JSON Lines file
+            return list(iterJsonlRange(file_path))
+
+        with openInput(file_path, compression) as f:
+            return list(_iterJsonLines(f))
+
+    if format_path.endswith('.csv'):
+        with openInput(file_path, compression) as f:
+            # Returns list of records from CSV file
+            return list(csv.DictReader(f))
+
+    raise ValueError(f"Unsupported file format: {file_path}")
+
+
+@instrumentStage("loadFromFile", counts_input=False)
 def loadFromFile(file_path):
     '''
-    Load data from CSV or JSON file. Returns list of dictionaries representing file records.
+    Load data from CSV, JSON or JSON Lines file, optionally gzip, bz2, zstd or xz compressed. Compression is detected from extension, e.g. orders.csv.gz, or magic bytes and decompressed while parsing. Errors are printed and give an empty list, use readFile to have them raised. Returns list of dictionaries representing file records.
     '''
     try:
-        if file_path.endswith('.json'):
-            with open(file_path, 'r') as f:
-                data = json.load(f)
-                
-                if isinstance(data, list):
-                    # Returns list of records from JSON file
-                    return data
-                else:
-                    # Returns wrapped response as single item
-                    return [data]
-        
-        elif file_path.endswith('.csv'):
-            records = []
-            with open(file_path, 'r') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    records.append(row)
-            
-            # Returns list of records from CSV file
-            return records
-        
-        else:
-            print(f"Unsupported file format: {file_path}")
-            return []
-    
+        return readFile(file_path)
     except FileNotFoundError:
         print(f"File not found: {file_path}")
         return []
     except Exception as e:
         print(f"Error loading from file {file_path}: {e}")
-        return []
\ No newline at end of file
+        return []
+
+
+def _iterJsonArray(f, read_size=JSON_READ_SIZE):
+    '''
+    Incrementally parse top-level JSON array from open text file. Returns generator of array items, or single wrapped object if top-level value is not an array.
+    '''
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buffer, pos, eof
+        data = f.read(read_size)
+        if not data:
+            eof = True
+        buffer = buffer[pos:] + data
+        pos = 0
+
+    def skipWhitespace():
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos].isspace():
+                pos += 1
+            if pos < len(buffer) or eof:
+                return
+            fill()
+
+    skipWhitespace()
+
+    if pos >= len(buffer):
+        return
+
+    if buffer[pos] != '[':
+        # Top-level object cannot be streamed, parse remainder as single record
+        rest = buffer[pos:] + f.read()
+        yield json.loads(rest)
+        return
+
+    pos += 1
+    skipWhitespace()
+
+    if pos < len(buffer) and buffer[pos] == ']':
+        return
+
+    while True:
+        skipWhitespace()
+
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            fill()
+            continue
+
+        # Numbers are the only values that parse when truncated, so require a delimiter after them
+        if not eof and isinstance(item, (int, float)) and (end >= len(buffer) or buffer[end] not in NUMBER_DELIMITERS):
+            fill()
+            continue
+
+        pos = end
+        yield item
+
+        skipWhitespace()
+
+        if pos >= len(buffer):
+            raise ValueError("Unexpected end of JSON array")
+
+        separator = buffer[pos]
+        pos += 1
+
+        if separator == ']':
+            return
+        if separator != ',':
+            raise ValueError(f"Expected ',' or ']' in JSON array, got {separator!r}")
+
+
+def _iterJsonBatches(f, read_size=JSON_READ_SIZE):
+    '''
+    Parse top-level JSON array of objects from open binary file, decoding the complete objects of each read with the JSON codec. Other top-level values and non UTF-8 input are decoded whole. Returns generator of record lists, wrapping a top-level value that is not an array as single record.
+    '''
+    buffer = f.read(read_size)
+
+    if buffer.lstrip()[:1] != b'[' or json.detect_encoding(buffer) != 'utf-8':
+        data = loads(buffer + f.read())
+        yield data if isinstance(data, list) else [data]
+        return
+
+    buffer = buffer.lstrip()[1:]
+
+    while True:
+        data = f.read(read_size)
+
+        if not data:
+            break
+
+        buffer += data
+        end = len(buffer)
+
+        for _ in range(BOUNDARY_ATTEMPTS):
+            end = buffer.rfind(b'}', 0, end)
+
+            while end >= 0 and OBJECT_BOUNDARY.match(buffer, end) is None:
+                end = buffer.rfind(b'}', 0, end)
+
+            if end < 0:
+                break
+
+            # A brace inside a string or nested object leaves the prefix unbalanced and fails to decode
+            try:
+                batch = loads(b'[' + buffer[:end + 1] + b']')
+            except ValueError:
+                continue
+
+            buffer = buffer[OBJECT_BOUNDARY.match(buffer, end).end() - 1:]
+            yield batch
+            break
+
+    # Remainder holds the last objects and the closing bracket
+    batch = loads(b'[' + buffer)
+
+    if batch:
+        yield batch
+
+
+def _iterJsonLines(f):
+    '''
+    Parse JSON Lines from open text file, skipping blank lines. Returns generator of records.
+    '''
+    for line_number, line in enumerate(f, start=1):
+        line = line.strip()
+
+        if not line:
+            continue
+
+        try:
+            yield loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON on line {line_number}: {e}")
+
+
+def iterFile(file_path, chunk_size=DEFAULT_CHUNK_SIZE):
+    '''
+    Stream data from CSV, JSON or JSON Lines file in bounded batches, decompressing gzip, bz2, zstd or xz input like loadFromFile. Takes file path and maximum records per batch. Returns generator of record lists.
+    '''
+    format_path = formatPath(file_path)
+
+    if format_path.endswith('.json'):
+        parser = _iterJsonArray
+    elif format_path.endswith('.jsonl') or format_path.endswith('.ndjson'):
+        parser = _iterJsonLines
+    elif format_path.endswith('.csv'):
+        parser = csv.DictReader
+    else:
+        print(f"Unsupported file format: {file_path}")
+        return
+
+    try:
+        f = openInput(file_path)
+    except FileNotFoundError:
+        print(f"File not found: {file_path}")
+        return
+
+    with f:
+        # Yields batches of at most chunk_size records as they are parsed
+        yield from chunkRecords(parser(f), chunk_size)
@@ -1,22 +1,303 @@
-from sqlalchemy import create_engine
+import threading
+import time
+from collections import deque
+from sqlalchemy import create_engine, exc
 from sqlalchemy.orm import sessionmaker, declarative_base
-from config import DATABASE_URL
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from config import DATABASE_URL, ASYNC_DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING
+
+# Recent checkout waits kept for percentile reporting
+WAIT_SAMPLE_SIZE = 1000
+
+# Async driver used for each sync driver scheme
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+class PoolMetrics:
+    '''
+    Thread-safe counters for connection pool checkout waits and timeouts
+    '''
+
+    def __init__(self, sample_size=WAIT_SAMPLE_SIZE):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.recent_waits = deque(maxlen=sample_size)
+
+    def record(self, wait):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            self.recent_waits.append(wait)
+
+    def recordTimeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self):
+        '''
+        Current checkout statistics in seconds. Returns dict.
+        '''
+        with self._lock:
+            waits = sorted(self.recent_waits)
+            checkouts = self.checkouts
+            summary = {
+                "checkouts": checkouts,
+                "timeouts": self.timeouts,
+                "mean_wait": self.total_wait / checkouts if checkouts else 0.0,
+                "max_wait": self.max_wait,
+            }
+
+        for name, quantile in (("p50_wait", 0.5), ("p99_wait", 0.99)):
+            summary[name] = waits[min(len(waits) - 1, int(quantile * len(waits)))] if waits else 0.0
+
+        return summary
+
+
+class _TimedPoolMixin:
+    '''
+    Records how long each connection checkout takes, including time waiting for a free connection
+    '''
+    metrics = None
+
+    def connect(self):
+        start = time.perf_counter()
+
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            if self.metrics is not None:
+                self.metrics.recordTimeout()
+            raise
+
+        if self.metrics is not None:
+            self.metrics.record(time.perf_counter() - start)
+
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def engineOptions(url, async_engine=False):
+    '''
+    Build create_engine keyword arguments with pool tuning from config. In-memory SQLite keeps its default single-connection pool. Returns dict.
+    '''
+    options = {"echo": False}
+
+    if url.startswith("sqlite") and (":memory:" in url or url.rstrip("/").endswith(":")):
+        return options
+
+    options.update({
+        "poolclass": TimedAsyncQueuePool if async_engine else TimedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    })
+
+    return options
+
+
+def createEngine(url=DATABASE_URL, **overrides):
+    '''
+    Create engine with tuned connection pool and checkout metrics attached as engine.pool.metrics. Returns Engine.
+    '''
+    new_engine = create_engine(url, **{**engineOptions(url), **overrides})
+
+    if isinstance(new_engine.pool, _TimedPoolMixin):
+        new_engine.pool.metrics = PoolMetrics()
+
+    return new_engine
+
+
+def asyncDatabaseUrl(url=DATABASE_URL):
+    '''
+    Derive async driver URL from sync database URL. Returns URL string.
+    '''
+    if ASYNC_DATABASE_URL:
+        return ASYNC_DATABASE_URL
+
+    scheme, separator, rest = url.partition("://")
+
+    return ASYNC_DRIVERS.get(scheme, scheme) + separator + rest
+
 
-# PostgreSQL connection engine for data pipeline
-engine = create_engine(DATABASE_URL, echo=False)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Sync engine and session factory are created on first use, so importing models or starting the API opens no pool
+_engine = None
+_session_factory = None
+_engine_lock = threading.Lock()
+
+_async_engine = None
+_async_session_factory = None
+
+
+def getEngine():
+    '''
+    Get PostgreSQL connection engine for data pipeline, created on first use. Returns Engine.
+    '''
+    global _engine, _session_factory
+
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                new_engine = createEngine(DATABASE_URL)
+                _session_factory = sessionmaker(autocommit=False, autoflush=False, bind=new_engine)
+                _engine = new_engine
+
+    return _engine
+
+
+def getSessionFactory():
+    '''
+    Get session factory bound to sync engine, created on first use. Returns sessionmaker.
+    '''
+    getEngine()
+    return _session_factory
+
+
+def __getattr__(name):
+    # Module attributes kept for callers importing engine or SessionLocal directly
+    if name == "engine":
+        return getEngine()
+    if name == "SessionLocal":
+        return getSessionFactory()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 def initDatabase():
     '''
     Initialize database by creating all tables defined in models
     '''
-    Base.metadata.create_all(bind=engine)
+    Base.metadata.create_all(bind=getEngine())
+
+
+def migrateDatabase(target_engine=None):
+    '''
+    Create missing tables and add model columns missing from existing tables, since create_all never alters a table. Meant for a deploy step so API startup can skip schema work. Returns list of applied change descriptions.
+    '''
+    from sqlalchemy import inspect, text
+    import models  # noqa: F401, registers tables on Base.metadata
+
+    target_engine = target_engine or getEngine()
+    inspector = inspect(target_engine)
+    existing = set(inspector.get_table_names())
+    preparer = target_engine.dialect.identifier_preparer
+    changes = []
+
+    with target_engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing:
+                continue
+
+            present = {column["name"] for column in inspector.get_columns(table.name)}
+
+            for column in table.columns:
+                if column.name in present:
+                    continue
+                if not column.nullable:
+                    raise RuntimeError(f"Column {table.name}.{column.name} is NOT NULL and cannot be added automatically")
+
+                column_type = column.type.compile(dialect=target_engine.dialect)
+                connection.execute(text(f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {preparer.format_column(column)} {column_type}"))
+                changes.append(f"Added column {table.name}.{column.name}")
+
+    missing = [table.name for table in Base.metadata.sorted_tables if table.name not in existing]
+    Base.metadata.create_all(bind=target_engine)
+    changes.extend(f"Created table {name}" for name in missing)
+
+    return changes
 
 
 def getSession():
     '''
-    Get database session for queries. Returns active SQLAlchemy session.
+    Get database session for queries. Returns active SQLAlchemy session, caller must close it.
+    '''
+    return getSessionFactory()()
+
+
+def getDb():
+    '''
+    Request-scoped session dependency for FastAPI endpoints. Yields session and returns its connection to the pool after the response.
     '''
-    return SessionLocal()
\ No newline at end of file
+    session = getSessionFactory()()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def getAsyncEngine():
+    '''
+    Get async engine, created on first use so the async driver is only needed by callers that use it. Returns AsyncEngine.
+    '''
+    global _async_engine, _async_session_factory
+
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+        url = asyncDatabaseUrl()
+        _async_engine = create_async_engine(url, **engineOptions(url, async_engine=True))
+
+        if isinstance(_async_engine.sync_engine.pool, _TimedPoolMixin):
+            _async_engine.sync_engine.pool.metrics = PoolMetrics()
+
+        _async_session_factory = async_sessionmaker(_async_engine, expire_on_commit=False)
+
+    return _async_engine
+
+
+async def getAsyncDb():
+    '''
+    Request-scoped async session dependency for DB-bound endpoints that should not occupy threadpool workers
+    '''
+    getAsyncEngine()
+
+    async with _async_session_factory() as session:
+        yield session
+
+
+def getPoolMetrics():
+    '''
+    Checkout metrics and pool occupancy of sync and async engines that have been created. Engines are never created here, so scraping metrics keeps them lazy. Returns dict, empty until an engine exists.
+    '''
+    engines = {}
+
+    if _engine is not None:
+        engines["sync"] = _engine
+
+    if _async_engine is not None:
+        engines["async"] = _async_engine.sync_engine
+
+    result = {}
+
+    for name, pool_engine in engines.items():
+        pool = pool_engine.pool
+        stats = pool.metrics.snapshot() if getattr(pool, "metrics", None) is not None else {}
+
+        if isinstance(pool, QueuePool):
+            stats.update({"size": pool.size(), "checked_out": pool.checkedout(), "overflow": pool.overflow()})
+
+        result[name] = stats
+
+    return result
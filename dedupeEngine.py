@@ -0,0 +1,203 @@
+import hashlib
+import math
+import numbers
+import os
+import sqlite3
+import tempfile
+
+# Bytes per key digest kept in memory and on disk
+DIGEST_SIZE = 16
+DEFAULT_MAX_MEMORY_KEYS = 1000000
+
+
+def _keyPart(value):
+    '''
+    Canonical form of key value, so values equal in a set also hash alike. True, 1 and 1.0 all become 1. Returns value.
+    '''
+    if type(value) is str or value is None:
+        return value
+
+    if isinstance(value, bool):
+        return int(value)
+
+    if isinstance(value, numbers.Real) and not isinstance(value, int):
+        try:
+            integral = int(value)
+        except (ValueError, OverflowError):
+            # NaN and infinities
+            return float(value)
+
+        if integral == value:
+            return integral
+        if float(value) == value:
+            return float(value)
+
+    return value
+
+
+def keyDigest(record, key_fields):
+    '''
+    Hash record key fields to fixed-size digest. Numeric keys are normalized first, so keys equal as Python values, such as 1, 1.0 and True, share a digest like they share a set entry. Returns bytes digest.
+    '''
+    key_tuple = tuple(_keyPart(record.get(field)) for field in key_fields)
+    return hashlib.blake2b(repr(key_tuple).encode(), digest_size=DIGEST_SIZE).digest()
+
+
+class BloomFilter:
+    '''
+    Bloom filter over key digests. Answers definitely-absent or maybe-present, false positive rate grows past capacity.
+    '''
+
+    def __init__(self, capacity, error_rate=0.01):
+        if capacity < 1 or not 0 < error_rate < 1:
+            raise ValueError("BloomFilter needs positive capacity and error_rate between 0 and 1")
+
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, digest):
+        '''
+        Derive bit positions from digest halves with double hashing. Returns generator of bit indices.
+        '''
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:16], 'little') | 1
+
+        for i in range(self.hash_count):
+            yield (first + i * second) % self.size
+
+    def add(self, digest):
+        for position in self._positions(digest):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, digest):
+        bits = self.bits
+
+        for position in self._positions(digest):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+
+        return True
+
+
+class DedupeEngine:
+    '''
+    First-occurrence deduplication for streams larger than memory. Keeps key digests in memory up to max_memory_keys, then spills them to an indexed SQLite file in spill_dir. Optional Bloom filter skips disk lookups for keys that were never spilled.
+    '''
+
+    def __init__(self, key_fields, max_memory_keys=DEFAULT_MAX_MEMORY_KEYS, use_bloom=True, bloom_capacity=None, bloom_error_rate=0.01, spill_dir=None):
+        if not key_fields:
+            raise ValueError("DedupeEngine needs at least one key field")
+
+        self.key_fields = list(key_fields)
+        self.max_memory_keys = max_memory_keys
+        self.use_bloom = use_bloom
+        self.bloom_capacity = bloom_capacity or 10 * max_memory_keys
+        self.bloom_error_rate = bloom_error_rate
+        self.spill_dir = spill_dir
+
+        self.memory_keys = set()
+        self.bloom = None
+        self.spill_path = None
+        self._connection = None
+
+        self.records_seen = 0
+        self.duplicates_removed = 0
+        self.spill_count = 0
+        self.disk_lookups = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        '''
+        Close and delete spill file if one was created
+        '''
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+            os.unlink(self.spill_path)
+
+    def _spill(self):
+        '''
+        Move in-memory digests to spill store and clear memory set
+        '''
+        if self._connection is None:
+            fd, self.spill_path = tempfile.mkstemp(prefix="dedupe-", suffix=".sqlite", dir=self.spill_dir)
+            os.close(fd)
+            self._connection = sqlite3.connect(self.spill_path)
+            self._connection.execute("PRAGMA journal_mode=OFF")
+            self._connection.execute("PRAGMA synchronous=OFF")
+            self._connection.execute("CREATE TABLE seen_keys (digest BLOB PRIMARY KEY) WITHOUT ROWID")
+
+            if self.use_bloom:
+                self.bloom = BloomFilter(self.bloom_capacity, self.bloom_error_rate)
+
+        with self._connection:
+            self._connection.executemany("INSERT OR IGNORE INTO seen_keys VALUES (?)", ((digest,) for digest in self.memory_keys))
+
+        if self.bloom is not None:
+            for digest in self.memory_keys:
+                self.bloom.add(digest)
+
+        self.memory_keys.clear()
+        self.spill_count += 1
+
+    def _onDisk(self, digest):
+        '''
+        Check spill store for digest, consulting Bloom filter first. Returns True if digest was spilled.
+        '''
+        if self._connection is None:
+            return False
+
+        if self.bloom is not None and digest not in self.bloom:
+            return False
+
+        self.disk_lookups += 1
+        return self._connection.execute("SELECT 1 FROM seen_keys WHERE digest = ?", (digest,)).fetchone() is not None
+
+    def isNew(self, record):
+        '''
+        Check record key and remember it. Returns True for first occurrence, False for duplicates.
+        '''
+        self.records_seen += 1
+        digest = keyDigest(record, self.key_fields)
+
+        if digest in self.memory_keys or self._onDisk(digest):
+            self.duplicates_removed += 1
+            return False
+
+        self.memory_keys.add(digest)
+
+        if len(self.memory_keys) >= self.max_memory_keys:
+            self._spill()
+
+        return True
+
+    def filter(self, records):
+        '''
+        Keep first occurrence of each key from batch. Returns list of unique records.
+        '''
+        is_new = self.isNew
+        return [record for record in records if is_new(record)]
+
+    def filterChunks(self, chunks):
+        '''
+        Deduplicate stream of record batches. Returns generator of unique batches.
+        '''
+        for chunk in chunks:
+            yield self.filter(chunk)
+
+
+def dedupeStream(chunks, key_fields, max_memory_keys=DEFAULT_MAX_MEMORY_KEYS, use_bloom=True, spill_dir=None):
+    '''
+    Remove duplicates from stream of record batches with bounded memory, spilling key digests to disk past max_memory_keys. Returns generator of unique batches, keeping first occurrence.
+    '''
+    with DedupeEngine(key_fields, max_memory_keys, use_bloom, spill_dir=spill_dir) as engine:
+        yield from engine.filterChunks(chunks)
+
+        if engine.duplicates_removed > 0:
+            print(f"Removed {engine.duplicates_removed} duplicate records")
@@ -1,21 +1,53 @@
 from typing import List, Dict, Any
 import math
+from bisect import bisect_right
+from chunking import isChunkStream
+from columnBatch import ColumnBatch, normalizeNumericColumns, categorizeFieldColumns, createRatioFeatureColumns
+from metrics import instrumentStage
 
+# Bins derived when categorizeField is given a quantile sketch without n_bins
+DEFAULT_QUANTILE_BINS = 4
 
+
+@instrumentStage("normalizeNumeric")
 def normalizeNumeric(records, field):
     '''
-    Normalize numeric field to 0-1 range using min-max scaling. Takes list of records and field name. Returns list of records with normalized field added as field_normalized.
+    Normalize numeric field to 0-1 range using min-max scaling. Takes list of records and field name. Returns list of records with normalized field added as field_normalized. Chunk streams are scaled per batch.
     '''
+    if isChunkStream(records):
+        return (normalizeNumeric(chunk, field) for chunk in records)
+
+    if isinstance(records, ColumnBatch):
+        return normalizeNumericColumns(records, field)
+
     if not records or not field:
         return records
     
+    value_range = numericRange(records, field)
+    
+    if value_range is None:
+        return records
+    
+    # Returns records with new normalized field added
+    return applyMinMax(records, field, *value_range)
+
+
+def numericRange(records, field):
+    '''
+    Find minimum and maximum of numeric field across records, ignoring None values. Returns (min, max) tuple, or None if field has no values.
+    '''
     values = [float(r.get(field, 0)) for r in records if r.get(field) is not None]
     
     if not values:
-        return records
+        return None
     
-    min_val = min(values)
-    max_val = max(values)
+    return min(values), max(values)
+
+
+def applyMinMax(records, field, min_val, max_val):
+    '''
+    Scale numeric field to 0-1 range using given bounds. Takes list of records, field name, minimum and maximum. Returns list of records with field_normalized added, 0.5 for every record when bounds are equal.
+    '''
     range_val = max_val - min_val
     
     if range_val == 0:
@@ -34,42 +66,55 @@ def normalizeNumeric(records, field):
     return records
 
 
-def categorizeField(records, field, bins):
+@instrumentStage("categorizeField")
+def categorizeField(records, field, bins, n_bins=None):
     '''
-    Categorize numeric field into bins. Takes list of records, field name, and list of bin thresholds. Returns list of records with new category field added as field_category.
+    Categorize numeric field into bins. Takes list of records, field name, and list of bin thresholds, or a quantile sketch such as profiling.KLLSketch with n_bins to derive equal-count thresholds from. Category is the number of thresholds at or below the value, found by binary search. Returns list of records with new category field added as field_category.
     '''
+    if hasattr(bins, "quantileBins"):
+        bins = bins.quantileBins(n_bins or DEFAULT_QUANTILE_BINS)
+
+    if isChunkStream(records):
+        return (categorizeField(chunk, field, bins) for chunk in records)
+
+    if isinstance(records, ColumnBatch):
+        return categorizeFieldColumns(records, field, bins)
+
     if not records or not field or not bins:
         return records
     
     bins = sorted(bins)
+    category_field = f"{field}_category"
     
     for r in records:
         value = r.get(field)
         
         if value is None:
-            r[f"{field}_category"] = None
+            r[category_field] = None
             continue
         
         try:
             value = float(value)
-            category = 0
-            
-            for threshold in bins:
-                if value >= threshold:
-                    category += 1
-            
-            r[f"{field}_category"] = category
+            # NaN compares below every threshold
+            r[category_field] = bisect_right(bins, value) if value == value else 0
         except (ValueError, TypeError):
-            r[f"{field}_category"] = None
+            r[category_field] = None
     
     # Returns records with new category field added
     return records
 
 
+@instrumentStage("createRatioFeature")
 def createRatioFeature(records, numerator_field, denominator_field, feature_name):
     '''
     Create ratio feature from two numeric fields. Takes list of records, numerator field name, denominator field name, and output feature name. Returns list of records with ratio feature added, handles division by zero.
     '''
+    if isChunkStream(records):
+        return (createRatioFeature(chunk, numerator_field, denominator_field, feature_name) for chunk in records)
+
+    if isinstance(records, ColumnBatch):
+        return createRatioFeatureColumns(records, numerator_field, denominator_field, feature_name)
+
     if not records or not numerator_field or not denominator_field or not feature_name:
         return records
     
@@ -93,4 +138,70 @@ def createRatioFeature(records, numerator_field, denominator_field, feature_name
             r[feature_name] = None
     
     # Returns records with new ratio feature added
-    return records
\ No newline at end of file
+    return records
+
+
+def checkFitInputs(feature_specs):
+    '''
+    Check no normalize spec, or categorize spec without fixed bins, reads a field produced by an earlier normalize or categorize spec. Those values only exist once the earlier spec is fitted, so one fitting pass cannot see them. Fields of ratio specs are fine since ratios need no fitting. Raises ValueError naming the field.
+    '''
+    unfittable = set()
+
+    for spec in feature_specs:
+        feature_type = spec.get("type")
+        fitted = feature_type == "normalize" or (feature_type == "categorize" and spec.get("bins") is None)
+
+        if fitted and spec["field"] in unfittable:
+            raise ValueError(f"Cannot fit {feature_type} feature on {spec['field']}, it is produced by an earlier fitted feature")
+
+        if feature_type == "normalize":
+            unfittable.add(f"{spec['field']}_normalized")
+        elif feature_type == "categorize":
+            unfittable.add(f"{spec['field']}_category")
+        elif feature_type == "ratio" and (spec["numerator"] in unfittable or spec["denominator"] in unfittable):
+            unfittable.add(spec["name"])
+
+
+def withRatioFeatures(records, feature_specs):
+    '''
+    Copy records with every ratio spec applied, so bounds of derived ratio fields can be fitted before the other specs run. Returns records unchanged when no normalize spec reads a ratio field.
+    '''
+    ratio_specs = [spec for spec in feature_specs if spec.get("type") == "ratio"]
+    ratio_names = {spec["name"] for spec in ratio_specs}
+
+    if not any(spec.get("type") == "normalize" and spec["field"] in ratio_names for spec in feature_specs):
+        return records
+
+    records = [dict(record) for record in records]
+
+    for spec in ratio_specs:
+        createRatioFeature(records, spec["numerator"], spec["denominator"], spec["name"])
+
+    return records
+
+
+def applyFeatures(records, feature_specs, ranges=None):
+    '''
+    Apply list of feature spec dicts in order. Spec types are normalize (field), categorize (field, bins) and ratio (numerator, denominator, name). Optional ranges dict maps normalize fields to precomputed (min, max) bounds. Returns records with all features added.
+    '''
+    for spec in feature_specs:
+        feature_type = spec.get("type")
+        
+        if feature_type == "normalize":
+            if ranges is not None and spec["field"] in ranges:
+                if ranges[spec["field"]] is not None and records:
+                    applyMinMax(records, spec["field"], *ranges[spec["field"]])
+            else:
+                records = normalizeNumeric(records, spec["field"])
+        
+        elif feature_type == "categorize":
+            records = categorizeField(records, spec["field"], spec["bins"])
+        
+        elif feature_type == "ratio":
+            records = createRatioFeature(records, spec["numerator"], spec["denominator"], spec["name"])
+        
+        else:
+            raise ValueError(f"Unsupported feature type: {feature_type}")
+    
+    # Returns records with every feature in spec order added
+    return records
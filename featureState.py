@@ -0,0 +1,381 @@
+import json
+import os
+from chunking import isChunkStream
+from featureEngine import numericRange, applyMinMax, categorizeField, createRatioFeature, checkFitInputs
+from models import FeatureState
+from profiling import KLLSketch, DEFAULT_K
+
+# Version of serialized feature state format
+STATE_VERSION = 1
+
+
+class MinMaxScaler:
+    '''
+    Min-max scaler for one numeric field with running bounds across batches. Adds field_normalized like normalizeNumeric.
+    '''
+    kind = "minmax"
+
+    def __init__(self, field, min_val=None, max_val=None):
+        self.field = field
+        self.min_val = min_val
+        self.max_val = max_val
+
+    @property
+    def fitted(self):
+        return self.min_val is not None
+
+    def partialFit(self, records):
+        '''
+        Update running min and max from batch of records. Returns self.
+        '''
+        value_range = numericRange(records, self.field) if records else None
+
+        if value_range is not None:
+            if self.fitted:
+                self.min_val = min(self.min_val, value_range[0])
+                self.max_val = max(self.max_val, value_range[1])
+            else:
+                self.min_val, self.max_val = value_range
+
+        return self
+
+    def transform(self, records):
+        '''
+        Scale batch using fitted bounds. Returns records with field_normalized added, unchanged if nothing was fitted.
+        '''
+        if not records or not self.fitted:
+            return records
+
+        return applyMinMax(records, self.field, self.min_val, self.max_val)
+
+    def toDict(self):
+        return {"type": self.kind, "field": self.field, "min": self.min_val, "max": self.max_val}
+
+    @classmethod
+    def fromDict(cls, state):
+        return cls(state["field"], state.get("min"), state.get("max"))
+
+
+class Binner:
+    '''
+    Bins numeric field into categories like categorizeField. Uses fixed thresholds when given, otherwise n_bins equal-width thresholds from running min and max.
+    '''
+    kind = "bins"
+
+    def __init__(self, field, bins=None, n_bins=None, min_val=None, max_val=None):
+        if bins is None and not n_bins:
+            raise ValueError("Binner needs either bins or n_bins")
+
+        self.field = field
+        self.fixed_bins = sorted(bins) if bins is not None else None
+        self.n_bins = n_bins
+        self.min_val = min_val
+        self.max_val = max_val
+
+    @property
+    def fitted(self):
+        return self.fixed_bins is not None or self.min_val is not None
+
+    @property
+    def bins(self):
+        '''
+        Current thresholds. Returns list of bin thresholds, empty if not fitted.
+        '''
+        if self.fixed_bins is not None:
+            return self.fixed_bins
+
+        if self.min_val is None:
+            return []
+
+        width = (self.max_val - self.min_val) / self.n_bins
+        return [self.min_val + width * i for i in range(1, self.n_bins)]
+
+    def partialFit(self, records):
+        '''
+        Update running min and max for learned thresholds. Returns self.
+        '''
+        if self.fixed_bins is not None or not records:
+            return self
+
+        value_range = numericRange(records, self.field)
+
+        if value_range is not None:
+            if self.min_val is None:
+                self.min_val, self.max_val = value_range
+            else:
+                self.min_val = min(self.min_val, value_range[0])
+                self.max_val = max(self.max_val, value_range[1])
+
+        return self
+
+    def transform(self, records):
+        '''
+        Categorize batch using current thresholds. Returns records with field_category added, unchanged if not fitted.
+        '''
+        if not self.fitted:
+            return records
+
+        bins = self.bins
+
+        if not bins:
+            # Single learned bin puts every value in category 0
+            bins = [float('inf')]
+
+        return categorizeField(records, self.field, bins)
+
+    def toDict(self):
+        return {"type": self.kind, "field": self.field, "bins": self.fixed_bins, "n_bins": self.n_bins, "min": self.min_val, "max": self.max_val}
+
+    @classmethod
+    def fromDict(cls, state):
+        return cls(state["field"], state.get("bins"), state.get("n_bins"), state.get("min"), state.get("max"))
+
+
+class QuantileBinner:
+    '''
+    Bins numeric field into n_bins categories of roughly equal count, with thresholds from a KLL quantile sketch fitted across batches in bounded memory
+    '''
+    kind = "quantile_bins"
+
+    def __init__(self, field, n_bins, sketch=None, k=DEFAULT_K):
+        if not n_bins or n_bins < 2:
+            raise ValueError("QuantileBinner needs n_bins of at least 2")
+
+        self.field = field
+        self.n_bins = n_bins
+        self.sketch = sketch if sketch is not None else KLLSketch(k)
+
+    @property
+    def fitted(self):
+        return self.sketch.count > 0
+
+    @property
+    def bins(self):
+        '''
+        Current quantile thresholds. Returns sorted list, empty if not fitted.
+        '''
+        return self.sketch.quantileBins(self.n_bins)
+
+    def partialFit(self, records):
+        '''
+        Add batch values to quantile sketch. Returns self.
+        '''
+        values = []
+
+        for r in records or ():
+            value = r.get(self.field)
+            if value is not None:
+                try:
+                    values.append(float(value))
+                except (ValueError, TypeError):
+                    continue
+
+        self.sketch.update([value for value in values if value == value])
+        return self
+
+    def transform(self, records):
+        '''
+        Categorize batch using current quantile thresholds. Returns records with field_category added, unchanged if not fitted.
+        '''
+        if not self.fitted:
+            return records
+
+        return categorizeField(records, self.field, self.bins or [float('inf')])
+
+    def toDict(self):
+        return {"type": self.kind, "field": self.field, "n_bins": self.n_bins, "sketch": self.sketch.toDict()}
+
+    @classmethod
+    def fromDict(cls, state):
+        return cls(state["field"], state["n_bins"], KLLSketch.fromDict(state["sketch"]))
+
+
+class RatioFeature:
+    '''
+    Stateless ratio of two numeric fields, wrapped so it can be chained with fitted transformers
+    '''
+    kind = "ratio"
+    fitted = True
+
+    def __init__(self, numerator, denominator, name):
+        self.numerator = numerator
+        self.denominator = denominator
+        self.name = name
+
+    def partialFit(self, records):
+        return self
+
+    def transform(self, records):
+        return createRatioFeature(records, self.numerator, self.denominator, self.name)
+
+    def toDict(self):
+        return {"type": self.kind, "numerator": self.numerator, "denominator": self.denominator, "name": self.name}
+
+    @classmethod
+    def fromDict(cls, state):
+        return cls(state["numerator"], state["denominator"], state["name"])
+
+
+# State keys learned by fitting rather than set by feature specs
+FITTED_KEYS = ("min", "max", "sketch")
+
+
+def _specConfig(transformer):
+    '''
+    Serialized transformer state without fitted statistics, identifying the spec it was built from. Returns dict.
+    '''
+    return {key: value for key, value in transformer.toDict().items() if key not in FITTED_KEYS}
+
+
+# Transformer class for each serialized state type
+TRANSFORMERS = {cls.kind: cls for cls in (MinMaxScaler, Binner, QuantileBinner, RatioFeature)}
+
+
+class FeaturePipeline:
+    '''
+    Ordered list of fit/transform feature transformers whose fitted state can be saved and reloaded, so new batches are transformed consistently without rescanning history.
+    '''
+
+    def __init__(self, transformers):
+        self.transformers = list(transformers)
+
+    @classmethod
+    def fromSpecs(cls, feature_specs):
+        '''
+        Build pipeline from feature spec dicts as accepted by applyFeatures. Categorize specs may give n_bins instead of bins, with strategy "quantile" for equal-count instead of equal-width bins. Returns FeaturePipeline.
+        '''
+        checkFitInputs(feature_specs)
+        transformers = []
+
+        for spec in feature_specs:
+            feature_type = spec.get("type")
+
+            if feature_type == "normalize":
+                transformers.append(MinMaxScaler(spec["field"]))
+            elif feature_type == "categorize" and spec.get("strategy") == "quantile":
+                transformers.append(QuantileBinner(spec["field"], spec.get("n_bins")))
+            elif feature_type == "categorize":
+                transformers.append(Binner(spec["field"], spec.get("bins"), spec.get("n_bins")))
+            elif feature_type == "ratio":
+                transformers.append(RatioFeature(spec["numerator"], spec["denominator"], spec["name"]))
+            else:
+                raise ValueError(f"Unsupported feature type: {feature_type}")
+
+        return cls(transformers)
+
+    def matchesSpecs(self, feature_specs):
+        '''
+        Check pipeline was built from feature_specs, comparing transformer types, fields, names and bins but not fitted statistics. Returns bool.
+        '''
+        expected = FeaturePipeline.fromSpecs(feature_specs).transformers
+        return [_specConfig(t) for t in self.transformers] == [_specConfig(t) for t in expected]
+
+    def copy(self):
+        '''
+        Independent copy of pipeline and its fitted state. Returns FeaturePipeline.
+        '''
+        return FeaturePipeline.fromDict(self.toDict())
+
+    def partialFit(self, records):
+        '''
+        Update every transformer's running statistics from one batch. Ratio features are computed in order on a copy first, so transformers on derived ratio fields fit on the values they later transform. Returns self.
+        '''
+        ratio_names = {transformer.name for transformer in self.transformers if transformer.kind == "ratio"}
+        derived = bool(records) and any(getattr(transformer, "field", None) in ratio_names for transformer in self.transformers)
+
+        if derived:
+            records = [dict(record) for record in records]
+
+        for transformer in self.transformers:
+            if transformer.kind == "ratio" and derived:
+                records = transformer.transform(records)
+            else:
+                transformer.partialFit(records)
+
+        return self
+
+    def fit(self, chunks):
+        '''
+        Fit running statistics over iterable of record batches in one pass. Returns self.
+        '''
+        for chunk in chunks:
+            self.partialFit(chunk)
+
+        return self
+
+    def transform(self, records):
+        '''
+        Apply every transformer in order using fitted state. Chunk streams are transformed lazily batch by batch. Returns records with features added.
+        '''
+        if isChunkStream(records):
+            return (self.transform(chunk) for chunk in records)
+
+        for transformer in self.transformers:
+            records = transformer.transform(records)
+
+        return records
+
+    def toDict(self):
+        return {"version": STATE_VERSION, "transformers": [t.toDict() for t in self.transformers]}
+
+    @classmethod
+    def fromDict(cls, state):
+        '''
+        Rebuild pipeline from serialized state dict. Returns FeaturePipeline.
+        '''
+        if state.get("version") != STATE_VERSION:
+            raise ValueError(f"Unsupported feature state version: {state.get('version')}")
+
+        transformers = []
+
+        for entry in state["transformers"]:
+            if entry["type"] not in TRANSFORMERS:
+                raise ValueError(f"Unsupported transformer type: {entry['type']}")
+            transformers.append(TRANSFORMERS[entry["type"]].fromDict(entry))
+
+        return cls(transformers)
+
+    def save(self, file_path):
+        '''
+        Write fitted state to JSON file atomically
+        '''
+        temp_path = f"{file_path}.tmp"
+
+        with open(temp_path, 'w') as f:
+            json.dump(self.toDict(), f)
+
+        os.replace(temp_path, file_path)
+
+    @classmethod
+    def load(cls, file_path):
+        '''
+        Load fitted state from JSON file. Returns FeaturePipeline.
+        '''
+        with open(file_path, 'r') as f:
+            return cls.fromDict(json.load(f))
+
+
+def saveFeatureState(session, name, pipeline):
+    '''
+    Store fitted pipeline state in database under name, replacing any previous state. Commits session.
+    '''
+    row = session.query(FeatureState).filter(FeatureState.name == name).first()
+
+    if row is None:
+        row = FeatureState(name=name)
+        session.add(row)
+
+    row.state = json.dumps(pipeline.toDict())
+    session.commit()
+
+
+def loadFeatureState(session, name):
+    '''
+    Load fitted pipeline state stored under name. Returns FeaturePipeline, or None if no state saved.
+    '''
+    row = session.query(FeatureState).filter(FeatureState.name == name).first()
+
+    if row is None:
+        return None
+
+    return FeaturePipeline.fromDict(json.loads(row.state))
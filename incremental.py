@@ -0,0 +1,328 @@
+import csv
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from chunking import DEFAULT_CHUNK_SIZE, chunkRecords
+from dataLoader import iterFile
+from jsonCodec import loads
+from models import DataSource, RecordHash, StagedRecordHash
+
+# Keys looked up per query when checking stored content hashes
+HASH_LOOKUP_BATCH = 500
+# Changed keys held in memory before they are moved to the staging table
+MAX_PENDING_HASHES = 50000
+# Bytes hashed at the start and end of the data before a checkpoint offset
+DIGEST_BLOCK_SIZE = 1 << 16
+
+
+def contentHash(record):
+    '''
+    Hash full record content independent of key order. Returns 32 character hex digest.
+    '''
+    if not isinstance(record, dict):
+        # Compact rows are mappings but not dicts, which json cannot encode
+        record = dict(record)
+
+    encoded = json.dumps(record, sort_keys=True, default=str, separators=(',', ':')).encode()
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+def prefixDigest(f, offset, block_size=DIGEST_BLOCK_SIZE):
+    '''
+    Hash first and last block of binary file data before offset, so a rewrite of already processed data is noticed without rereading it. Returns 32 character hex digest.
+    '''
+    digest = hashlib.blake2b(str(offset).encode(), digest_size=16)
+    f.seek(0)
+    digest.update(f.read(min(block_size, offset)))
+
+    if offset > block_size:
+        f.seek(max(block_size, offset - block_size))
+        digest.update(f.read(offset - f.tell()))
+
+    return digest.hexdigest()
+
+
+def recordKey(record, key_fields):
+    '''
+    Encode record key field values as stable string. Returns JSON string.
+    '''
+    return json.dumps([record.get(field) for field in key_fields], default=str, separators=(',', ':'))
+
+
+class IncrementalFileReader:
+    '''
+    Reads only data appended to CSV or JSON Lines file since last checkpoint. Unchanged files yield nothing, truncated or rewritten files and JSON arrays are read in full. A file is taken as appended to only when the first and last block before the checkpoint offset still hash to last_digest. Checkpoint advances only past complete lines.
+    '''
+
+    def __init__(self, file_path, last_offset=None, last_size=None, last_mtime=None, checkpoint=None, last_digest=None):
+        self.file_path = file_path
+        self.last_offset = last_offset or 0
+        self.last_size = last_size
+        self.last_mtime = last_mtime
+        self.last_digest = last_digest
+        # Shared dict so callers see position advance while records stream
+        self.checkpoint = checkpoint if checkpoint is not None else {}
+        self.checkpoint.update({"last_offset": last_offset, "last_size": last_size, "last_mtime": last_mtime, "last_digest": last_digest})
+
+    def _startOffset(self, f, size, mtime):
+        '''
+        Decide where to resume reading. Returns byte offset, or None if file is unchanged.
+        '''
+        if self.last_size is not None and size == self.last_size and mtime == self.last_mtime:
+            return None
+
+        # Appended files keep everything before the old offset, anything else is reread
+        if self.last_size is not None and size >= self.last_size and self.last_offset <= size:
+            # Checkpoints saved without a digest cannot be verified and are trusted
+            if self.last_digest is None or prefixDigest(f, self.last_offset) == self.last_digest:
+                return self.last_offset
+
+        return 0
+
+    def _iterLines(self, f, offset):
+        '''
+        Read complete lines from binary file starting at offset, advancing checkpoint offset. Returns generator of decoded lines.
+        '''
+        f.seek(offset)
+
+        for line in f:
+            if not line.endswith(b'\n'):
+                # Partial line still being written, picked up by next run
+                return
+
+            offset += len(line)
+            self.checkpoint["last_offset"] = offset
+            yield line.decode()
+
+    def _iterRecords(self, f, offset):
+        if self.file_path.endswith('.csv'):
+            f.seek(0)
+            header = f.readline()
+            fieldnames = next(csv.reader([header.decode()]))
+            lines = self._iterLines(f, max(offset, len(header)))
+            return csv.DictReader(lines, fieldnames=fieldnames)
+
+        return (loads(line) for line in self._iterLines(f, offset) if line.strip())
+
+    def chunks(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        '''
+        Stream records added since checkpoint in bounded batches. Returns generator of record lists.
+        '''
+        stat = os.stat(self.file_path)
+
+        with open(self.file_path, 'rb') as f:
+            offset = self._startOffset(f, stat.st_size, stat.st_mtime)
+
+            if offset is None:
+                return
+
+            if not self.file_path.endswith(('.csv', '.jsonl', '.ndjson')):
+                # JSON arrays cannot be resumed mid-file, content hashes filter unchanged records
+                yield from iterFile(self.file_path, chunk_size)
+                self.checkpoint["last_offset"] = stat.st_size
+            else:
+                yield from chunkRecords(self._iterRecords(f, offset), chunk_size)
+
+            self.checkpoint["last_digest"] = prefixDigest(f, self.checkpoint["last_offset"])
+
+        self.checkpoint["last_size"] = stat.st_size
+        self.checkpoint["last_mtime"] = stat.st_mtime
+
+
+def watermarkKey(value):
+    '''
+    Sort key ordering watermark values numerically when they are numbers or numeric strings, such as epoch seconds, and as strings otherwise, such as ISO timestamps. Returns tuple.
+    '''
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (0, value)
+
+    text = str(value)
+
+    for parse in (int, float):
+        try:
+            return (0, parse(text))
+        except ValueError:
+            continue
+
+    return (1, text)
+
+
+class WatermarkTracker:
+    '''
+    Tracks highest value of updated-since field across streamed records. Values are compared with watermarkKey, so numeric watermarks order by value rather than by their digits. The checkpoint holds the highest value as string.
+    '''
+
+    def __init__(self, field, last_watermark=None, checkpoint=None):
+        self.field = field
+        self.checkpoint = checkpoint if checkpoint is not None else {}
+        self.checkpoint["last_watermark"] = last_watermark
+
+    def track(self, chunks):
+        '''
+        Pass chunks through while recording highest watermark value. Returns generator of record lists.
+        '''
+        current = self.checkpoint["last_watermark"]
+        current_key = watermarkKey(current) if current is not None else None
+
+        for chunk in chunks:
+            values = [r[self.field] for r in chunk if r.get(self.field) is not None]
+
+            if values:
+                highest = max(values, key=watermarkKey)
+                highest_key = watermarkKey(highest)
+
+                if current_key is None or highest_key > current_key:
+                    current_key = highest_key
+                    self.checkpoint["last_watermark"] = str(highest)
+
+            yield chunk
+
+
+class ChangeDetector:
+    '''
+    Filters records whose content hash matches the one stored for their key, so only new or changed records continue. Hashes of changed records are held in memory up to max_pending keys, then moved in their own transaction to the staging table, so memory stays bounded on large runs. Staged hashes only reach record_hashes at commit, so a failed run does not mark records as processed.
+    '''
+
+    def __init__(self, session, source_id, key_fields, max_pending=MAX_PENDING_HASHES):
+        if not key_fields:
+            raise ValueError("ChangeDetector needs key fields")
+
+        self.session = session
+        self.source_id = source_id
+        self.key_fields = list(key_fields)
+        self.max_pending = max_pending
+        self.pending = {}
+        self.staged_count = 0
+        self.new_count = 0
+        self.changed_count = 0
+        self.unchanged_count = 0
+        self._staging_cleared = False
+
+    def _lookup(self, model, keys):
+        '''
+        Look up hashes stored in model's table for keys in batches. Returns dict of record key to content hash.
+        '''
+        stored = {}
+
+        for start in range(0, len(keys), HASH_LOOKUP_BATCH):
+            batch = keys[start:start + HASH_LOOKUP_BATCH]
+            rows = self.session.query(model.record_key, model.content_hash).filter(
+                model.source_id == self.source_id, model.record_key.in_(batch)
+            )
+            stored.update(rows)
+
+        return stored
+
+    def _storedHashes(self, keys):
+        '''
+        Look up committed hashes for keys, overridden by hashes this run has staged. Returns dict of record key to content hash.
+        '''
+        keys = list(keys)
+        stored = self._lookup(RecordHash, keys)
+
+        if self.staged_count:
+            stored.update(self._lookup(StagedRecordHash, keys))
+
+        return stored
+
+    def _write(self, model, hashes):
+        '''
+        Insert or update hashes in model's table through session in batches, flushing each batch so the session does not hold every row
+        '''
+        items = list(hashes.items())
+
+        for start in range(0, len(items), HASH_LOOKUP_BATCH):
+            batch = dict(items[start:start + HASH_LOOKUP_BATCH])
+            existing = {
+                row.record_key: row
+                for row in self.session.query(model).filter(model.source_id == self.source_id, model.record_key.in_(list(batch)))
+            }
+
+            for key, digest in batch.items():
+                if key in existing:
+                    existing[key].content_hash = digest
+                else:
+                    self.session.add(model(source_id=self.source_id, record_key=key, content_hash=digest))
+
+            self.session.flush()
+
+    def _stage(self):
+        '''
+        Move pending hashes to staging table and commit them, emptying pending
+        '''
+        self._write(StagedRecordHash, self.pending)
+        self.session.commit()
+        self.staged_count += len(self.pending)
+        self.pending = {}
+
+    def filter(self, records):
+        '''
+        Keep records that are new or whose content changed since last committed run. Returns list of records.
+        '''
+        if not self._staging_cleared:
+            # Hashes staged by a run that failed before commit
+            self.session.query(StagedRecordHash).filter(StagedRecordHash.source_id == self.source_id).delete()
+            self.session.commit()
+            self._staging_cleared = True
+
+        hashed = [(recordKey(r, self.key_fields), contentHash(r), r) for r in records]
+        stored = self._storedHashes({key for key, _, _ in hashed if key not in self.pending})
+        changed_records = []
+
+        for key, digest, record in hashed:
+            previous = self.pending.get(key, stored.get(key))
+
+            if previous == digest:
+                self.unchanged_count += 1
+                continue
+
+            if key in stored or key in self.pending:
+                self.changed_count += 1
+            else:
+                self.new_count += 1
+
+            self.pending[key] = digest
+            changed_records.append(record)
+
+        if len(self.pending) >= self.max_pending:
+            self._stage()
+
+        return changed_records
+
+    def commit(self):
+        '''
+        Write staged and pending hashes to record_hashes through session and clear staging table, caller commits the transaction
+        '''
+        last_id = 0
+
+        while self.staged_count:
+            rows = self.session.query(StagedRecordHash.id, StagedRecordHash.record_key, StagedRecordHash.content_hash).filter(
+                StagedRecordHash.source_id == self.source_id, StagedRecordHash.id > last_id
+            ).order_by(StagedRecordHash.id).limit(HASH_LOOKUP_BATCH).all()
+
+            if not rows:
+                break
+
+            last_id = rows[-1].id
+            # Pending hashes are newer than staged ones for the same key
+            self._write(RecordHash, {row.record_key: row.content_hash for row in rows if row.record_key not in self.pending})
+
+        if self.staged_count:
+            self.session.query(StagedRecordHash).filter(StagedRecordHash.source_id == self.source_id).delete()
+
+        self._write(RecordHash, self.pending)
+        self.pending = {}
+        self.staged_count = 0
+
+
+def saveCheckpoint(session, source_id, checkpoint):
+    '''
+    Store checkpoint values on DataSource row and stamp last_run_at, caller commits the transaction
+    '''
+    data_source = session.get(DataSource, source_id)
+
+    for name, value in checkpoint.items():
+        setattr(data_source, name, value)
+
+    data_source.last_run_at = datetime.now(timezone.utc)
@@ -0,0 +1,199 @@
+import json
+import math
+import os
+from collections.abc import Mapping
+
+# Backends tried in order when JSON_BACKEND is auto, fastest first
+BACKEND_ORDER = ("orjson", "simdjson", "ujson", "json")
+# Backend name, or auto for the first installed one in BACKEND_ORDER
+JSON_BACKEND = os.getenv("JSON_BACKEND", "auto")
+
+
+def _encodeDefault(default):
+    '''
+    Wrap caller's default so mappings that are not dicts, such as compact rows, encode as objects. Returns callable for the backend's default hook.
+    '''
+    def encode(value):
+        if isinstance(value, Mapping):
+            return dict(value)
+        if default is not None:
+            return default(value)
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+    return encode
+
+
+def _stdlibLoads(data):
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    return json.loads(data)
+
+
+def _finite(value):
+    '''
+    Copy value with NaN and infinite floats replaced by None, as orjson encodes them. Returns value.
+    '''
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, Mapping):
+        return {key: _finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(item) for item in value]
+    return value
+
+
+def _stdlibDumps(value, default=None, sort_keys=False):
+    options = {"default": _encodeDefault(default), "sort_keys": sort_keys, "ensure_ascii": False, "separators": (',', ':'), "allow_nan": False}
+
+    try:
+        return json.dumps(value, **options).encode()
+    except ValueError:
+        # NaN and infinities become null rather than literals that are not valid JSON
+        return json.dumps(_finite(value), **options).encode()
+
+
+class JSONCodec:
+    '''
+    Decoder and encoder pair of one JSON backend. loads takes bytes, bytearray, memoryview or str, so raw network and file bytes are parsed without decoding to str first. dumps returns compact UTF-8 bytes. Input or values a fast backend rejects are retried with the standard library, so every backend accepts what json accepts, raising json.JSONDecodeError on invalid input. Output is the same on every backend: NaN and infinities encode as null, and datetimes and other non-JSON types go through default.
+    '''
+
+    def __init__(self, name, loads, dumps, encode_errors=(TypeError, ValueError, OverflowError)):
+        self.name = name
+        self._loads = loads
+        self._dumps = dumps
+        self._encode_errors = encode_errors
+
+    def loads(self, data):
+        '''
+        Decode JSON document. Returns decoded value. Raises json.JSONDecodeError if data is not valid JSON.
+        '''
+        if self._loads is _stdlibLoads:
+            return _stdlibLoads(data)
+
+        try:
+            return self._loads(data)
+        except ValueError:
+            # Big integers, NaN literals and UTF-16 input only parse with json, which also raises the usual error
+            return _stdlibLoads(data)
+
+    def dumps(self, value, default=None, sort_keys=False):
+        '''
+        Encode value as compact JSON. Optional default converts values the encoder does not know. Returns UTF-8 bytes. Raises TypeError for values that cannot be encoded.
+        '''
+        if self._dumps is _stdlibDumps:
+            return _stdlibDumps(value, default, sort_keys)
+
+        try:
+            return self._dumps(value, default, sort_keys)
+        except self._encode_errors:
+            return _stdlibDumps(value, default, sort_keys)
+
+
+def _orjsonCodec():
+    import orjson
+
+    def dumps(value, default=None, sort_keys=False):
+        # Datetimes and dataclasses go through default like they do with json
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        return orjson.dumps(value, default=_encodeDefault(default), option=option)
+
+    return JSONCodec("orjson", orjson.loads, dumps, (orjson.JSONEncodeError,))
+
+
+def _simdjsonCodec():
+    import simdjson
+
+    # simdjson only parses, encoding uses the standard library
+    return JSONCodec("simdjson", simdjson.loads, _stdlibDumps)
+
+
+def _ujsonCodec():
+    import ujson
+
+    def dumps(value, default=None, sort_keys=False):
+        return ujson.dumps(value, default=_encodeDefault(default), sort_keys=sort_keys, ensure_ascii=False, escape_forward_slashes=False, allow_nan=False).encode()
+
+    return JSONCodec("ujson", ujson.loads, dumps)
+
+
+BACKENDS = {
+    "orjson": _orjsonCodec,
+    "simdjson": _simdjsonCodec,
+    "ujson": _ujsonCodec,
+    "json": lambda: JSONCodec("json", _stdlibLoads, _stdlibDumps),
+}
+
+_codecs = {}
+_codec = None
+
+
+def getCodec(name="auto"):
+    '''
+    Get codec for backend name, or for the first installed backend in BACKEND_ORDER when name is auto. Codecs are built once per name. Returns JSONCodec. Raises ImportError if named backend is not installed, ValueError if it is unknown.
+    '''
+    if name == "auto":
+        for backend in BACKEND_ORDER:
+            try:
+                return getCodec(backend)
+            except ImportError:
+                continue
+
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown JSON backend: {name}, expected one of {', '.join(BACKENDS)}")
+
+    codec = _codecs.get(name)
+
+    if codec is None:
+        try:
+            codec = BACKENDS[name]()
+        except ImportError:
+            raise ImportError(f"{name} is not installed: pip install {'pysimdjson' if name == 'simdjson' else name}")
+        _codecs[name] = codec
+
+    return codec
+
+
+def availableBackends():
+    '''
+    Names of installed backends in preference order. Returns list of strings.
+    '''
+    available = []
+
+    for name in BACKEND_ORDER:
+        try:
+            getCodec(name)
+            available.append(name)
+        except ImportError:
+            pass
+
+    return available
+
+
+def setBackend(name):
+    '''
+    Switch codec used by loads and dumps. Returns JSONCodec now in use.
+    '''
+    global _codec
+    _codec = getCodec(name)
+    return _codec
+
+
+def currentCodec():
+    '''
+    Codec used by loads and dumps, chosen from JSON_BACKEND on first use. Returns JSONCodec.
+    '''
+    return _codec or setBackend(JSON_BACKEND)
+
+
+def loads(data):
+    '''
+    Decode JSON bytes or str with current backend. Returns decoded value. Raises json.JSONDecodeError on invalid input.
+    '''
+    return (_codec or currentCodec()).loads(data)
+
+
+def dumps(value, default=None, sort_keys=False):
+    '''
+    Encode value as compact UTF-8 JSON bytes with current backend. Returns bytes.
+    '''
+    return (_codec or currentCodec()).dumps(value, default, sort_keys)
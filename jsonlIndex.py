@@ -0,0 +1,276 @@
+import json
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_right
+from chunking import DEFAULT_CHUNK_SIZE, chunkRecords
+from jsonCodec import loads
+
+# Index cache file stored next to data file
+INDEX_SUFFIX = ".idx"
+INDEX_MAGIC = b"JLIDX001"
+# Indexed file size and mtime, used to detect appends and rewrites
+INDEX_HEADER = struct.Struct("<8sQq")
+# Bytes of lines, or records when indexed, decoded per loads call
+PARSE_BLOCK_SIZE = 1 << 20
+PARSE_BATCH_RECORDS = 4096
+
+
+def _openMap(f):
+    '''
+    Memory-map open binary file read-only. Returns mmap, or empty bytes for empty file since zero-length maps are not allowed.
+    '''
+    if os.fstat(f.fileno()).st_size == 0:
+        return b""
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _parseLine(data, start, end):
+    try:
+        return loads(data[start:end])
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON at byte {start}: {e}")
+
+
+def _parseBlock(data, start, end):
+    '''
+    Parse complete lines in data[start:end] with one loads call, avoiding per-line call overhead. Each line is wrapped in its own array so a malformed line cannot merge with its neighbours unnoticed. Returns list of records.
+    '''
+    lines = [line for line in data[start:end].split(b"\n") if line.strip()]
+
+    if not lines:
+        return []
+
+    try:
+        wrapped = loads(b"[[" + b"],[".join(lines) + b"]]")
+        if len(wrapped) == len(lines) and all(len(item) == 1 for item in wrapped):
+            return [item[0] for item in wrapped]
+    except json.JSONDecodeError:
+        pass
+
+    # Reparse line by line to report the offending line
+    records = []
+    pos = start
+    while pos < end:
+        newline = data.find(b"\n", pos, end)
+        line_end = end if newline == -1 else newline
+        if data[pos:line_end].strip():
+            records.append(_parseLine(data, pos, line_end))
+        pos = line_end + 1
+
+    return records
+
+
+def _scanLines(data, start, end, offsets):
+    '''
+    Append start offset of each non-blank complete line in data[start:end] to offsets. Returns byte offset just past last complete line.
+    '''
+    find = data.find
+    pos = start
+
+    while pos < end:
+        newline = find(b"\n", pos, end)
+        if newline == -1:
+            # Partial trailing line is not indexed until it is terminated
+            break
+        if data[pos:newline].strip():
+            offsets.append(pos)
+        pos = newline + 1
+
+    return pos
+
+
+def iterJsonlRange(file_path, byte_start=0, byte_end=None):
+    '''
+    Parse JSON Lines records from memory-mapped byte range without an index. A range starting mid-line skips to the next line and a line crossing byte_end is read to its end, so adjacent ranges cover each record exactly once. Returns generator of records.
+    '''
+    with open(file_path, "rb") as f:
+        data = _openMap(f)
+
+        try:
+            size = len(data)
+            byte_end = size if byte_end is None else min(byte_end, size)
+            pos = byte_start
+
+            if pos > 0 and data[pos - 1:pos] != b"\n":
+                newline = data.find(b"\n", pos)
+                pos = size if newline == -1 else newline + 1
+
+            if pos >= byte_end:
+                return
+
+            # Last line starting before byte_end is read to its end
+            newline = data.find(b"\n", byte_end - 1)
+            stop = size if newline == -1 else newline + 1
+
+            while pos < stop:
+                block_end = min(pos + PARSE_BLOCK_SIZE, stop)
+                if block_end < stop:
+                    newline = data.find(b"\n", block_end - 1, stop)
+                    block_end = stop if newline == -1 else newline + 1
+
+                yield from _parseBlock(data, pos, block_end)
+                pos = block_end
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
+
+
+class JsonlIndex:
+    '''
+    Line-offset index over a memory-mapped JSON Lines file for random access by record number. The index is cached next to the file and extended in place when the file has only been appended to.
+    '''
+
+    def __init__(self, file_path, cache_index=True):
+        self.file_path = file_path
+        self.index_path = file_path + INDEX_SUFFIX
+        self.cache_index = cache_index
+        # Start of each record followed by end of last complete line
+        self.offsets = array("q")
+        self._file = open(file_path, "rb")
+        self._data = _openMap(self._file)
+        self._build()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def indexed_bytes(self):
+        '''
+        Byte offset just past last indexed line, safe point for resuming appends
+        '''
+        return self.offsets[-1]
+
+    def _loadCached(self, size, mtime_ns):
+        '''
+        Load cached index if it matches file or covers a prefix of an appended file. Returns True when offsets were loaded.
+        '''
+        try:
+            with open(self.index_path, "rb") as f:
+                magic, indexed_size, indexed_mtime = INDEX_HEADER.unpack(f.read(INDEX_HEADER.size))
+                if magic != INDEX_MAGIC or indexed_size > size:
+                    return False
+                if indexed_size == size and indexed_mtime != mtime_ns:
+                    # Same size but rewritten, offsets cannot be trusted
+                    return False
+                offsets = array("q")
+                offsets.frombytes(f.read())
+        except (OSError, struct.error, ValueError):
+            return False
+
+        if not offsets:
+            return False
+
+        end = offsets[-1]
+        # Appends keep everything up to the last indexed newline intact
+        if end > size or (end > 0 and self._data[end - 1:end] != b"\n"):
+            return False
+
+        self.offsets = offsets
+        return True
+
+    def _saveCached(self, size, mtime_ns):
+        temp_path = f"{self.index_path}.{os.getpid()}.tmp"
+
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(INDEX_HEADER.pack(INDEX_MAGIC, size, mtime_ns))
+                self.offsets.tofile(f)
+            os.replace(temp_path, self.index_path)
+        except OSError:
+            # Read-only data directories still get an in-memory index
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+
+    def _build(self):
+        stat = os.fstat(self._file.fileno())
+        size = len(self._data)
+
+        if self.cache_index and self._loadCached(size, stat.st_mtime_ns):
+            start = self.offsets.pop()
+        else:
+            self.offsets = array("q")
+            start = 0
+
+        end = _scanLines(self._data, start, size, self.offsets)
+        self.offsets.append(end)
+
+        if self.cache_index and (start != end or not os.path.exists(self.index_path)):
+            self._saveCached(size, stat.st_mtime_ns)
+
+    def record(self, number):
+        '''
+        Parse single record by zero-based record number. Returns record. Raises IndexError when out of range.
+        '''
+        if number < 0:
+            number += len(self)
+        if not 0 <= number < len(self):
+            raise IndexError(f"Record {number} out of range for {len(self)} records")
+
+        return _parseLine(self._data, self.offsets[number], self.offsets[number + 1])
+
+    def records(self, start=0, stop=None):
+        '''
+        Parse records from start up to stop record number. Returns generator of records.
+        '''
+        stop = len(self) if stop is None else min(stop, len(self))
+        offsets = self.offsets
+
+        for batch_start in range(start, stop, PARSE_BATCH_RECORDS):
+            batch_stop = min(batch_start + PARSE_BATCH_RECORDS, stop)
+            yield from _parseBlock(self._data, offsets[batch_start], offsets[batch_stop])
+
+    def chunks(self, start=0, stop=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        '''
+        Stream records in range as bounded batches. Returns generator of record lists.
+        '''
+        return chunkRecords(self.records(start, stop), chunk_size)
+
+    def recordAt(self, byte_offset):
+        '''
+        Map byte offset, such as a saved checkpoint, to number of first record starting at or after it. Returns record number.
+        '''
+        return bisect_right(self.offsets, byte_offset - 1, 0, len(self))
+
+    def byteRange(self, start, stop):
+        '''
+        Byte span covering records start to stop. Returns (byte_start, byte_end) tuple.
+        '''
+        return self.offsets[start], self.offsets[min(stop, len(self))]
+
+    def shards(self, count):
+        '''
+        Split records into up to count contiguous ranges of roughly equal byte size for parallel workers. Returns list of (start, stop) record number tuples.
+        '''
+        total = len(self)
+        if total == 0:
+            return []
+
+        count = max(1, min(count, total))
+        begin = self.offsets[0]
+        span = self.offsets[-1] - begin
+        shards = []
+        start = 0
+
+        for shard in range(1, count):
+            target = begin + span * shard // count
+            stop = max(start + 1, min(total, bisect_right(self.offsets, target, 0, total)))
+            if stop >= total:
+                break
+            shards.append((start, stop))
+            start = stop
+
+        shards.append((start, total))
+        return shards
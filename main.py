@@ -1,7 +1,43 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Depends, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
 from contextlib import asynccontextmanager
-from database import initDatabase
-from config import validateConfig, ENVIRONMENT
+from sqlalchemy import select
+from database import initDatabase, getDb, getAsyncDb, getPoolMetrics, getEngine
+from config import validateConfig, ENVIRONMENT, PIPELINE_CONFIG_PATH, DB_AUTO_CREATE
+from pipeline import buildPipelineFromConfig
+from pipelineRuns import RunRegistry
+from models import DataSource
+from metrics import REGISTRY
+from profiling import loadSourceProfile
+from compactRows import toDicts
+from jsonCodec import dumps
+
+# Background pipeline runs started through the API
+run_registry = RunRegistry()
+
+DB_POOL_STATS = REGISTRY.gauge("data_pipeline_db_pool", "Database connection pool checkout and occupancy statistics", ("engine", "stat"))
+
+
+def collectPoolMetrics():
+    '''
+    Copy current connection pool statistics into pool gauge
+    '''
+    for engine_name, stats in getPoolMetrics().items():
+        for stat, value in stats.items():
+            DB_POOL_STATS.set(value, engine=engine_name, stat=stat)
+
+
+REGISTRY.addCollector(collectPoolMetrics)
+
+
+class CodecJSONResponse(JSONResponse):
+    '''
+    JSON response encoded with jsonCodec, using orjson or ujson when installed instead of the standard library encoder
+    '''
+
+    def render(self, content):
+        return dumps(content, default=str)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -10,17 +46,38 @@ async def lifespan(app: FastAPI):
     '''
     try:
         validateConfig()
-        initDatabase()
-        print(f"Database initialized (Environment: {ENVIRONMENT})")
+        # Schema work is skipped when migrate.py runs as a separate deploy step
+        if DB_AUTO_CREATE:
+            initDatabase()
+            print(f"Database initialized (Environment: {ENVIRONMENT})")
     except ValueError as e:
         print(f"Configuration error: {e}")
         raise
     
     yield
+    run_registry.shutdown(wait=False)
     print("Application shutdown")
 
 
-app = FastAPI(title="Data Pipeline API", version="1.0.0", lifespan=lifespan)
+app = FastAPI(title="Data Pipeline API", version="1.0.0", lifespan=lifespan, default_response_class=CodecJSONResponse)
+
+
+def buildNamedPipeline(name, session, sink_engine=None, read_only=False):
+    '''
+    Build pipeline by config name, mapping unknown pipelines or data sources to 404
+    '''
+    try:
+        return buildPipelineFromConfig(name, session, sink_engine, PIPELINE_CONFIG_PATH, read_only)
+    except (ValueError, FileNotFoundError) as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+def encodeNDJSON(chunks):
+    '''
+    Encode stream of record batches as newline-delimited JSON, one bytes block per batch
+    '''
+    for chunk in chunks:
+        yield b"".join([dumps(record, default=str) + b"\n" for record in toDicts(chunk)])
 
 
 @app.get("/health")
@@ -31,8 +88,80 @@ def checkHealth():
     return {"status": "healthy", "service": "data-pipeline"}
 
 
+@app.get("/sources")
+async def listDataSources(session=Depends(getAsyncDb)):
+    '''
+    List registered data sources through async session without using a threadpool worker
+    '''
+    result = await session.execute(select(DataSource).order_by(DataSource.name))
+    
+    return [
+        {"id": source.id, "name": source.name, "source_type": source.source_type, "endpoint": source.endpoint}
+        for source in result.scalars()
+    ]
+
+
+@app.get("/sources/{source_id}/profile")
+def getSourceProfile(source_id: int, bins: int = None, session=Depends(getDb)):
+    '''
+    Column statistics from profile stored by pipeline runs of data source: counts, null and empty rates, distinct estimates, min, max and quantiles. With bins, numeric columns also get equal-count thresholds for categorizeField.
+    '''
+    if session.get(DataSource, source_id) is None:
+        raise HTTPException(status_code=404, detail=f"Data source not found: {source_id}")
+
+    profile = loadSourceProfile(session, source_id)
+
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"No profile stored for data source: {source_id}")
+
+    return {"source_id": source_id, **profile.summary(n_bins=bins)}
+
+
+@app.post("/pipelines/{name}/runs", status_code=202)
+def startPipelineRun(name: str, session=Depends(getDb)):
+    '''
+    Start background run of named pipeline writing to its configured sink. Returns run id and initial status.
+    '''
+    pipeline = buildNamedPipeline(name, session, getEngine())
+    run = run_registry.submit(name, pipeline)
+    
+    return run.toDict()
+
+
+@app.get("/runs/{run_id}")
+def getPipelineRun(run_id: str):
+    '''
+    Poll status and per-stage progress of pipeline run
+    '''
+    run = run_registry.get(run_id)
+    
+    if run is None:
+        raise HTTPException(status_code=404, detail=f"Run not found: {run_id}")
+    
+    return run.toDict()
+
+
+@app.get("/pipelines/{name}/records")
+def streamPipelineRecords(name: str, session=Depends(getDb)):
+    '''
+    Run named pipeline read-only, without sink, output or feature state saving, and stream processed records as NDJSON while they are produced
+    '''
+    pipeline = buildNamedPipeline(name, session, read_only=True)
+    
+    # Sync generator is iterated in threadpool, stages run on their own threads
+    return StreamingResponse(encodeNDJSON(pipeline.stream()), media_type="application/x-ndjson")
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def getMetrics():
+    '''
+    Stage throughput, latency, dropped record counts, peak memory and pool statistics in Prometheus text format
+    '''
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
     import uvicorn
     from config import API_HOST, API_PORT
     
-    uvicorn.run(app, host=API_HOST, port=API_PORT)
\ No newline at end of file
+    uvicorn.run(app, host=API_HOST, port=API_PORT)
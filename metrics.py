@@ -0,0 +1,360 @@
+import functools
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from chunking import isChunkStream
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, peak memory gauge is left out
+    resource = None
+
+# Upper bounds in seconds for per-call and per-chunk stage latency
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+LATENCY_QUANTILES = (0.5, 0.9, 0.99)
+# Recent observations kept per label set for quantile estimates
+QUANTILE_SAMPLE_SIZE = 1024
+
+
+def _formatLabels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values)) + list(extra or [])
+    if not pairs:
+        return ""
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _formatValue(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    '''
+    Base for labelled metrics. Values are stored per tuple of label values in label name order.
+    '''
+
+    metric_type = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Metric {self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(labels[name] for name in self.labelnames)
+
+    def value(self, **labels):
+        '''
+        Current value for label set. Returns number, or None if never set.
+        '''
+        with self._lock:
+            return self._values.get(self._key(labels))
+
+    def samples(self):
+        '''
+        Exposition samples. Returns list of (suffix, label values, extra label pairs, value) tuples.
+        '''
+        with self._lock:
+            return [("", key, None, value) for key, value in self._values.items()]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+
+        for suffix, key, extra, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_formatLabels(self.labelnames, key, extra)} {_formatValue(value)}")
+
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    '''
+    Monotonically increasing total
+    '''
+
+    metric_type = "counter"
+
+    def inc(self, amount=1, **labels):
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    '''
+    Value that can go up and down
+    '''
+
+    metric_type = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    '''
+    Cumulative bucket counts with sum and count, plus bounded sample of recent observations for quantile estimates
+    '''
+
+    metric_type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS, sample_size=QUANTILE_SAMPLE_SIZE):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self.sample_size = sample_size
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0, "recent": deque(maxlen=self.sample_size)}
+
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][i] += 1
+                    break
+
+            state["sum"] += value
+            state["count"] += 1
+            state["recent"].append(value)
+
+    def quantiles(self, quantiles=LATENCY_QUANTILES, **labels):
+        '''
+        Estimate quantiles from recent observations. Returns dict of quantile to value, empty if nothing observed.
+        '''
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            recent = sorted(state["recent"]) if state else []
+
+        if not recent:
+            return {}
+
+        return {q: recent[min(len(recent) - 1, int(q * len(recent)))] for q in quantiles}
+
+    def samples(self):
+        samples = []
+
+        with self._lock:
+            for key, state in self._values.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets, state["counts"]):
+                    cumulative += count
+                    samples.append(("_bucket", key, [("le", _formatValue(bound))], cumulative))
+                samples.append(("_sum", key, None, state["sum"]))
+                samples.append(("_count", key, None, state["count"]))
+
+        return samples
+
+
+class MetricsRegistry:
+    '''
+    Named metrics rendered together in Prometheus text format. Collectors run before each render to refresh derived gauges.
+    '''
+
+    def __init__(self):
+        self.metrics = {}
+        self.collectors = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric_class, name, documentation, labelnames, **options):
+        with self._lock:
+            metric = self.metrics.get(name)
+
+            if metric is None:
+                metric = self.metrics[name] = metric_class(name, documentation, labelnames, **options)
+            elif not isinstance(metric, metric_class) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} already registered with different type or labels")
+
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def addCollector(self, collector):
+        '''
+        Register callable run before each render, for gauges derived from other state
+        '''
+        self.collectors.append(collector)
+
+    def render(self):
+        '''
+        Render all metrics in Prometheus text exposition format. Returns string.
+        '''
+        for collector in self.collectors:
+            collector()
+
+        with self._lock:
+            metrics = list(self.metrics.values())
+
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_RECORDS_IN = REGISTRY.counter("data_pipeline_stage_records_in_total", "Records passed into stage", ("stage",))
+STAGE_RECORDS_OUT = REGISTRY.counter("data_pipeline_stage_records_out_total", "Records returned by stage", ("stage",))
+STAGE_DROPPED = REGISTRY.counter("data_pipeline_stage_records_dropped_total", "Records removed by stage", ("stage", "reason"))
+STAGE_BUSY_SECONDS = REGISTRY.counter("data_pipeline_stage_busy_seconds_total", "Time spent inside stage", ("stage",))
+STAGE_LATENCY = REGISTRY.histogram("data_pipeline_stage_latency_seconds", "Stage latency per call or chunk", ("stage",))
+STAGE_LATENCY_QUANTILES = REGISTRY.gauge("data_pipeline_stage_latency_quantile_seconds", "Stage latency quantiles over recent calls or chunks", ("stage", "quantile"))
+STAGE_THROUGHPUT = REGISTRY.gauge("data_pipeline_stage_records_per_second", "Records processed per busy second", ("stage",))
+PEAK_MEMORY = REGISTRY.gauge("data_pipeline_process_peak_rss_bytes", "Peak resident memory of the process")
+
+
+def recordStage(stage, records_in, records_out, seconds, dropped_reason=None):
+    '''
+    Record one call or chunk of stage work. Called once per batch, never per record, so hot loops pay nothing.
+    '''
+    STAGE_RECORDS_IN.inc(records_in, stage=stage)
+    STAGE_RECORDS_OUT.inc(records_out, stage=stage)
+    STAGE_BUSY_SECONDS.inc(seconds, stage=stage)
+    STAGE_LATENCY.observe(seconds, stage=stage)
+
+    if dropped_reason and records_in > records_out:
+        STAGE_DROPPED.inc(records_in - records_out, stage=stage, reason=dropped_reason)
+
+
+def _collectStageGauges():
+    '''
+    Refresh throughput, latency quantile and peak memory gauges from recorded stage metrics
+    '''
+    for _, (stage,), _, busy in STAGE_BUSY_SECONDS.samples():
+        if busy > 0:
+            STAGE_THROUGHPUT.set(STAGE_RECORDS_IN.value(stage=stage) / busy, stage=stage)
+
+        for quantile, value in STAGE_LATENCY.quantiles(stage=stage).items():
+            STAGE_LATENCY_QUANTILES.set(value, stage=stage, quantile=str(quantile))
+
+    if resource is not None:
+        # ru_maxrss is kilobytes on Linux
+        PEAK_MEMORY.set(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024)
+
+
+REGISTRY.addCollector(_collectStageGauges)
+
+
+class StageTimer:
+    '''
+    Context manager timing one block of stage work. Set records_out inside the block, records_in defaults to it.
+    '''
+
+    def __init__(self, stage, records_in=None, dropped_reason=None):
+        self.stage = stage
+        self.records_in = records_in
+        self.records_out = 0
+        self.dropped_reason = dropped_reason
+        self._start = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            records_in = self.records_out if self.records_in is None else self.records_in
+            recordStage(self.stage, records_in, self.records_out, time.perf_counter() - self._start, self.dropped_reason)
+
+
+# Stages currently running in this thread, so nested per-chunk calls are not counted twice
+_active = threading.local()
+
+
+@contextmanager
+def _activeStage(stage):
+    stages = _active.__dict__.setdefault("stages", set())
+    stages.add(stage)
+    try:
+        yield
+    finally:
+        stages.discard(stage)
+
+
+def _isActive(stage):
+    return stage in _active.__dict__.get("stages", ())
+
+
+def _instrumentStream(stage, func, chunks, args, kwargs, dropped_reason):
+    '''
+    Run stage over chunk stream, recording each output chunk. Time spent pulling input chunks from upstream is excluded. Returns generator of record lists.
+    '''
+    upstream = {"seconds": 0.0, "records": 0}
+
+    def timedInput():
+        iterator = iter(chunks)
+        while True:
+            start = time.perf_counter()
+            chunk = next(iterator, None)
+            upstream["seconds"] += time.perf_counter() - start
+            if chunk is None:
+                return
+            upstream["records"] += len(chunk)
+            yield chunk
+
+    output = func(timedInput(), *args, **kwargs)
+
+    while True:
+        seconds_before = upstream["seconds"]
+        records_before = upstream["records"]
+        start = time.perf_counter()
+
+        with _activeStage(stage):
+            chunk = next(output, None)
+
+        if chunk is None:
+            return
+
+        elapsed = time.perf_counter() - start - (upstream["seconds"] - seconds_before)
+        recordStage(stage, upstream["records"] - records_before, len(chunk), elapsed, dropped_reason)
+        yield chunk
+
+
+def instrumentStage(stage, dropped_reason=None, counts_input=True):
+    '''
+    Decorator recording throughput, latency and dropped records for function taking records as first argument. Chunk stream inputs are recorded per chunk. With counts_input False, as for loaders taking a path, records in equals records out. Returns decorator.
+    '''
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            records = args[0] if args else None
+
+            if _isActive(stage):
+                return func(*args, **kwargs)
+
+            if counts_input and isChunkStream(records):
+                return _instrumentStream(stage, func, records, args[1:], kwargs, dropped_reason)
+
+            start = time.perf_counter()
+            with _activeStage(stage):
+                result = func(*args, **kwargs)
+            elapsed = time.perf_counter() - start
+
+            records_out = len(result) if hasattr(result, '__len__') else 0
+            records_in = len(records) if counts_input and hasattr(records, '__len__') else records_out
+            recordStage(stage, records_in, records_out, elapsed, dropped_reason)
+
+            return result
+
+        return wrapper
+
+    return decorator
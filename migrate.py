@@ -0,0 +1,11 @@
+from database import migrateDatabase
+
+# Run before starting the API with DB_AUTO_CREATE=false: python migrate.py
+
+if __name__ == "__main__":
+    changes = migrateDatabase()
+
+    for change in changes:
+        print(change)
+
+    print(f"Database schema up to date ({len(changes)} changes applied)")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Float, Text, ForeignKey, UniqueConstraint
 from sqlalchemy.sql import func
 from database import Base
 
@@ -10,5 +10,52 @@ class DataSource(Base):
     name = Column(String, unique=True, index=True)  # Name of data source
     source_type = Column(String)  # Type of source (api, database, file, etc)
     endpoint = Column(String)  # Connection endpoint or file path
+    last_cursor = Column(String)  # API pagination cursor reached by last successful run
+    last_watermark = Column(String)  # Highest updated-since value seen by last successful run
+    last_offset = Column(BigInteger)  # Byte offset of file processed by last successful run
+    last_size = Column(BigInteger)  # File size at last successful run
+    last_mtime = Column(Float)  # File modification time at last successful run
+    last_digest = Column(String(32))  # Hash of first and last block before last_offset, detects rewritten files
+    last_run_at = Column(DateTime(timezone=True))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
\ No newline at end of file
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+
+class RecordHash(Base):
+    __tablename__ = "record_hashes"
+    __table_args__ = (UniqueConstraint("source_id", "record_key"),)
+    
+    id = Column(Integer, primary_key=True)
+    source_id = Column(Integer, ForeignKey("data_sources.id"), index=True)
+    record_key = Column(String)  # JSON encoded key field values
+    content_hash = Column(String(32))  # Hash of full record content
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class StagedRecordHash(Base):
+    __tablename__ = "staged_record_hashes"
+    __table_args__ = (UniqueConstraint("source_id", "record_key"),)
+    
+    id = Column(Integer, primary_key=True)
+    source_id = Column(Integer, ForeignKey("data_sources.id"), index=True)
+    record_key = Column(String)  # JSON encoded key field values
+    content_hash = Column(String(32))  # Hash seen by a run not yet committed
+
+
+class FeatureState(Base):
+    __tablename__ = "feature_states"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, index=True)  # Name of fitted feature pipeline
+    state = Column(Text)  # Serialized transformer state as JSON
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+
+class SourceProfile(Base):
+    __tablename__ = "source_profiles"
+    
+    id = Column(Integer, primary_key=True)
+    source_id = Column(Integer, ForeignKey("data_sources.id"), unique=True, index=True)
+    profile = Column(Text)  # Serialized mergeable column sketches as JSON
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
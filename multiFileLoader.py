@@ -0,0 +1,114 @@
+import glob
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from chunking import DEFAULT_CHUNK_SIZE, chunkRecords
+from compressedInput import formatPath
+from dataLoader import readFile
+from metrics import instrumentStage
+from parallel import _PoolContext, orderedMap, unorderedMap
+
+SUPPORTED_FORMATS = ('.csv', '.json', '.jsonl', '.ndjson')
+GLOB_CHARACTERS = frozenset('*?[')
+
+
+def isMultiFileSource(endpoint):
+    '''
+    Check whether file source endpoint names a directory or glob pattern rather than one file. Returns bool.
+    '''
+    return os.path.isdir(endpoint) or any(character in GLOB_CHARACTERS for character in endpoint)
+
+
+def expandPaths(sources):
+    '''
+    Expand path, directory or glob pattern, or list of them, into file paths. Directories contribute their supported data files, sorted. Glob patterns support ** and are sorted. Plain paths are kept even if missing so their error is reported per file. Returns list of unique paths in source order.
+    '''
+    if isinstance(sources, str):
+        sources = [sources]
+
+    paths = []
+
+    for source in sources:
+        if os.path.isdir(source):
+            names = sorted(entry.path for entry in os.scandir(source) if entry.is_file())
+            paths.extend(name for name in names if formatPath(name).endswith(SUPPORTED_FORMATS))
+        elif any(character in GLOB_CHARACTERS for character in source):
+            paths.extend(path for path in sorted(glob.glob(source, recursive=True)) if os.path.isfile(path))
+        else:
+            paths.append(source)
+
+    # Returns paths once each, keeping first position
+    return list(dict.fromkeys(paths))
+
+
+def _readFileTask(file_path):
+    '''
+    Worker task reading one file. Errors are returned rather than raised so one bad file does not stop the others. Returns (path, records, error message or None, seconds).
+    '''
+    start = time.perf_counter()
+
+    try:
+        records = readFile(file_path)
+        error = None
+    except Exception as e:
+        records = []
+        error = f"{type(e).__name__}: {e}"
+
+    return file_path, records, error, time.perf_counter() - start
+
+
+def iterFiles(sources, chunk_size=DEFAULT_CHUNK_SIZE, max_workers=None, processes=False, ordered=True, executor=None, results=None):
+    '''
+    Read files named by paths, directories or glob patterns concurrently, on a thread pool for I/O-bound input or with processes set a process pool for parse-heavy CSV. Batches of each file are yielded as soon as it is read, in path order when ordered is set, else in completion order. Files that fail are skipped and reported. When results list is given, a dict of path, records, error and seconds is appended for every file. Returns generator of record lists.
+    '''
+    paths = expandPaths(sources)
+
+    if not paths:
+        print(f"No files matched: {sources}")
+        return
+
+    pool_class = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    mapper = orderedMap if ordered else unorderedMap
+
+    pool_context = _PoolContext(executor, max_workers, pool_class)
+
+    with pool_context as pool:
+        for file_path, records, error, seconds in mapper(pool, _readFileTask, paths, pool_context.window):
+            if results is not None:
+                results.append({"path": file_path, "records": len(records), "error": error, "seconds": seconds})
+
+            if error is not None:
+                print(f"Error loading from file {file_path}: {error}")
+                continue
+
+            # Yields batches of at most chunk_size records from finished file
+            yield from chunkRecords(records, chunk_size)
+
+
+def loadFromFilesWithReport(sources, max_workers=None, processes=False, ordered=True, executor=None):
+    '''
+    Load all records from files named by paths, directories or glob patterns, reading files concurrently. Same arguments as iterFiles. Returns tuple of records list and per-file results list.
+    '''
+    records = []
+    results = []
+
+    for chunk in iterFiles(sources, DEFAULT_CHUNK_SIZE, max_workers, processes, ordered, executor, results):
+        records.extend(chunk)
+
+    # Returns records from every readable file with one result per file
+    return records, results
+
+
+@instrumentStage("loadFromFiles", counts_input=False)
+def loadFromFiles(sources, max_workers=None, processes=False, ordered=True, executor=None):
+    '''
+    Load all records from files named by paths, directories or glob patterns, reading files concurrently. Same arguments as iterFiles. Returns list of records from every file that could be read.
+    '''
+    records, results = loadFromFilesWithReport(sources, max_workers, processes, ordered, executor)
+    failed = sum(1 for result in results if result["error"] is not None)
+
+    if failed:
+        print(f"Skipped {failed} of {len(results)} files that could not be read")
+
+    # Returns list of records from readable files
+    return records
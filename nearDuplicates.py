@@ -0,0 +1,262 @@
+import random
+import zlib
+from array import array
+from functools import lru_cache
+from itertools import chain
+from operator import eq
+
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_NUM_PERM = 64
+DEFAULT_SHINGLE_SIZE = 3
+# Shingles hashed per NumPy pass, bounds the num_perm x shingles work matrix
+SIGNATURE_BATCH_SHINGLES = 1 << 15
+# Points used to integrate LSH candidate probability when choosing bands
+BAND_INTEGRATION_STEPS = 50
+MASK64 = (1 << 64) - 1
+FIELD_SEPARATOR = "\x1f"
+
+
+def _loadNumpy():
+    '''
+    Import NumPy on first use. Returns numpy module, or None when not installed so signatures fall back to pure Python.
+    '''
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def normalizeText(record, fields):
+    '''
+    Join chosen field values as lowercase text with whitespace runs collapsed, so records differing only in casing or spacing shingle identically. Returns string, empty when all fields are blank.
+    '''
+    parts = []
+
+    for field in fields:
+        value = record.get(field)
+        parts.append("" if value is None else " ".join(str(value).lower().split()))
+
+    text = FIELD_SEPARATOR.join(parts)
+    return text if text.strip(FIELD_SEPARATOR) else ""
+
+
+def shingleHashes(text, size=DEFAULT_SHINGLE_SIZE):
+    '''
+    Hash distinct character shingles of text with CRC32. Text shorter than size is one shingle. Returns list of ints, empty for empty text.
+    '''
+    data = text.encode()
+
+    if len(data) <= size:
+        return [zlib.crc32(data)] if data else []
+
+    crc32 = zlib.crc32
+    return [crc32(shingle) for shingle in {data[i:i + size] for i in range(len(data) - size + 1)}]
+
+
+def _candidateProbability(similarity, bands, rows):
+    return 1 - (1 - similarity ** rows) ** bands
+
+
+@lru_cache(maxsize=64)
+def chooseBands(num_perm, threshold):
+    '''
+    Pick LSH bands and rows per band for num_perm hash functions, minimising the summed false positive area below threshold and false negative area above it. Returns (bands, rows) tuple.
+    '''
+    def area(start, end, miss):
+        step = (end - start) / BAND_INTEGRATION_STEPS
+        points = (start + (i + 0.5) * step for i in range(BAND_INTEGRATION_STEPS))
+        return sum(miss(point) for point in points) * step
+
+    best = None
+
+    for bands in range(1, num_perm + 1):
+        for rows in range(1, num_perm // bands + 1):
+            false_positive = area(0.0, threshold, lambda s: _candidateProbability(s, bands, rows))
+            false_negative = area(threshold, 1.0, lambda s: 1 - _candidateProbability(s, bands, rows))
+            error = false_positive + false_negative
+
+            if best is None or error < best[0]:
+                best = (error, bands, rows)
+
+    return best[1], best[2]
+
+
+class NearDuplicateDetector:
+    '''
+    Streaming near-duplicate clustering with MinHash signatures over shingled string fields and LSH banding. Each record is compared only with earlier records sharing a band bucket, and joins the cluster of the first one whose estimated Jaccard similarity reaches threshold. The first record of a cluster is its representative.
+    '''
+
+    def __init__(self, fields, threshold=DEFAULT_THRESHOLD, num_perm=DEFAULT_NUM_PERM, shingle_size=DEFAULT_SHINGLE_SIZE, bands=None, seed=1):
+        if not fields:
+            raise ValueError("NearDuplicateDetector needs at least one field")
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold must be between 0 and 1")
+        if num_perm < 1 or (bands is not None and not 1 <= bands <= num_perm):
+            raise ValueError("num_perm must be positive and bands between 1 and num_perm")
+
+        self.fields = list(fields)
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands, self.rows = (bands, num_perm // bands) if bands else chooseBands(num_perm, threshold)
+
+        # Multiply-shift hash family, one (a, b) pair per permutation
+        rng = random.Random(seed)
+        self._params = [(rng.getrandbits(64) | 1, rng.getrandbits(64)) for _ in range(num_perm)]
+        self._np = _loadNumpy()
+
+        if self._np is not None:
+            self._a = self._np.array([a for a, _ in self._params], dtype=self._np.uint64).reshape(-1, 1)
+            self._b = self._np.array([b for _, b in self._params], dtype=self._np.uint64).reshape(-1, 1)
+
+        self._buckets = [{} for _ in range(self.bands)]
+        # Signatures kept only for records stored in a bucket, the only ones ever compared against
+        self._signatures = {}
+        # Representative record number for each record seen
+        self.cluster_of = array("q")
+
+        self.records_seen = 0
+        self.duplicates_removed = 0
+        self.comparisons = 0
+
+    def _signaturePython(self, hashes):
+        return array("I", [min(((a * x + b) & MASK64) >> 32 for x in hashes) for a, b in self._params]).tobytes()
+
+    def _signaturesNumpy(self, hash_lists, signatures):
+        '''
+        Fill signatures for non-empty hash lists, hashing shingles of many records per vectorised pass
+        '''
+        np = self._np
+        pending = []
+        sizes = []
+
+        def flush():
+            flat = np.fromiter(chain.from_iterable(hash_lists[i] for i in pending), dtype=np.uint64, count=sum(sizes))
+            # uint64 arithmetic wraps, matching the & MASK64 of the Python path
+            values = ((self._a * flat + self._b) >> np.uint64(32)).astype(np.uint32)
+            starts = np.zeros(len(sizes), dtype=np.intp)
+            np.cumsum(sizes[:-1], out=starts[1:])
+            rows = np.ascontiguousarray(np.minimum.reduceat(values, starts, axis=1).T)
+
+            for row, i in zip(rows, pending):
+                signatures[i] = row.tobytes()
+
+            pending.clear()
+            sizes.clear()
+
+        total = 0
+
+        for i, hashes in enumerate(hash_lists):
+            if hashes:
+                pending.append(i)
+                sizes.append(len(hashes))
+                total += len(hashes)
+                if total >= SIGNATURE_BATCH_SHINGLES:
+                    flush()
+                    total = 0
+
+        if pending:
+            flush()
+
+    def signatures(self, records):
+        '''
+        MinHash signatures of chosen fields for batch of records, packed as uint32 bytes. Returns list of bytes, None for records with all fields blank.
+        '''
+        hash_lists = [shingleHashes(normalizeText(record, self.fields), self.shingle_size) for record in records]
+        signatures = [None] * len(hash_lists)
+
+        if self._np is not None:
+            self._signaturesNumpy(hash_lists, signatures)
+        else:
+            for i, hashes in enumerate(hash_lists):
+                if hashes:
+                    signatures[i] = self._signaturePython(hashes)
+
+        return signatures
+
+    def similarity(self, left, right):
+        '''
+        Estimate Jaccard similarity as fraction of matching signature positions. Returns float.
+        '''
+        if self._np is not None:
+            np = self._np
+            return int(np.count_nonzero(np.frombuffer(left, dtype=np.uint32) == np.frombuffer(right, dtype=np.uint32))) / self.num_perm
+
+        return sum(map(eq, array("I", left), array("I", right))) / self.num_perm
+
+    def assign(self, signature):
+        '''
+        Place next record by its signature. Records without signature are never clustered. Returns representative record number.
+        '''
+        number = self.records_seen
+        self.records_seen += 1
+
+        if signature is None:
+            self.cluster_of.append(number)
+            return number
+
+        width = self.rows * 4
+        match = None
+        stored = False
+
+        for band, buckets in enumerate(self._buckets):
+            key = hash(signature[band * width:(band + 1) * width])
+            members = buckets.get(key)
+
+            if members is None:
+                buckets[key] = [number]
+                stored = True
+                continue
+
+            for member in members:
+                self.comparisons += 1
+                if self.similarity(self._signatures[member], signature) >= self.threshold:
+                    match = member
+                    break
+
+            if match is not None:
+                # Cluster is already reachable through the matched record
+                break
+
+            members.append(number)
+            stored = True
+
+        if stored:
+            self._signatures[number] = signature
+
+        representative = number if match is None else self.cluster_of[match]
+        self.cluster_of.append(representative)
+
+        if match is not None:
+            self.duplicates_removed += 1
+
+        return representative
+
+    def filter(self, records):
+        '''
+        Keep records that are not near-duplicates of an earlier record. Returns list of cluster representatives.
+        '''
+        start = self.records_seen
+        signatures = self.signatures(records)
+        assign = self.assign
+
+        return [record for number, (record, signature) in enumerate(zip(records, signatures), start) if assign(signature) == number]
+
+    def filterChunks(self, chunks):
+        '''
+        Remove near-duplicates across stream of record batches. Returns generator of representative batches.
+        '''
+        for chunk in chunks:
+            yield self.filter(chunk)
+
+    def clusters(self, min_size=2):
+        '''
+        Group record numbers seen so far by representative. Returns dict of representative number to list of member numbers, representative first.
+        '''
+        groups = {}
+
+        for number, representative in enumerate(self.cluster_of):
+            groups.setdefault(representative, []).append(number)
+
+        return {representative: members for representative, members in groups.items() if len(members) >= min_size}
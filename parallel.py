@@ -0,0 +1,316 @@
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from chunking import DEFAULT_CHUNK_SIZE, chunkRecords, isChunkStream
+from compactRows import rowType
+from dataCleaner import cleanDataWithReport, removeDuplicates
+from featureEngine import numericRange, applyFeatures, checkFitInputs, withRatioFeatures
+from profiling import DataProfile, DEFAULT_K, DEFAULT_PRECISION
+
+
+def orderedMap(executor, func, items, window=None):
+    '''
+    Map func over items on executor keeping at most window tasks in flight, twice the CPU count by default. Returns generator of results in input order.
+    '''
+    window = window or 2 * (os.cpu_count() or 1)
+    pending = deque()
+
+    for item in items:
+        pending.append(executor.submit(func, item))
+
+        if len(pending) >= window:
+            yield pending.popleft().result()
+
+    while pending:
+        yield pending.popleft().result()
+
+
+def unorderedMap(executor, func, items, window=None):
+    '''
+    Map func over items on executor keeping at most window tasks in flight, twice the CPU count by default. Returns generator of results in completion order.
+    '''
+    window = window or 2 * (os.cpu_count() or 1)
+    pending = set()
+
+    for item in items:
+        pending.add(executor.submit(func, item))
+
+        if len(pending) >= window:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield future.result()
+
+
+class _PoolContext:
+    '''
+    Use caller's executor or own a new pool, a process pool unless pool_class is given, for duration of one parallel call
+    '''
+
+    def __init__(self, executor, max_workers, pool_class=ProcessPoolExecutor):
+        self.executor = executor
+        self.max_workers = max_workers
+        self.pool_class = pool_class
+        self.owned = None
+
+    def __enter__(self):
+        if self.executor is not None:
+            return self.executor
+
+        self.owned = self.pool_class(max_workers=self.max_workers)
+        return self.owned
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.owned is not None:
+            self.owned.shutdown(cancel_futures=exc_type is not None)
+
+    @property
+    def window(self):
+        '''
+        Tasks to keep in flight, twice the worker count so workers never wait on submission. Returns int.
+        '''
+        workers = self.max_workers
+
+        if workers is None:
+            cpus = os.cpu_count() or 1
+            # Same default as the pool class uses
+            workers = min(32, cpus + 4) if self.pool_class is ThreadPoolExecutor else cpus
+
+        return 2 * workers
+
+
+def _splitChunks(records, chunk_size):
+    '''
+    Split list into chunks, passing chunk streams through unchanged. Returns list of chunks for lists, iterator for streams.
+    '''
+    if isChunkStream(records):
+        return records
+
+    if not isinstance(records, list):
+        records = [records]
+
+    return list(chunkRecords(records, chunk_size))
+
+
+def _cleanChunk(task):
+    '''
+    Worker task cleaning one chunk. Takes (chunk, schema, required_fields, row_offset, row_spec) where row_spec is (fields, init_count) of a compact row type or None. Returns (cleaned records, rejections).
+    '''
+    chunk, schema, required_fields, row_offset, row_spec = task
+    # Generated row classes cannot be pickled, workers rebuild them from their fields
+    row_type = rowType(*row_spec) if row_spec is not None else None
+    return cleanDataWithReport(chunk, schema, required_fields, row_offset, row_type)
+
+
+def _chunkKeys(task):
+    '''
+    Worker task for first dedupe phase. Takes (chunk, key_fields). Returns list of (index, key) for first occurrence of each key within chunk.
+    '''
+    chunk, key_fields = task
+    seen = set()
+    firsts = []
+
+    for index, record in enumerate(chunk):
+        key_tuple = tuple(record.get(field) for field in key_fields)
+
+        if key_tuple not in seen:
+            seen.add(key_tuple)
+            firsts.append((index, key_tuple))
+
+    return firsts
+
+
+def _chunkRanges(task):
+    '''
+    Worker task for first normalize phase. Takes (chunk, feature_specs, fields). Ratio features are computed first so derived fields have ranges. Returns dict of field to (min, max) or None.
+    '''
+    chunk, feature_specs, fields = task
+    chunk = withRatioFeatures(chunk, feature_specs)
+    return {field: numericRange(chunk, field) for field in fields}
+
+
+def _featureChunk(task):
+    '''
+    Worker task applying feature specs to one chunk with precomputed normalize bounds. Takes (chunk, feature_specs, ranges). Returns featured chunk.
+    '''
+    chunk, feature_specs, ranges = task
+    return applyFeatures(chunk, feature_specs, ranges)
+
+
+def mergeRanges(range_list):
+    '''
+    Reduce per-chunk (min, max) dicts into global bounds per field. Returns dict of field to (min, max) or None when field had no values.
+    '''
+    merged = {}
+
+    for ranges in range_list:
+        for field, value_range in ranges.items():
+            current = merged.get(field)
+
+            if value_range is None:
+                merged.setdefault(field, None)
+            elif current is None:
+                merged[field] = value_range
+            else:
+                merged[field] = (min(current[0], value_range[0]), max(current[1], value_range[1]))
+
+    return merged
+
+
+def parallelCleanDataWithReport(records, schema, required_fields=None, max_workers=None, chunk_size=DEFAULT_CHUNK_SIZE, executor=None, row_type=None):
+    '''
+    Clean records across process pool, preserving input order and merging rejection reports from all workers. Takes records list, schema dict, optional required fields, worker count, chunk size, optional existing executor and optional compact row type. Returns tuple of cleaned records list and rejections list.
+    '''
+    if not records or not schema:
+        return [], []
+
+    chunks = _splitChunks(records, chunk_size)
+
+    # Single chunk is cheaper to clean inline than to ship to a worker
+    if isinstance(chunks, list) and len(chunks) <= 1 and executor is None:
+        return cleanDataWithReport(chunks[0] if chunks else [], schema, required_fields, row_type=row_type)
+
+    row_spec = (row_type._fields, row_type._init_count) if row_type is not None else None
+
+    def tasks():
+        row_offset = 0
+        for chunk in chunks:
+            yield chunk, schema, required_fields, row_offset, row_spec
+            row_offset += len(chunk)
+
+    cleaned_records = []
+    rejections = []
+
+    pool_context = _PoolContext(executor, max_workers)
+
+    with pool_context as pool:
+        for cleaned, chunk_rejections in orderedMap(pool, _cleanChunk, tasks(), pool_context.window):
+            cleaned_records.extend(cleaned)
+            rejections.extend(chunk_rejections)
+
+    # Returns cleaned records in input order with merged rejection report
+    return cleaned_records, rejections
+
+
+def parallelCleanData(records, schema, required_fields=None, max_workers=None, chunk_size=DEFAULT_CHUNK_SIZE, executor=None, row_type=None):
+    '''
+    Clean records across process pool, preserving input order. Same arguments as parallelCleanDataWithReport. Returns list of valid cleaned records.
+    '''
+    cleaned_records, rejections = parallelCleanDataWithReport(records, schema, required_fields, max_workers, chunk_size, executor, row_type)
+
+    if rejections:
+        print(f"Skipped {len(rejections)} invalid records during cleaning")
+
+    # Returns list of successfully cleaned and validated records
+    return cleaned_records
+
+
+def parallelRemoveDuplicates(records, key_fields, max_workers=None, chunk_size=DEFAULT_CHUNK_SIZE, executor=None):
+    '''
+    Remove duplicates with two-phase reduce. Workers dedupe keys within each chunk, then parent merges chunk results in order against global seen set so first occurrence wins. Returns deduplicated list of records.
+    '''
+    if not records or not key_fields:
+        return records
+
+    chunks = _splitChunks(records, chunk_size)
+
+    if isinstance(chunks, list) and len(chunks) <= 1 and executor is None:
+        return removeDuplicates(records, key_fields)
+
+    seen = set()
+    unique_records = []
+    total = 0
+    # Chunks awaiting their phase-one result, in submission order
+    in_flight = deque()
+
+    def tasks():
+        for chunk in chunks:
+            in_flight.append(chunk)
+            yield chunk, key_fields
+
+    pool_context = _PoolContext(executor, max_workers)
+
+    with pool_context as pool:
+        for firsts in orderedMap(pool, _chunkKeys, tasks(), pool_context.window):
+            chunk = in_flight.popleft()
+            total += len(chunk)
+
+            for index, key_tuple in firsts:
+                if key_tuple not in seen:
+                    seen.add(key_tuple)
+                    unique_records.append(chunk[index])
+
+    duplicates_removed = total - len(unique_records)
+    if duplicates_removed > 0:
+        print(f"Removed {duplicates_removed} duplicate records")
+
+    # Returns deduplicated list of records
+    return unique_records
+
+
+def parallelApplyFeatures(records, feature_specs, max_workers=None, chunk_size=DEFAULT_CHUNK_SIZE, executor=None):
+    '''
+    Apply feature specs across process pool, preserving order. Normalize specs use two-phase reduce so every chunk is scaled with global min/max, including on fields derived by ratio specs. Takes records list and feature spec dicts as accepted by applyFeatures. Returns list of records with features added. Raises ValueError for normalize specs on normalize or categorize outputs.
+    '''
+    if not records or not feature_specs:
+        return records
+
+    checkFitInputs(feature_specs)
+
+    chunks = _splitChunks(records, chunk_size)
+
+    if not isinstance(chunks, list):
+        raise ValueError("parallelApplyFeatures needs a list of records, chunk streams cannot be scanned twice")
+
+    if len(chunks) <= 1 and executor is None:
+        return applyFeatures(records, feature_specs)
+
+    normalize_fields = [spec["field"] for spec in feature_specs if spec.get("type") == "normalize"]
+    featured = []
+
+    pool_context = _PoolContext(executor, max_workers)
+
+    with pool_context as pool:
+        ranges = None
+
+        if normalize_fields:
+            ranges = mergeRanges(orderedMap(pool, _chunkRanges, ((chunk, feature_specs, normalize_fields) for chunk in chunks), pool_context.window))
+
+        for chunk in orderedMap(pool, _featureChunk, ((chunk, feature_specs, ranges) for chunk in chunks), pool_context.window):
+            featured.extend(chunk)
+
+    # Returns records with features added in input order
+    return featured
+
+
+def _profileChunk(task):
+    '''
+    Worker task profiling one chunk. Takes (chunk, fields, k, precision). Returns DataProfile.
+    '''
+    chunk, fields, k, precision = task
+    return DataProfile(fields, k, precision).update(chunk)
+
+
+def parallelProfile(records, fields=None, max_workers=None, chunk_size=DEFAULT_CHUNK_SIZE, executor=None, k=DEFAULT_K, precision=DEFAULT_PRECISION):
+    '''
+    Profile records across process pool, merging per-chunk sketches in input order. Takes records list or chunk stream. Returns DataProfile.
+    '''
+    profile = DataProfile(fields, k, precision)
+
+    if not records:
+        return profile
+
+    chunks = _splitChunks(records, chunk_size)
+
+    pool_context = _PoolContext(executor, max_workers)
+
+    with pool_context as pool:
+        for chunk_profile in orderedMap(pool, _profileChunk, ((chunk, fields, k, precision) for chunk in chunks), pool_context.window):
+            profile.merge(chunk_profile)
+
+    # Returns profile equivalent to one pass over all records
+    return profile
@@ -0,0 +1,559 @@
+import os
+import queue
+import threading
+import time
+from chunking import DEFAULT_CHUNK_SIZE, chunkRecords
+from columnarStore import openColumnarWriter
+from compactRows import rowTypeForSchema
+from config import loadConfigFile
+from dataCleaner import cleanDataWithReport
+from dataLoader import iterFile, loadFromAPI
+from dedupeEngine import DedupeEngine, DEFAULT_MAX_MEMORY_KEYS
+from featureState import FeaturePipeline
+from incremental import IncrementalFileReader, WatermarkTracker, ChangeDetector, saveCheckpoint
+from metrics import recordStage
+from models import DataSource
+from multiFileLoader import isMultiFileSource, iterFiles
+from nearDuplicates import NearDuplicateDetector, DEFAULT_THRESHOLD
+from profiling import DataProfile, DEFAULT_K, DEFAULT_PRECISION, saveSourceProfile
+from recordSink import RecordSink
+from sqlalchemy.orm import Session
+
+# Chunks buffered between two stages before the upstream stage blocks
+DEFAULT_QUEUE_SIZE = 4
+DEFAULT_CONFIG_PATH = "config.yaml"
+
+_END = object()
+
+
+class PipelineError(RuntimeError):
+    '''
+    Raised when a pipeline stage fails, carrying the failing stage name
+    '''
+
+    def __init__(self, stage_name, error):
+        super().__init__(f"Pipeline stage {stage_name} failed: {error}")
+        self.stage_name = stage_name
+        self.error = error
+
+
+class PipelineStage:
+    '''
+    Named pipeline step applying func to each chunk. Func returns transformed chunk, or None to drop it. Optional on_finish runs after last chunk of a successful run, on_close after every run. Tracks throughput counters for progress reporting and records them to metrics, labelling records the stage removes with dropped_reason.
+    '''
+
+    def __init__(self, name, func, on_finish=None, on_close=None, dropped_reason=None):
+        self.name = name
+        self.func = func
+        self.on_finish = on_finish
+        self.on_close = on_close
+        self.dropped_reason = dropped_reason
+        # Stage label in metrics, prefixed with pipeline name once added to a pipeline
+        self.metric_name = name
+        self.counters = {}
+        self.status = "pending"
+        self.chunks = 0
+        self.records_in = 0
+        self.records_out = 0
+        self.busy_seconds = 0.0
+
+    def process(self, chunk):
+        '''
+        Run func on chunk and update counters. Returns output chunk or None.
+        '''
+        start = time.perf_counter()
+        output = self.func(chunk)
+        elapsed = time.perf_counter() - start
+        records_out = len(output) if output is not None else 0
+
+        self.busy_seconds += elapsed
+        self.chunks += 1
+        self.records_in += len(chunk)
+        self.records_out += records_out
+        recordStage(self.metric_name, len(chunk), records_out, elapsed, self.dropped_reason)
+
+        return output
+
+    def progress(self):
+        '''
+        Snapshot of stage counters. Returns dict.
+        '''
+        return {
+            "name": self.name,
+            "status": self.status,
+            "chunks": self.chunks,
+            "records_in": self.records_in,
+            "records_out": self.records_out,
+            "busy_seconds": round(self.busy_seconds, 3),
+            **self.counters,
+        }
+
+
+class Pipeline:
+    '''
+    Runs source and stages concurrently, one thread each, linked by bounded queues. A full queue blocks the stage feeding it, so memory stays bounded by queue_size chunks per link.
+    '''
+
+    def __init__(self, source, stages, queue_size=DEFAULT_QUEUE_SIZE, name="pipeline"):
+        self.source = source
+        self.stages = list(stages)
+        self.queue_size = queue_size
+        self.name = name
+        self.source_stage = PipelineStage("load", None)
+        self.error = None
+
+        for stage in [self.source_stage] + self.stages:
+            stage.metric_name = f"{name}.{stage.name}"
+
+        # Callables run once after every chunk has been consumed without error
+        self.on_complete = []
+        # DataProfile filled by profile stage, when configured
+        self.profile = None
+        # Per-file read results of directory and glob file sources
+        self.file_results = []
+        self._stop = threading.Event()
+
+    def _put(self, target, item):
+        '''
+        Put item on queue, giving up if pipeline is stopping. Returns True if item was queued.
+        '''
+        while not self._stop.is_set():
+            try:
+                target.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+
+        return False
+
+    def _get(self, source):
+        '''
+        Take next item from queue, returning _END if pipeline is stopping
+        '''
+        while not self._stop.is_set():
+            try:
+                return source.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+        return _END
+
+    def _fail(self, stage, error):
+        stage.status = "failed"
+        if self.error is None:
+            self.error = PipelineError(stage.name, error)
+        self._stop.set()
+
+    def _runSource(self, output):
+        stage = self.source_stage
+        stage.status = "running"
+
+        iterator = iter(self.source)
+
+        try:
+            while True:
+                start = time.perf_counter()
+                chunk = next(iterator, _END)
+                elapsed = time.perf_counter() - start
+                stage.busy_seconds += elapsed
+
+                if chunk is _END:
+                    break
+
+                stage.chunks += 1
+                stage.records_in += len(chunk)
+                stage.records_out += len(chunk)
+                recordStage(stage.metric_name, len(chunk), len(chunk), elapsed)
+
+                if not self._put(output, chunk):
+                    return
+
+            stage.status = "done"
+        except Exception as e:
+            self._fail(stage, e)
+        finally:
+            # Releases file handles or HTTP clients held by source generators stopped early
+            if hasattr(iterator, 'close'):
+                iterator.close()
+            self._put(output, _END)
+
+    def _runStage(self, stage, source, output):
+        stage.status = "running"
+
+        try:
+            while True:
+                chunk = self._get(source)
+
+                if chunk is _END:
+                    break
+
+                result = stage.process(chunk)
+
+                if result and not self._put(output, result):
+                    return
+
+            if stage.on_finish is not None and not self._stop.is_set():
+                stage.on_finish()
+
+            if stage.status == "running":
+                stage.status = "done"
+        except Exception as e:
+            self._fail(stage, e)
+        finally:
+            if stage.on_close is not None:
+                stage.on_close()
+            self._put(output, _END)
+
+    def stream(self):
+        '''
+        Start stage threads and yield chunks coming out of last stage. Closing the generator early stops all stages. Returns generator of record lists. Raises PipelineError if any stage fails.
+        '''
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        threads = [threading.Thread(target=self._runSource, args=(queues[0],), name=f"{self.name}-load", daemon=True)]
+
+        for i, stage in enumerate(self.stages):
+            threads.append(threading.Thread(target=self._runStage, args=(stage, queues[i], queues[i + 1]), name=f"{self.name}-{stage.name}", daemon=True))
+
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                chunk = self._get(queues[-1])
+
+                if chunk is _END:
+                    break
+
+                yield chunk
+        finally:
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+
+            for stage in [self.source_stage] + self.stages:
+                if stage.status == "running":
+                    stage.status = "stopped"
+
+        if self.error is not None:
+            raise self.error
+
+        for hook in self.on_complete:
+            hook()
+
+    def run(self):
+        '''
+        Run pipeline to completion, discarding output of last stage. Returns progress dict.
+        '''
+        for _ in self.stream():
+            pass
+
+        return self.progress()
+
+    def progress(self):
+        '''
+        Snapshot of per-stage counters. Returns dict with pipeline name and list of stage progress dicts.
+        '''
+        return {"name": self.name, "stages": [self.source_stage.progress()] + [stage.progress() for stage in self.stages]}
+
+
+def loadPipelineConfig(name, config_path=DEFAULT_CONFIG_PATH):
+    '''
+    Read named pipeline definition from PIPELINES section of config file. Returns pipeline config dict.
+    '''
+    pipelines = loadConfigFile(config_path).get("PIPELINES") or {}
+
+    if name not in pipelines:
+        raise ValueError(f"Pipeline not defined in {config_path}: {name}")
+
+    pipeline_config = pipelines[name]
+
+    if not pipeline_config.get("source") or not pipeline_config.get("schema"):
+        raise ValueError(f"Pipeline {name} needs source and schema")
+
+    return pipeline_config
+
+
+def featureColumnTypes(feature_specs):
+    '''
+    Column types of fields added by feature specs. Returns dict of output field name to schema type.
+    '''
+    column_types = {}
+
+    for spec in feature_specs:
+        feature_type = spec.get("type")
+
+        if feature_type == "normalize":
+            column_types[f"{spec['field']}_normalized"] = "float"
+        elif feature_type == "categorize":
+            column_types[f"{spec['field']}_category"] = "integer"
+        elif feature_type == "ratio":
+            column_types[spec["name"]] = "float"
+
+    return column_types
+
+
+def _apiChunks(endpoint, params, chunk_size):
+    '''
+    Fetch non-paginated API response once iteration starts, so the request runs on the pipeline's load thread. Returns generator of record lists.
+    '''
+    yield from chunkRecords(loadFromAPI(endpoint, params), chunk_size)
+
+
+def sourceChunks(data_source, pipeline_config, checkpoint=None, file_results=None):
+    '''
+    Open data source as stream of record batches based on its source_type. File sources naming a directory or glob pattern read their files concurrently, appending per-file results to file_results list when given. When checkpoint dict is given, reads only data past the DataSource's stored checkpoint and fills checkpoint with the new position as records stream. Returns iterator of record lists.
+    '''
+    chunk_size = pipeline_config.get("chunk_size", DEFAULT_CHUNK_SIZE)
+
+    if data_source.source_type == "file":
+        if isMultiFileSource(data_source.endpoint):
+            # Byte offsets do not apply across many files, incremental runs rely on content hashes
+            return iterFiles(data_source.endpoint, chunk_size, pipeline_config.get("max_workers"), bool(pipeline_config.get("use_processes")), pipeline_config.get("ordered", True), results=file_results)
+
+        if checkpoint is None:
+            return iterFile(data_source.endpoint, chunk_size)
+
+        reader = IncrementalFileReader(data_source.endpoint, data_source.last_offset, data_source.last_size, data_source.last_mtime, checkpoint, data_source.last_digest)
+        return reader.chunks(chunk_size)
+
+    if data_source.source_type == "api":
+        params = dict(pipeline_config.get("params") or {})
+        pagination = pipeline_config.get("pagination")
+        watermark_param = pipeline_config.get("watermark_param")
+        watermark_field = pipeline_config.get("watermark_field")
+
+        if checkpoint is not None:
+            if watermark_param and data_source.last_watermark:
+                params[watermark_param] = data_source.last_watermark
+            if pagination and pagination.get("type") == "cursor" and data_source.last_cursor:
+                pagination = {**pagination, "start_cursor": data_source.last_cursor}
+
+        if pagination:
+            # Imported here so file-only pipelines start without httpx
+            from asyncLoader import iterPaginatedAPI
+            # Pipeline queues give backpressure, the loader only fetches as fast as stages drain them
+            chunks = iterPaginatedAPI(data_source.endpoint, params, pagination, pipeline_config.get("max_concurrency", 8), progress=checkpoint, adaptive=pipeline_config.get("adaptive"))
+        else:
+            chunks = _apiChunks(data_source.endpoint, params, chunk_size)
+
+        if checkpoint is not None and watermark_field:
+            return WatermarkTracker(watermark_field, data_source.last_watermark, checkpoint).track(chunks)
+
+        return chunks
+
+    raise ValueError(f"Unsupported source type for pipeline: {data_source.source_type}")
+
+
+def buildPipeline(pipeline_config, data_source, engine=None, name=None, read_only=False):
+    '''
+    Build load, clean, dedupe, features and sink stages from pipeline config dict and DataSource. Features are transformed with the feature_state loaded at start, rebuilt when it does not match the feature specs. With fit_features on, records reaching the features stage are fitted into a copy saved for the next run. With fit_features prefit, the cleaned source is read once more to fit before the first chunk. With fit_features off, a fitted state is required. A near_dedupe section adds MinHash near-duplicate removal after exact dedupe, and a profile section adds column sketches of processed records, stored per DataSource when an engine is given. With compact_rows set, records after cleaning are slotted rows generated from the schema instead of dicts. Sink is added when config has sink section and engine is given, columnar file output when config has output section. With incremental set and an engine, only data past the DataSource checkpoint is read, unchanged records are dropped by content hash, and checkpoint and hashes are saved after a successful run. With read_only set, nothing is written: sink, output, feature_state, profile and checkpoint saving are left out. Returns Pipeline.
+    '''
+    # Every database write goes through the engine, so a read-only pipeline runs without one
+    if read_only:
+        engine = None
+
+    schema = pipeline_config["schema"]
+    required_fields = pipeline_config.get("required_fields")
+    dedupe_keys = pipeline_config.get("dedupe_keys")
+    incremental = bool(pipeline_config.get("incremental")) and engine is not None
+    checkpoint = {} if incremental else None
+    detector = None
+    stages = []
+
+    # Slotted rows with reserved feature fields replace per-record dicts after cleaning
+    row_type = rowTypeForSchema(schema, pipeline_config.get("features")) if pipeline_config.get("compact_rows") else None
+
+    clean_stage = PipelineStage("clean", None, dropped_reason="rejected")
+    clean_stage.counters["rejected"] = 0
+    row_offset = [0]
+
+    def clean(chunk):
+        cleaned, rejections = cleanDataWithReport(chunk, schema, required_fields, row_offset[0], row_type)
+        row_offset[0] += len(chunk)
+        clean_stage.counters["rejected"] += len(rejections)
+        return cleaned
+
+    clean_stage.func = clean
+    stages.append(clean_stage)
+
+    change_keys = pipeline_config.get("change_keys", dedupe_keys)
+
+    if incremental and change_keys:
+        detector = ChangeDetector(Session(bind=engine), data_source.id, change_keys)
+        change_stage = PipelineStage("changes", None, on_close=detector.session.close, dropped_reason="unchanged")
+
+        def detectChanges(chunk):
+            changed = detector.filter(chunk)
+            change_stage.counters.update({"new": detector.new_count, "changed": detector.changed_count, "unchanged": detector.unchanged_count})
+            return changed
+
+        change_stage.func = detectChanges
+        stages.append(change_stage)
+
+    if dedupe_keys:
+        engine_options = {"max_memory_keys": pipeline_config.get("dedupe_memory_keys", DEFAULT_MAX_MEMORY_KEYS)}
+        dedupe_engine = DedupeEngine(dedupe_keys, **engine_options)
+        dedupe_stage = PipelineStage("dedupe", None, on_close=dedupe_engine.close, dropped_reason="duplicate")
+        dedupe_stage.counters["duplicates"] = 0
+
+        def dedupe(chunk):
+            unique = dedupe_engine.filter(chunk)
+            dedupe_stage.counters["duplicates"] = dedupe_engine.duplicates_removed
+            return unique
+
+        dedupe_stage.func = dedupe
+        stages.append(dedupe_stage)
+
+    near_config = pipeline_config.get("near_dedupe")
+    if near_config:
+        options = {key: near_config[key] for key in ("num_perm", "shingle_size", "bands") if key in near_config}
+        near_detector = NearDuplicateDetector(near_config["fields"], near_config.get("threshold", DEFAULT_THRESHOLD), **options)
+        near_stage = PipelineStage("near_dedupe", None, dropped_reason="near_duplicate")
+        near_stage.counters["near_duplicates"] = 0
+
+        def nearDedupe(chunk):
+            representatives = near_detector.filter(chunk)
+            near_stage.counters["near_duplicates"] = near_detector.duplicates_removed
+            return representatives
+
+        near_stage.func = nearDedupe
+        stages.append(near_stage)
+
+    feature_specs = pipeline_config.get("features") or []
+    column_types = dict(schema)
+
+    if feature_specs:
+        state_path = pipeline_config.get("feature_state")
+        fit_features = pipeline_config.get("fit_features", True)
+        pipeline_name = name or data_source.name
+        features = FeaturePipeline.fromSpecs(feature_specs)
+
+        if state_path and os.path.exists(state_path):
+            stored = FeaturePipeline.load(state_path)
+
+            if stored.matchesSpecs(feature_specs):
+                features = stored
+            elif not fit_features:
+                raise ValueError(f"Pipeline {pipeline_name} feature_state {state_path} does not match its features")
+            else:
+                print(f"Pipeline {pipeline_name}: feature_state {state_path} does not match features, refitting")
+
+        if not fit_features and not all(transformer.fitted for transformer in features.transformers):
+            raise ValueError(f"Pipeline {pipeline_name} has fit_features off but no fitted feature_state")
+
+        if fit_features == "prefit":
+            prefitted = [False]
+
+            def fitPass():
+                # Throwaway checkpoint so the fit pass reads the same range without moving the real one
+                for chunk in sourceChunks(data_source, pipeline_config, {} if incremental else None):
+                    cleaned, _ = cleanDataWithReport(chunk, schema, required_fields, row_type=row_type)
+                    features.partialFit(cleaned)
+
+            def applyStageFeatures(chunk):
+                # Opt-in second read of the source, so even the first run transforms every chunk with state fitted on all of it
+                if not prefitted[0]:
+                    fitPass()
+                    prefitted[0] = True
+                return features.transform(chunk)
+
+            save_state = None if read_only else features
+        elif fit_features and state_path and not read_only:
+            # Chunks are transformed with the state loaded at start and fitted into a copy saved for the next run, so one run is transformed alike
+            save_state = features.copy()
+
+            if not all(transformer.fitted for transformer in features.transformers):
+                print(f"Pipeline {pipeline_name}: features without fitted state are left out this run and fitted for the next one, set fit_features: prefit to fit first")
+
+            def applyStageFeatures(chunk):
+                save_state.partialFit(chunk)
+                return features.transform(chunk)
+        else:
+            save_state = None
+
+            if not all(transformer.fitted for transformer in features.transformers):
+                print(f"Pipeline {pipeline_name}: features without fitted state are left out, set feature_state or fit_features: prefit")
+
+            def applyStageFeatures(chunk):
+                return features.transform(chunk)
+
+        stages.append(PipelineStage("features", applyStageFeatures, on_finish=(lambda: save_state.save(state_path)) if state_path and save_state is not None else None))
+        column_types.update(featureColumnTypes(feature_specs))
+
+    profile_config = pipeline_config.get("profile")
+    profile = None
+
+    if profile_config:
+        options = profile_config if isinstance(profile_config, dict) else {}
+        profile = DataProfile(options.get("fields"), options.get("k", DEFAULT_K), options.get("precision", DEFAULT_PRECISION))
+
+        def profileChunk(chunk):
+            profile.update(chunk)
+            return chunk
+
+        stages.append(PipelineStage("profile", profileChunk))
+
+    sink_config = pipeline_config.get("sink")
+
+    if sink_config and engine is not None:
+        sink = RecordSink(engine, sink_config["table"], column_types, key_fields=sink_config.get("key_fields", dedupe_keys), upsert=sink_config.get("upsert", False), batch_size=sink_config.get("batch_size", 5000))
+        sink.createTable()
+
+        def write(chunk):
+            sink.writeBatch(chunk)
+            return chunk
+
+        stages.append(PipelineStage("sink", write))
+
+    output_config = pipeline_config.get("output")
+
+    if output_config and not read_only:
+        writer = openColumnarWriter(output_config["path"], column_types, output_config.get("compression", "zlib"))
+
+        def writeColumns(chunk):
+            writer.writeBatch(chunk)
+            return chunk
+
+        # File only appears after a successful run, failed runs discard it
+        stages.append(PipelineStage("output", writeColumns, on_finish=writer.close, on_close=writer.abort))
+
+    file_results = []
+    pipeline = Pipeline(sourceChunks(data_source, pipeline_config, checkpoint, file_results), stages, pipeline_config.get("queue_size", DEFAULT_QUEUE_SIZE), name or data_source.name)
+    pipeline.profile = profile
+    pipeline.file_results = file_results
+
+    store_profile = profile is not None and engine is not None and data_source.id is not None
+
+    if store_profile or incremental:
+        def commitRun():
+            # Profile, hashes and checkpoint land together, so a failed commit is fully retried without merging the profile twice
+            with Session(bind=engine) as session:
+                if store_profile:
+                    # Incremental runs only see new data, so their profile is merged into the stored one
+                    saveSourceProfile(session, data_source.id, profile, merge=incremental, commit=False)
+
+                if incremental:
+                    if detector is not None:
+                        detector.session = session
+                        detector.commit()
+                    saveCheckpoint(session, data_source.id, checkpoint)
+
+                session.commit()
+
+        pipeline.on_complete.append(commitRun)
+
+    # Returns pipeline reading from data source through configured stages
+    return pipeline
+
+
+def buildPipelineFromConfig(name, session, engine=None, config_path=DEFAULT_CONFIG_PATH, read_only=False):
+    '''
+    Build named pipeline from config file, looking up its DataSource by name. Returns Pipeline.
+    '''
+    pipeline_config = loadPipelineConfig(name, config_path)
+    data_source = session.query(DataSource).filter(DataSource.name == pipeline_config["source"]).first()
+
+    if data_source is None:
+        raise ValueError(f"Data source not registered: {pipeline_config['source']}")
+
+    return buildPipeline(pipeline_config, data_source, engine, name, read_only)
@@ -0,0 +1,120 @@
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+# Pipeline runs executing at once, further runs wait queued
+DEFAULT_MAX_RUNS = 2
+# Finished runs kept for status lookups, least recently used are dropped first
+DEFAULT_MAX_FINISHED = 100
+
+
+class PipelineRun:
+    '''
+    Background execution of one pipeline with status and live per-stage progress
+    '''
+
+    def __init__(self, pipeline_name, pipeline):
+        self.id = uuid.uuid4().hex
+        self.pipeline_name = pipeline_name
+        self.pipeline = pipeline
+        self.status = "queued"
+        self.error = None
+        self.created_at = datetime.now(timezone.utc)
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+
+    def execute(self):
+        '''
+        Run pipeline to completion, recording outcome
+        '''
+        self.status = "running"
+        self.started_at = datetime.now(timezone.utc)
+
+        try:
+            self.pipeline.run()
+            self.status = "succeeded"
+        except Exception as e:
+            self.status = "failed"
+            self.error = str(e)
+        finally:
+            self.finished_at = datetime.now(timezone.utc)
+
+    def toDict(self):
+        '''
+        Snapshot of run status and stage progress. Returns dict.
+        '''
+        return {
+            "id": self.id,
+            "pipeline": self.pipeline_name,
+            "status": self.status,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "stages": self.pipeline.progress()["stages"],
+        }
+
+
+class RunRegistry:
+    '''
+    Tracks pipeline runs and executes them on worker threads off the event loop. Queued and running runs are always kept; of finished runs only the max_finished most recently submitted or looked up are.
+    '''
+
+    def __init__(self, max_runs=DEFAULT_MAX_RUNS, max_finished=DEFAULT_MAX_FINISHED):
+        self.max_runs = max_runs
+        self.max_finished = max_finished
+        self.runs = OrderedDict()
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _getExecutor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_runs, thread_name_prefix="pipeline-run")
+            return self._executor
+
+    def _evict(self):
+        '''
+        Drop least recently used finished runs beyond max_finished. Caller holds the lock.
+        '''
+        finished = [run_id for run_id, run in self.runs.items() if run.finished_at is not None]
+
+        for run_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self.runs[run_id]
+
+    def submit(self, pipeline_name, pipeline):
+        '''
+        Queue pipeline for background execution. Returns PipelineRun.
+        '''
+        run = PipelineRun(pipeline_name, pipeline)
+
+        with self._lock:
+            self.runs[run.id] = run
+            self._evict()
+
+        run.future = self._getExecutor().submit(run.execute)
+        return run
+
+    def get(self, run_id):
+        '''
+        Look up run by id, marking it recently used. Returns PipelineRun or None.
+        '''
+        with self._lock:
+            run = self.runs.get(run_id)
+
+            if run is not None:
+                self.runs.move_to_end(run_id)
+
+            return run
+
+    def shutdown(self, wait=True):
+        '''
+        Stop accepting runs and optionally wait for running ones to finish
+        '''
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+                self._executor = None
@@ -0,0 +1,504 @@
+import base64
+import hashlib
+import json
+import math
+import random
+from chunking import isChunkStream
+from models import SourceProfile
+
+# Compactor size of top KLL level, rank error is roughly 1.7 / k
+DEFAULT_K = 200
+# HyperLogLog register index bits, standard error is 1.04 / sqrt(2 ** precision)
+DEFAULT_PRECISION = 12
+DEFAULT_QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+# KLL capacity shrink factor per level below the top
+CAPACITY_DECAY = 2 / 3
+# Version of serialized profile format
+PROFILE_VERSION = 1
+
+
+class KLLSketch:
+    '''
+    KLL quantile sketch over numeric values. Keeps levels of compactors whose items carry weight 2 ** level, so memory stays around 3k items however many values are added. Sketches with any k can be merged.
+    '''
+
+    def __init__(self, k=DEFAULT_K, seed=None):
+        if k < 8:
+            raise ValueError("KLLSketch needs k of at least 8")
+
+        self.k = k
+        self.compactors = [[]]
+        self.count = 0
+        self.min_val = None
+        self.max_val = None
+        self._size = 0
+        self._rng = random.Random(seed)
+
+    def _capacity(self, level):
+        depth = len(self.compactors) - level - 1
+        return max(2, math.ceil(self.k * CAPACITY_DECAY ** depth))
+
+    def _compress(self):
+        '''
+        Compact lowest full level until total size fits, promoting every other sorted item with doubled weight
+        '''
+        while self._size > sum(self._capacity(level) for level in range(len(self.compactors))):
+            for level, items in enumerate(self.compactors):
+                if len(items) < self._capacity(level):
+                    continue
+
+                if level + 1 == len(self.compactors):
+                    self.compactors.append([])
+
+                items.sort()
+                # Odd item stays behind so total weight is preserved
+                leftover = [items.pop()] if len(items) % 2 else []
+                promoted = items[self._rng.randrange(2)::2]
+                self.compactors[level + 1].extend(promoted)
+                self._size -= len(items) - len(promoted)
+                items[:] = leftover
+                break
+
+    def update(self, values):
+        '''
+        Add batch of numeric values. Returns self.
+        '''
+        values = values if isinstance(values, list) else list(values)
+
+        if not values:
+            return self
+
+        low = min(values)
+        high = max(values)
+        self.min_val = low if self.min_val is None else min(self.min_val, low)
+        self.max_val = high if self.max_val is None else max(self.max_val, high)
+
+        self.compactors[0].extend(values)
+        self.count += len(values)
+        self._size += len(values)
+        self._compress()
+
+        return self
+
+    def merge(self, other):
+        '''
+        Fold other sketch into this one, as if its values had been added here. Returns self.
+        '''
+        if not other.count:
+            return self
+
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+
+        for level, items in enumerate(other.compactors):
+            self.compactors[level].extend(items)
+            self._size += len(items)
+
+        self.count += other.count
+        self.min_val = other.min_val if self.min_val is None else min(self.min_val, other.min_val)
+        self.max_val = other.max_val if self.max_val is None else max(self.max_val, other.max_val)
+        self._compress()
+
+        return self
+
+    def _weighted(self):
+        return sorted((value, 1 << level) for level, items in enumerate(self.compactors) for value in items)
+
+    def quantiles(self, fractions):
+        '''
+        Estimate values at rank fractions between 0 and 1. Exact at 0 and 1. Returns list of values, empty if nothing was added.
+        '''
+        if not self.count:
+            return []
+
+        weighted = self._weighted()
+        total = sum(weight for _, weight in weighted)
+        results = []
+
+        for fraction in fractions:
+            if fraction <= 0:
+                results.append(self.min_val)
+                continue
+            if fraction >= 1:
+                results.append(self.max_val)
+                continue
+
+            target = fraction * total
+            cumulative = 0
+            result = self.max_val
+
+            for value, weight in weighted:
+                cumulative += weight
+                if cumulative >= target:
+                    result = value
+                    break
+
+            results.append(result)
+
+        return results
+
+    def quantile(self, fraction):
+        '''
+        Estimate value at rank fraction. Returns value, or None if nothing was added.
+        '''
+        values = self.quantiles([fraction])
+        return values[0] if values else None
+
+    def rank(self, value):
+        '''
+        Estimate fraction of values less than or equal to value. Returns float.
+        '''
+        if not self.count:
+            return 0.0
+
+        weighted = self._weighted()
+        total = sum(weight for _, weight in weighted)
+
+        return sum(weight for item, weight in weighted if item <= value) / total
+
+    def quantileBins(self, n_bins):
+        '''
+        Thresholds splitting values into n_bins groups of roughly equal count, usable as categorizeField bins. Repeated thresholds from heavy ties are merged. Returns sorted list.
+        '''
+        if n_bins < 2 or not self.count:
+            return []
+
+        return sorted(set(self.quantiles([i / n_bins for i in range(1, n_bins)])))
+
+    def toDict(self):
+        return {"k": self.k, "count": self.count, "min": self.min_val, "max": self.max_val, "compactors": self.compactors}
+
+    @classmethod
+    def fromDict(cls, state):
+        sketch = cls(state["k"])
+        sketch.compactors = [list(items) for items in state["compactors"]] or [[]]
+        sketch.count = state["count"]
+        sketch.min_val = state["min"]
+        sketch.max_val = state["max"]
+        sketch._size = sum(len(items) for items in sketch.compactors)
+        return sketch
+
+
+class HyperLogLog:
+    '''
+    HyperLogLog distinct counter. Values are hashed by their string form with BLAKE2b, so sketches built in different processes merge.
+    '''
+
+    def __init__(self, precision=DEFAULT_PRECISION, registers=None):
+        if not 4 <= precision <= 18:
+            raise ValueError("HyperLogLog precision must be between 4 and 18")
+
+        self.precision = precision
+        self.registers = bytearray(registers) if registers is not None else bytearray(1 << precision)
+
+    def update(self, values):
+        '''
+        Add batch of hashable or printable values. Returns self.
+        '''
+        registers = self.registers
+        shift = 64 - self.precision
+        mask = (1 << shift) - 1
+        blake2b = hashlib.blake2b
+
+        # Repeats within a batch are hashed once
+        for text in {str(value) for value in values}:
+            hashed = int.from_bytes(blake2b(text.encode(), digest_size=8).digest(), 'little')
+            index = hashed >> shift
+            rank = shift - (hashed & mask).bit_length() + 1
+
+            if rank > registers[index]:
+                registers[index] = rank
+
+        return self
+
+    def merge(self, other):
+        '''
+        Fold other counter into this one by taking register maxima. Returns self.
+        '''
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog counters with different precision")
+
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self):
+        '''
+        Estimate number of distinct values, with linear counting for small cardinalities. Returns int.
+        '''
+        size = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / size)
+        estimate = alpha * size * size / sum(2.0 ** -rank for rank in self.registers)
+        zeros = self.registers.count(0)
+
+        if estimate <= 2.5 * size and zeros:
+            estimate = size * math.log(size / zeros)
+
+        return round(estimate)
+
+    def toDict(self):
+        return {"precision": self.precision, "registers": base64.b64encode(bytes(self.registers)).decode()}
+
+    @classmethod
+    def fromDict(cls, state):
+        return cls(state["precision"], base64.b64decode(state["registers"]))
+
+
+class ColumnProfile:
+    '''
+    Bounded-memory statistics for one column: null and blank string counts, distinct count, numeric quantiles with min and max, and min and max of non-numeric values compared as text
+    '''
+
+    def __init__(self, k=DEFAULT_K, precision=DEFAULT_PRECISION):
+        self.count = 0
+        self.nulls = 0
+        self.empties = 0
+        self.numbers = KLLSketch(k)
+        self.distinct = HyperLogLog(precision)
+        self.min_text = None
+        self.max_text = None
+
+    def update(self, values):
+        '''
+        Add batch of column values, None for missing. Returns self.
+        '''
+        present = []
+        numbers = []
+        texts = []
+
+        for value in values:
+            value_type = type(value)
+
+            if value is None:
+                self.nulls += 1
+            elif value_type is int or value_type is float:
+                if value == value:
+                    numbers.append(value)
+                present.append(value)
+            elif value_type is str and not value.strip():
+                self.empties += 1
+            else:
+                texts.append(value if value_type is str else str(value))
+                present.append(value)
+
+        self.count += len(values)
+        self.numbers.update(numbers)
+        self.distinct.update(present)
+
+        if texts:
+            low = min(texts)
+            high = max(texts)
+            self.min_text = low if self.min_text is None else min(self.min_text, low)
+            self.max_text = high if self.max_text is None else max(self.max_text, high)
+
+        return self
+
+    def addMissing(self, count):
+        '''
+        Count records that lacked this column entirely as nulls
+        '''
+        self.count += count
+        self.nulls += count
+
+    def merge(self, other):
+        '''
+        Fold other column profile into this one. Returns self.
+        '''
+        self.count += other.count
+        self.nulls += other.nulls
+        self.empties += other.empties
+        self.numbers.merge(other.numbers)
+        self.distinct.merge(other.distinct)
+
+        for text in (other.min_text, other.max_text):
+            if text is not None:
+                self.min_text = text if self.min_text is None else min(self.min_text, text)
+                self.max_text = text if self.max_text is None else max(self.max_text, text)
+
+        return self
+
+    def summary(self, quantiles=DEFAULT_QUANTILES, n_bins=None):
+        '''
+        Readable statistics. Numeric columns report numeric min, max and quantiles, others text min and max. Returns dict.
+        '''
+        numeric = self.numbers.count > 0
+        summary = {
+            "count": self.count,
+            "nulls": self.nulls,
+            "null_rate": self.nulls / self.count if self.count else 0.0,
+            "empties": self.empties,
+            "empty_rate": self.empties / self.count if self.count else 0.0,
+            "distinct": self.distinct.count(),
+            "numeric_count": self.numbers.count,
+            "min": self.numbers.min_val if numeric else self.min_text,
+            "max": self.numbers.max_val if numeric else self.max_text,
+        }
+
+        if numeric:
+            summary["quantiles"] = {str(q): value for q, value in zip(quantiles, self.numbers.quantiles(quantiles))}
+            if n_bins:
+                summary["bins"] = self.numbers.quantileBins(n_bins)
+
+        return summary
+
+    def toDict(self):
+        return {
+            "count": self.count,
+            "nulls": self.nulls,
+            "empties": self.empties,
+            "numbers": self.numbers.toDict(),
+            "distinct": self.distinct.toDict(),
+            "min_text": self.min_text,
+            "max_text": self.max_text,
+        }
+
+    @classmethod
+    def fromDict(cls, state):
+        column = cls()
+        column.count = state["count"]
+        column.nulls = state["nulls"]
+        column.empties = state["empties"]
+        column.numbers = KLLSketch.fromDict(state["numbers"])
+        column.distinct = HyperLogLog.fromDict(state["distinct"])
+        column.min_text = state.get("min_text")
+        column.max_text = state.get("max_text")
+        return column
+
+
+class DataProfile:
+    '''
+    Column profiles built in one streaming pass over record batches. Columns are discovered from records unless fields are given. Profiles of separate chunks merge into the profile of their concatenation.
+    '''
+
+    def __init__(self, fields=None, k=DEFAULT_K, precision=DEFAULT_PRECISION):
+        self.fields = list(fields) if fields else None
+        self.k = k
+        self.precision = precision
+        self.columns = {}
+        self.records = 0
+
+    def _column(self, field):
+        column = self.columns.get(field)
+
+        if column is None:
+            column = self.columns[field] = ColumnProfile(self.k, self.precision)
+            # Records seen before the column first appeared lacked it
+            column.addMissing(self.records)
+
+        return column
+
+    def update(self, records):
+        '''
+        Add batch of records. Returns self.
+        '''
+        if not records:
+            return self
+
+        fields = self.fields or list(dict.fromkeys([*self.columns, *(field for record in records for field in record)]))
+
+        for field in fields:
+            self._column(field).update([record.get(field) for record in records])
+
+        self.records += len(records)
+        return self
+
+    def merge(self, other):
+        '''
+        Fold profile of other records into this one. Columns missing on one side count as nulls for that side's records. Returns self.
+        '''
+        for field in self.columns:
+            if field not in other.columns:
+                self.columns[field].addMissing(other.records)
+
+        for field, column in other.columns.items():
+            if field not in self.columns:
+                self._column(field)
+            self.columns[field].merge(column)
+
+        self.records += other.records
+        return self
+
+    def quantileBins(self, field, n_bins):
+        '''
+        Quantile thresholds for numeric field, for use as categorizeField bins. Returns sorted list, empty if field has no numeric values.
+        '''
+        column = self.columns.get(field)
+        return column.numbers.quantileBins(n_bins) if column else []
+
+    def summary(self, quantiles=DEFAULT_QUANTILES, n_bins=None):
+        '''
+        Readable statistics per column, with quantile bins for numeric columns when n_bins is given. Returns dict.
+        '''
+        return {
+            "records": self.records,
+            "columns": {field: column.summary(quantiles, n_bins) for field, column in self.columns.items()},
+        }
+
+    def toDict(self):
+        return {
+            "version": PROFILE_VERSION,
+            "fields": self.fields,
+            "k": self.k,
+            "precision": self.precision,
+            "records": self.records,
+            "columns": {field: column.toDict() for field, column in self.columns.items()},
+        }
+
+    @classmethod
+    def fromDict(cls, state):
+        '''
+        Rebuild profile from serialized state dict. Returns DataProfile.
+        '''
+        if state.get("version") != PROFILE_VERSION:
+            raise ValueError(f"Unsupported profile version: {state.get('version')}")
+
+        profile = cls(state.get("fields"), state["k"], state["precision"])
+        profile.records = state["records"]
+        profile.columns = {field: ColumnProfile.fromDict(column) for field, column in state["columns"].items()}
+        return profile
+
+
+def profileRecords(records, fields=None, k=DEFAULT_K, precision=DEFAULT_PRECISION):
+    '''
+    Profile list of records or chunk stream in one bounded-memory pass. Returns DataProfile.
+    '''
+    profile = DataProfile(fields, k, precision)
+
+    if isChunkStream(records):
+        for chunk in records:
+            profile.update(chunk)
+    else:
+        profile.update(records)
+
+    return profile
+
+
+def saveSourceProfile(session, source_id, profile, merge=False, commit=True):
+    '''
+    Store profile for data source, replacing the previous one or, with merge, folding it in so incremental runs build up a profile of all data seen. Commits session unless commit is False, so callers can store it in a larger transaction. Returns stored DataProfile.
+    '''
+    row = session.query(SourceProfile).filter(SourceProfile.source_id == source_id).first()
+
+    if row is None:
+        row = SourceProfile(source_id=source_id)
+        session.add(row)
+    elif merge and row.profile:
+        profile = DataProfile.fromDict(json.loads(row.profile)).merge(profile)
+
+    row.profile = json.dumps(profile.toDict())
+
+    if commit:
+        session.commit()
+
+    return profile
+
+
+def loadSourceProfile(session, source_id):
+    '''
+    Load stored profile for data source. Returns DataProfile, or None if source was never profiled.
+    '''
+    row = session.query(SourceProfile).filter(SourceProfile.source_id == source_id).first()
+
+    if row is None or not row.profile:
+        return None
+
+    return DataProfile.fromDict(json.loads(row.profile))
@@ -0,0 +1,181 @@
+import io
+from sqlalchemy import Table, Column, MetaData, String, BigInteger, Float, Boolean, Text
+from sqlalchemy.dialects import sqlite
+from chunking import chunkRecords, isChunkStream
+
+# Records written per transaction by default
+DEFAULT_BATCH_SIZE = 5000
+
+# Column type for each cleanRecord schema field type, unknown types stored as text
+COLUMN_TYPES = {
+    'string': String,
+    'integer': BigInteger,
+    'float': Float,
+    'boolean': Boolean,
+}
+
+
+def buildTable(table_name, column_types, key_fields=None, metadata=None):
+    '''
+    Build SQLAlchemy table from schema dict of field name to cleanRecord type. Key fields become the primary key so they can be upserted on. Returns Table.
+    '''
+    metadata = metadata if metadata is not None else MetaData()
+    key_fields = key_fields or []
+
+    missing = [field for field in key_fields if field not in column_types]
+    if missing:
+        raise ValueError(f"Key fields missing from column types: {', '.join(missing)}")
+
+    columns = [
+        Column(field, COLUMN_TYPES.get(field_type, Text)(), primary_key=field in key_fields)
+        for field, field_type in column_types.items()
+    ]
+
+    return Table(table_name, metadata, *columns)
+
+
+def _formatCopyValue(value):
+    '''
+    Format value for PostgreSQL COPY CSV. None becomes unquoted empty field (NULL) and strings are always quoted so empty strings survive.
+    '''
+    if value is None:
+        return ''
+    if value is True:
+        return 't'
+    if value is False:
+        return 'f'
+    if isinstance(value, (int, float)):
+        return repr(value)
+
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def buildCopyBuffer(records, columns):
+    '''
+    Serialize records to in-memory CSV buffer for COPY FROM STDIN. Returns StringIO positioned at start.
+    '''
+    buffer = io.StringIO()
+    write = buffer.write
+
+    for record in records:
+        get = record.get
+        write(','.join([_formatCopyValue(get(column)) for column in columns]))
+        write('\n')
+
+    buffer.seek(0)
+    return buffer
+
+
+class RecordSink:
+    '''
+    Bulk writer of cleaned record batches into a target table. Uses COPY FROM STDIN on PostgreSQL and executemany elsewhere, one transaction per batch, with optional upsert on key fields.
+    '''
+
+    def __init__(self, engine, table_name, column_types, key_fields=None, upsert=False, batch_size=DEFAULT_BATCH_SIZE):
+        if upsert and not key_fields:
+            raise ValueError("Upsert requires key_fields")
+
+        self.engine = engine
+        self.table = buildTable(table_name, column_types, key_fields)
+        self.columns = list(column_types)
+        self.key_fields = list(key_fields or [])
+        self.upsert = upsert
+        self.batch_size = batch_size
+        self.rows_written = 0
+        self.batches_written = 0
+
+    def createTable(self):
+        '''
+        Create target table if it does not exist
+        '''
+        self.table.create(bind=self.engine, checkfirst=True)
+
+    def write(self, records):
+        '''
+        Write records in batches of batch_size, each in its own transaction. Accepts list, iterable or chunk stream of records. Returns number of rows written.
+        '''
+        if isChunkStream(records):
+            records = (record for chunk in records for record in chunk)
+
+        written = 0
+
+        for batch in chunkRecords(records, self.batch_size):
+            written += self.writeBatch(batch)
+
+        return written
+
+    def writeBatch(self, records):
+        '''
+        Write one batch in single transaction. Returns number of rows written.
+        '''
+        if not records:
+            return 0
+
+        if self.upsert:
+            # Postgres rejects upserting the same key twice in one statement, last occurrence wins
+            records = list({tuple(r.get(f) for f in self.key_fields): r for r in records}.values())
+
+        with self.engine.begin() as connection:
+            if connection.dialect.name == 'postgresql':
+                self._copyBatch(connection, records)
+            else:
+                self._executeManyBatch(connection, records)
+
+        self.rows_written += len(records)
+        self.batches_written += 1
+
+        return len(records)
+
+    def _executeManyBatch(self, connection, records):
+        '''
+        Insert batch with executemany, upserting through dialect ON CONFLICT support
+        '''
+        rows = [{column: record.get(column) for column in self.columns} for record in records]
+
+        if not self.upsert:
+            connection.execute(self.table.insert(), rows)
+            return
+
+        dialect = connection.dialect.name
+
+        if dialect == 'sqlite':
+            statement = sqlite.insert(self.table)
+        else:
+            raise ValueError(f"Upsert not supported for database dialect: {dialect}")
+
+        update_columns = {column: statement.excluded[column] for column in self.columns if column not in self.key_fields}
+
+        if update_columns:
+            statement = statement.on_conflict_do_update(index_elements=self.key_fields, set_=update_columns)
+        else:
+            statement = statement.on_conflict_do_nothing(index_elements=self.key_fields)
+
+        connection.execute(statement, rows)
+
+    def _copyBatch(self, connection, records):
+        '''
+        Stream batch through COPY FROM STDIN, via temporary staging table when upserting
+        '''
+        quote = connection.dialect.identifier_preparer.quote
+        column_list = ', '.join(quote(column) for column in self.columns)
+        target = quote(self.table.name)
+        cursor = connection.connection.dbapi_connection.cursor()
+
+        try:
+            buffer = buildCopyBuffer(records, self.columns)
+
+            if not self.upsert:
+                cursor.copy_expert(f"COPY {target} ({column_list}) FROM STDIN WITH (FORMAT csv)", buffer)
+                return
+
+            staging = quote(f"{self.table.name}_staging")
+            cursor.execute(f"CREATE TEMP TABLE {staging} (LIKE {target} INCLUDING DEFAULTS) ON COMMIT DROP")
+            cursor.copy_expert(f"COPY {staging} ({column_list}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+            key_list = ', '.join(quote(field) for field in self.key_fields)
+            updates = ', '.join(f"{quote(c)} = EXCLUDED.{quote(c)}" for c in self.columns if c not in self.key_fields)
+            conflict_action = f"DO UPDATE SET {updates}" if updates else "DO NOTHING"
+
+            cursor.execute(f"INSERT INTO {target} ({column_list}) SELECT {column_list} FROM {staging} ON CONFLICT ({key_list}) {conflict_action}")
+        finally:
+            cursor.close()
@@ -0,0 +1,244 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+# Default budgets, large reference payloads spill from memory to disk
+DEFAULT_MEMORY_BYTES = 16 * 1024 * 1024
+DEFAULT_DISK_BYTES = 256 * 1024 * 1024
+DEFAULT_TTL = 300
+
+
+def cacheKey(url, params=None):
+    '''
+    Build cache key from URL and query parameters, independent of parameter order. Returns string.
+    '''
+    if not params:
+        return url
+
+    return f"{url}?{urlencode(sorted(params.items()), doseq=True)}"
+
+
+class CachedResponse:
+    '''
+    Stored response body with validators used for conditional revalidation
+    '''
+
+    __slots__ = ("body", "etag", "last_modified", "stored_at")
+
+    def __init__(self, body, etag=None, last_modified=None, stored_at=None):
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = stored_at if stored_at is not None else time.time()
+
+    def isFresh(self, ttl):
+        return time.time() - self.stored_at < ttl
+
+    def validators(self):
+        '''
+        Conditional request headers for revalidating this response. Returns dict.
+        '''
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    '''
+    Two-tier HTTP response cache: in-memory LRU backed by optional disk directory, each capped by a byte budget. Responses younger than ttl are served without a request, older ones are revalidated with If-None-Match/If-Modified-Since so unchanged payloads come back as 304. Safe to share across threads.
+    '''
+
+    def __init__(self, memory_bytes=DEFAULT_MEMORY_BYTES, disk_dir=None, disk_bytes=DEFAULT_DISK_BYTES, ttl=DEFAULT_TTL):
+        self.memory_bytes = memory_bytes
+        self.disk_dir = disk_dir
+        self.disk_bytes = disk_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+        self._memory = OrderedDict()
+        self._memory_used = 0
+        self._disk_used = 0
+        self._lock = threading.Lock()
+
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._disk_used = sum(size for _, _, size in self._diskFiles())
+
+    def _diskPath(self, key):
+        return os.path.join(self.disk_dir, hashlib.blake2b(key.encode(), digest_size=16).hexdigest() + ".cache")
+
+    def _diskFiles(self):
+        '''
+        List cache files with access time and size. Returns list of (path, mtime, size) tuples.
+        '''
+        files = []
+        for entry in os.scandir(self.disk_dir):
+            if entry.name.endswith(".cache"):
+                stat = entry.stat()
+                files.append((entry.path, stat.st_mtime, stat.st_size))
+        return files
+
+    def _readDisk(self, key):
+        '''
+        Load entry from disk tier, marking it recently used. Returns CachedResponse or None.
+        '''
+        path = self._diskPath(key)
+
+        try:
+            with open(path, 'rb') as f:
+                meta = json.loads(f.readline())
+                body = f.read()
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+
+        # Digest collisions are vanishingly rare, but never serve another URL's body
+        if meta.get("key") != key:
+            return None
+
+        return CachedResponse(body, meta.get("etag"), meta.get("last_modified"), meta.get("stored_at"))
+
+    def _writeDisk(self, key, entry):
+        '''
+        Write entry to disk tier atomically, then evict least recently used files past budget
+        '''
+        path = self._diskPath(key)
+        meta = {"key": key, "etag": entry.etag, "last_modified": entry.last_modified, "stored_at": entry.stored_at}
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+
+        old_size = os.path.getsize(path) if os.path.exists(path) else 0
+
+        with open(temp_path, 'wb') as f:
+            f.write(json.dumps(meta).encode() + b"\n")
+            f.write(entry.body)
+
+        os.replace(temp_path, path)
+        self._disk_used += os.path.getsize(path) - old_size
+
+        if self._disk_used > self.disk_bytes:
+            for file_path, _, size in sorted(self._diskFiles(), key=lambda item: item[1]):
+                if self._disk_used <= self.disk_bytes:
+                    break
+                os.unlink(file_path)
+                self._disk_used -= size
+                self.evictions += 1
+
+    def _storeMemory(self, key, entry):
+        '''
+        Insert entry into memory LRU, evicting least recently used entries past budget
+        '''
+        if key in self._memory:
+            self._memory_used -= len(self._memory.pop(key).body)
+
+        if len(entry.body) > self.memory_bytes:
+            # Oversized bodies live on disk only
+            return
+
+        self._memory[key] = entry
+        self._memory_used += len(entry.body)
+
+        while self._memory_used > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_used -= len(evicted.body)
+            self.evictions += 1
+
+    def get(self, key):
+        '''
+        Look up entry in memory then disk, promoting disk hits to memory. Returns CachedResponse or None, fresh or not.
+        '''
+        with self._lock:
+            entry = self._memory.get(key)
+
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return entry
+
+            if self.disk_dir:
+                entry = self._readDisk(key)
+                if entry is not None:
+                    self._storeMemory(key, entry)
+
+            return entry
+
+    def put(self, key, entry):
+        '''
+        Store entry in both tiers
+        '''
+        with self._lock:
+            self._storeMemory(key, entry)
+            if self.disk_dir:
+                self._writeDisk(key, entry)
+
+    def fetch(self, session, url, params=None, timeout=10):
+        '''
+        GET url through cache using requests-compatible session. Fresh entries skip the network, stale entries are revalidated conditionally. Returns response body bytes. Raises requests.exceptions.RequestException on failure.
+        '''
+        key = cacheKey(url, params)
+        entry = self.get(key)
+
+        if entry is not None and entry.isFresh(self.ttl):
+            self._count("hits")
+            return entry.body
+
+        headers = entry.validators() if entry is not None else {}
+        response = session.get(url, params=params, timeout=timeout, headers=headers)
+
+        if response.status_code == 304 and entry is not None:
+            self._count("revalidations")
+            # Restart freshness window, servers may rotate validators on 304
+            refreshed = CachedResponse(
+                entry.body,
+                response.headers.get("ETag", entry.etag),
+                response.headers.get("Last-Modified", entry.last_modified),
+            )
+            self.put(key, refreshed)
+            return refreshed.body
+
+        response.raise_for_status()
+        self._count("misses")
+
+        if "no-store" not in response.headers.get("Cache-Control", ""):
+            self.put(key, CachedResponse(response.content, response.headers.get("ETag"), response.headers.get("Last-Modified")))
+
+        return response.content
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def stats(self):
+        '''
+        Snapshot of cache counters and tier usage. Returns dict.
+        '''
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidations": self.revalidations,
+                "evictions": self.evictions,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_used,
+                "disk_bytes": self._disk_used,
+            }
+
+    def clear(self):
+        '''
+        Drop all cached entries from both tiers
+        '''
+        with self._lock:
+            self._memory.clear()
+            self._memory_used = 0
+
+            if self.disk_dir:
+                for file_path, _, _ in self._diskFiles():
+                    os.unlink(file_path)
+                self._disk_used = 0
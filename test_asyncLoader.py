@@ -0,0 +1,92 @@
+import asyncio
+import time
+import pytest
+from asyncLoader import AsyncAPILoader, loadFromAPIAsync, loadPaginatedAPI
+
+
+RECORDS = [{"id": i} for i in range(23)]
+
+
+def offsetHandler(path, query, headers):
+    '''
+    Serve RECORDS with offset/limit pagination and small artificial latency
+    '''
+    time.sleep(0.1)
+    offset = int(query.get("offset", 0))
+    limit = int(query.get("limit", 10))
+    return 200, {"Content-Type": "application/json"}, {"results": RECORDS[offset:offset + limit]}
+
+
+def test_loadPaginatedAPIOffset(stubServer):
+    '''
+    Test offset pagination returns all records in order with concurrent page fetches
+    '''
+    server = stubServer(offsetHandler)
+
+    result = loadPaginatedAPI(server.url + "/items", pagination={"type": "offset", "page_size": 2}, max_concurrency=8)
+
+    assert result == RECORDS
+    # Sequential fetching would never have more than one page in flight
+    assert 1 < server.peak_active <= 8
+
+
+def test_loadPaginatedAPICursor(stubServer):
+    '''
+    Test cursor pagination follows next_cursor until it is empty
+    '''
+    def handler(path, query, headers):
+        page = int(query.get("cursor", 0))
+        next_cursor = str(page + 1) if page < 2 else None
+        return 200, {}, {"data": RECORDS[page * 10:(page + 1) * 10], "next_cursor": next_cursor}
+
+    server = stubServer(handler)
+    result = loadPaginatedAPI(server.url, pagination={"type": "cursor"})
+
+    assert result == RECORDS
+    assert [q.get("cursor") for _, q, _ in server.requests] == [None, "1", "2"]
+
+
+def test_loadPaginatedAPILinkHeader(stubServer):
+    '''
+    Test link-header pagination follows rel="next" URLs
+    '''
+    holder = {}
+
+    def handler(path, query, headers):
+        page = int(query.get("page", 0))
+        response_headers = {}
+        if page < 2:
+            response_headers["Link"] = f'<{holder["url"]}/items?page={page + 1}>; rel="next"'
+        return 200, response_headers, RECORDS[page * 10:(page + 1) * 10]
+
+    server = stubServer(handler)
+    holder["url"] = server.url
+
+    assert loadPaginatedAPI(server.url + "/items", pagination={"type": "link"}) == RECORDS
+
+
+def test_iterPagesMaxPages(stubServer):
+    '''
+    Test max_pages stops pagination early and streams pages as they arrive
+    '''
+    server = stubServer(offsetHandler)
+
+    async def collect():
+        pages = []
+        async with AsyncAPILoader(max_concurrency=2) as loader:
+            async for page in loader.iterPages(server.url, pagination={"type": "offset", "page_size": 5, "max_pages": 2}):
+                pages.append(page)
+        return pages
+
+    pages = asyncio.run(collect())
+    assert pages == [RECORDS[0:5], RECORDS[5:10]]
+
+
+def test_loadFromAPIAsyncError(stubServer):
+    '''
+    Test HTTP error status is raised instead of silently dropping pages
+    '''
+    server = stubServer(lambda path, query, headers: (500, {}, {"error": "boom"}))
+
+    with pytest.raises(Exception):
+        asyncio.run(loadFromAPIAsync(server.url))
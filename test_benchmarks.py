@@ -0,0 +1,90 @@
+import os
+import tempfile
+import pytest
+from benchmarks.syntheticData import buildSchema, generateRecords, parseColumnMix, writeDataset
+from benchmarks.benchStages import benchSize, compareResults
+from benchmarks.benchJson import benchBackends
+from dataLoader import loadFromFile
+
+
+def test_generatorIsDeterministic():
+    '''
+    Test same seed yields same records and different seed does not
+    '''
+    assert list(generateRecords(50, seed=7)) == list(generateRecords(50, seed=7))
+    assert list(generateRecords(50, seed=7)) != list(generateRecords(50, seed=8))
+
+
+def test_generatorNullAndDuplicateRates():
+    '''
+    Test null and duplicate rates are close to requested values
+    '''
+    records = list(generateRecords(20000, null_rate=0.2, duplicate_rate=0.1))
+    ids = [r["id"] for r in records]
+    null_share = sum(r["amount"] is None for r in records) / len(records)
+
+    assert abs(null_share - 0.2) < 0.02
+    assert abs((len(ids) - len(set(ids))) / len(ids) - 0.1) < 0.02
+    assert all(r["id"] is not None for r in records)
+
+
+def test_columnMix():
+    '''
+    Test column mix spec adds typed columns after base columns
+    '''
+    schema = buildSchema(parseColumnMix("string:2,boolean:1"))
+    assert list(schema) == ["id", "amount", "quantity", "string_0", "string_1", "boolean_0"]
+
+
+@pytest.mark.parametrize("extension", ["csv", "json", "jsonl"])
+def test_writeDatasetLoadsBack(extension):
+    '''
+    Test generated datasets are readable by loadFromFile in each format
+    '''
+    schema = buildSchema()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, f"data.{extension}")
+        assert writeDataset(path, generateRecords(100, schema), schema) == 100
+        records = loadFromFile(path)
+
+    assert len(records) == 100
+    assert set(records[0]) == set(schema)
+
+
+def test_benchSizeReportsEveryStage():
+    '''
+    Test small benchmark run reports time, throughput and memory for each stage
+    '''
+    with tempfile.TemporaryDirectory() as temp_dir:
+        results = benchSize(500, buildSchema(), temp_dir, 0.05, 0.05, 42)
+
+    assert list(results) == ["load_csv", "load_json", "load_jsonl", "clean", "dedupe", "normalize", "categorize", "ratio"]
+    assert all({"seconds", "peak_bytes", "rows_per_sec"} <= set(metrics) for metrics in results.values())
+
+
+def test_compareResultsFlagsRegressions():
+    '''
+    Test slowdowns past tolerance are reported and small absolute changes are not
+    '''
+    baseline = {"results": {"1m": {"clean": {"seconds": 2.0, "peak_bytes": 1000}, "categorize": {"seconds": 0.5, "peak_bytes": 360}, "dedupe": {"seconds": 0.001, "peak_bytes": 100000}}}}
+    current = {"results": {"1m": {
+        "clean": {"seconds": 3.0, "peak_bytes": 1100},
+        "categorize": {"seconds": 0.5, "peak_bytes": 1536},
+        "dedupe": {"seconds": 0.01, "peak_bytes": 140000},
+        "ratio": {"seconds": 9.0},
+    }}}
+
+    regressions = compareResults(current, baseline, tolerance=0.25)
+
+    assert regressions == ["1m clean seconds: 3.0 vs baseline 2.0 (+50%)", "1m dedupe peak_bytes: 140000 vs baseline 100000 (+40%)"]
+
+
+def test_benchJsonBackends():
+    '''
+    Test JSON benchmark reports every operation for the standard library backend
+    '''
+    results = benchBackends(200, ["json"])
+
+    assert set(results["json"]) == {"decode_array", "decode_lines", "encode_lines"}
+    assert all(rate > 0 for rate in results["json"].values())
@@ -0,0 +1,63 @@
+import copy
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from columnBatch import recordsToColumns, columnsToRecords
+from featureEngine import normalizeNumeric, categorizeField, createRatioFeature
+
+
+RECORDS = [
+    {"id": 1, "price": 10.0, "qty": 2, "name": "a"},
+    {"id": 2, "price": None, "qty": 0, "name": "b"},
+    {"id": 3, "price": 30.0, "qty": None, "name": None},
+    {"id": 4, "price": 25.5, "qty": 4, "name": "d"}
+]
+
+
+def test_recordsToColumnsRoundTrip():
+    '''
+    Test converting records to columns and back preserves values, types and nulls
+    '''
+    batch = recordsToColumns(RECORDS)
+
+    assert batch.columns["id"].dtype == np.int64
+    assert batch.columns["price"].dtype == np.float64
+    assert columnsToRecords(batch) == RECORDS
+
+
+def test_columnFeaturesMatchRecordFeatures():
+    '''
+    Test vectorized feature functions produce same output as record-dict path
+    '''
+    expected = copy.deepcopy(RECORDS)
+    normalizeNumeric(expected, "price")
+    categorizeField(expected, "price", [20, 10])
+    createRatioFeature(expected, "price", "qty", "price_per_qty")
+
+    batch = recordsToColumns(RECORDS)
+    normalizeNumeric(batch, "price")
+    categorizeField(batch, "price", [20, 10])
+    createRatioFeature(batch, "price", "qty", "price_per_qty")
+
+    assert columnsToRecords(batch) == expected
+
+
+def test_normalizeNumericColumnsConstant():
+    '''
+    Test constant column normalizes every row to 0.5 like record-dict path
+    '''
+    batch = recordsToColumns([{"v": 3.0}, {"v": None}, {"v": 3.0}])
+    normalizeNumeric(batch, "v")
+
+    assert [r["v_normalized"] for r in columnsToRecords(batch)] == [0.5, 0.5, 0.5]
+
+
+def test_categorizeFieldColumnsStrings():
+    '''
+    Test uncleaned string column is converted and unparseable values become None
+    '''
+    batch = recordsToColumns([{"v": "5"}, {"v": "abc"}, {"v": "15"}])
+    categorizeField(batch, "v", [10])
+
+    assert [r["v_category"] for r in columnsToRecords(batch)] == [0, None, 1]
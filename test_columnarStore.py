@@ -0,0 +1,156 @@
+import os
+import tempfile
+import pytest
+import columnarStore
+from columnarStore import ColumnarWriter, ColumnarReader, openColumnarWriter, openColumnarReader
+
+SCHEMA = {"id": "integer", "name": "string", "amount": "float", "active": "boolean"}
+
+
+def makeRecords(count):
+    return [
+        {"id": i, "name": None if i % 5 == 0 else f"name-{i}", "amount": i * 1.5, "active": i % 2 == 0}
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def workDir():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        yield temp_dir
+
+
+def test_roundTripWithNulls(workDir):
+    '''
+    Test typed columns and nulls survive write and read across row groups
+    '''
+    path = os.path.join(workDir, "orders.col")
+    records = makeRecords(25) + [{"id": None, "name": "", "amount": None, "active": None}]
+
+    with ColumnarWriter(path, SCHEMA) as writer:
+        assert writer.write(records, chunk_size=10) == 26
+
+    reader = ColumnarReader(path)
+    assert reader.num_rows == 26
+    assert len(reader.row_groups) == 3
+    assert reader.column_types == SCHEMA
+
+    expected = records[:-1] + [{"id": None, "name": "", "amount": None, "active": None}]
+    assert reader.readRecords() == expected
+
+
+def test_columnProjectionReadsOnlyRequestedColumns(workDir, monkeypatch):
+    '''
+    Test projected read decompresses only requested column chunks
+    '''
+    path = os.path.join(workDir, "orders.col")
+
+    with ColumnarWriter(path, SCHEMA, compression={"default": "zlib", "name": "lzma", "active": "none"}) as writer:
+        writer.write(makeRecords(30), chunk_size=10)
+
+    decompressed = []
+    compress, decompress = columnarStore.CODECS["zlib"]
+    monkeypatch.setitem(columnarStore.CODECS, "zlib", (compress, lambda data: decompressed.append(data) or decompress(data)))
+
+    reader = ColumnarReader(path)
+    columns = reader.readColumns(["amount", "id"])
+
+    assert list(columns) == ["amount", "id"]
+    assert columns["id"] == list(range(30))
+    # Two zlib columns in each of three row groups
+    assert len(decompressed) == 6
+    assert reader.row_groups[0]["columns"]["name"]["codec"] == "lzma"
+    assert [r["active"] for r in reader.iterChunks(["active"]).__next__()][:3] == [True, False, True]
+
+    with pytest.raises(KeyError):
+        reader.readColumns(["missing"])
+
+
+def test_readColumnBatch(workDir):
+    '''
+    Test columns load into typed NumPy arrays with null masks
+    '''
+    np = pytest.importorskip("numpy")
+    path = os.path.join(workDir, "orders.col")
+
+    with ColumnarWriter(path, SCHEMA) as writer:
+        writer.write(makeRecords(12), chunk_size=5)
+
+    batch = ColumnarReader(path).readColumnBatch(["id", "amount", "name"])
+
+    assert len(batch) == 12
+    assert batch.columns["id"].dtype == np.int64
+    assert batch.columns["amount"][3] == 4.5
+    assert batch.masks["name"].tolist() == [i % 5 == 0 for i in range(12)]
+    assert not batch.masks["id"].any()
+
+
+def test_invalidValueRejected(workDir):
+    '''
+    Test value that does not fit column type raises and failed writer leaves no file
+    '''
+    path = os.path.join(workDir, "orders.col")
+
+    with pytest.raises(ValueError, match="Column id"):
+        with ColumnarWriter(path, {"id": "integer"}) as writer:
+            writer.writeBatch([{"id": "abc"}])
+
+    assert os.listdir(workDir) == []
+
+
+def test_writerCreatesFileOnFirstWrite(workDir):
+    '''
+    Test writer leaves no temporary file until written to and an unwritten writer closes to an empty file
+    '''
+    path = os.path.join(workDir, "orders.col")
+    writer = openColumnarWriter(path, SCHEMA)
+    assert os.listdir(workDir) == []
+
+    writer.writeBatch(makeRecords(3))
+    assert len(os.listdir(workDir)) == 1
+    writer.abort()
+    assert os.listdir(workDir) == []
+
+    openColumnarWriter(path, SCHEMA).close()
+    assert ColumnarReader(path).num_rows == 0
+
+
+def test_concurrentWritersToSamePath(workDir):
+    '''
+    Test two writers to one path in the same process keep separate temporary files and the last close wins
+    '''
+    path = os.path.join(workDir, "orders.col")
+    first = openColumnarWriter(path, SCHEMA)
+    second = openColumnarWriter(path, SCHEMA)
+    first.writeBatch(makeRecords(3))
+    second.writeBatch(makeRecords(5))
+    assert len(os.listdir(workDir)) == 2
+
+    first.close()
+    assert ColumnarReader(path).num_rows == 3
+    second.close()
+    assert ColumnarReader(path).num_rows == 5
+    assert os.listdir(workDir) == ["orders.col"]
+
+
+def test_unsupportedCompression(workDir):
+    '''
+    Test unknown codec is rejected before writing
+    '''
+    with pytest.raises(ValueError, match="Unsupported compression"):
+        ColumnarWriter(os.path.join(workDir, "x.col"), SCHEMA, compression="snappy")
+
+
+def test_parquetRoundTrip(workDir):
+    '''
+    Test Parquet files are used for .parquet paths when pyarrow is installed
+    '''
+    pytest.importorskip("pyarrow")
+    path = os.path.join(workDir, "orders.parquet")
+
+    with openColumnarWriter(path, SCHEMA) as writer:
+        writer.write(makeRecords(20), chunk_size=8)
+
+    reader = openColumnarReader(path)
+    assert reader.num_rows == 20
+    assert reader.readColumns(["id"])["id"] == list(range(20))
@@ -0,0 +1,125 @@
+import bz2
+import gzip
+import io
+import json
+import lzma
+import os
+import tempfile
+import pytest
+from compressedInput import DecompressingReader, detectCompression, formatPath, iterDecompressed, openInput
+from dataLoader import loadFromFile, iterFile
+
+
+ROWS = [{"id": str(i), "name": f"name {i}"} for i in range(2000)]
+CSV_TEXT = "id,name\n" + "".join(f"{row['id']},{row['name']}\n" for row in ROWS)
+JSONL_TEXT = "".join(json.dumps(row) + "\n" for row in ROWS)
+
+
+@pytest.fixture
+def tempDir():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        yield temp_dir
+
+
+def writeFile(directory, name, data):
+    path = os.path.join(directory, name)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return path
+
+
+def test_detectCompressionByExtensionAndMagic(tempDir):
+    '''
+    Test codec is taken from extension, or from magic bytes when the extension is plain
+    '''
+    disguised = writeFile(tempDir, "orders.csv", gzip.compress(CSV_TEXT.encode()))
+    plain = writeFile(tempDir, "plain.csv", CSV_TEXT.encode())
+
+    assert detectCompression("orders.csv.GZ") == "gzip"
+    assert detectCompression("events.jsonl.zst") == "zstd"
+    assert detectCompression(disguised) == "gzip"
+    assert detectCompression(plain) is None
+    assert detectCompression(os.path.join(tempDir, "missing.csv")) is None
+    assert formatPath("drops/orders.json.bz2") == "drops/orders.json"
+
+
+def test_plainTextResemblingMagicIsNotCompressed(tempDir):
+    '''
+    Test plain CSV whose header starts with the bz2 magic letters is read as text, while bz2 data under a plain name is still detected
+    '''
+    text_path = writeFile(tempDir, "coords.csv", b"BZhx,y\n1,2\n")
+    disguised = writeFile(tempDir, "orders.csv", bz2.compress(CSV_TEXT.encode()))
+    empty = writeFile(tempDir, "empty.csv", bz2.compress(b""))
+
+    assert detectCompression(text_path) is None
+    assert loadFromFile(text_path) == [{"BZhx": "1", "y": "2"}]
+    assert detectCompression(disguised) == "bz2"
+    assert detectCompression(empty) == "bz2"
+
+
+@pytest.mark.parametrize("name, compress", [
+    ("orders.csv.gz", gzip.compress),
+    ("orders.csv.bz2", bz2.compress),
+    ("orders.csv.xz", lzma.compress),
+])
+def test_loadFromFileCompressedCsv(tempDir, name, compress):
+    '''
+    Test compressed CSV loads the same records as the plain file
+    '''
+    path = writeFile(tempDir, name, compress(CSV_TEXT.encode()))
+
+    assert loadFromFile(path) == ROWS
+
+
+def test_multiMemberGzipAndStreams(tempDir):
+    '''
+    Test concatenated gzip members and bz2 streams decompress as one file
+    '''
+    half = len(JSONL_TEXT) // 2
+    gz_path = writeFile(tempDir, "events.jsonl.gz", gzip.compress(JSONL_TEXT[:half].encode()) + gzip.compress(JSONL_TEXT[half:].encode()))
+    bz_path = writeFile(tempDir, "events.json.bz2", bz2.compress(b"[" + json.dumps(ROWS[0]).encode()) + bz2.compress(b"]"))
+
+    assert loadFromFile(gz_path) == ROWS
+    assert [r for chunk in iterFile(gz_path, chunk_size=500) for r in chunk] == ROWS
+    assert loadFromFile(bz_path) == ROWS[:1]
+
+
+def test_zstdFrames(tempDir):
+    '''
+    Test zstd frames are decompressed across frame boundaries when zstandard is installed
+    '''
+    zstandard = pytest.importorskip("zstandard")
+    compressor = zstandard.ZstdCompressor()
+    path = writeFile(tempDir, "events.jsonl.zst", compressor.compress(JSONL_TEXT[:100].encode()) + compressor.compress(JSONL_TEXT[100:].encode()))
+
+    assert loadFromFile(path) == ROWS
+
+
+def test_truncatedInputRaises():
+    '''
+    Test data cut before the end-of-stream marker raises instead of silently losing records
+    '''
+    data = gzip.compress(CSV_TEXT.encode())[:-20]
+
+    with pytest.raises(EOFError):
+        b"".join(iterDecompressed(io.BytesIO(data), "gzip", read_size=1024))
+
+
+def test_threadedReaderErrorsAndEarlyClose(tempDir):
+    '''
+    Test background decompression surfaces errors to the reader and stops when closed early
+    '''
+    bad_path = writeFile(tempDir, "bad.csv.gz", b"\x1f\x8b" + b"not gzip at all" * 10)
+    big_path = writeFile(tempDir, "big.csv.gz", gzip.compress(CSV_TEXT.encode() * 50))
+
+    with pytest.raises(Exception):
+        with openInput(bad_path, threaded=True) as f:
+            f.read()
+
+    reader = DecompressingReader(big_path, "gzip", read_size=4096, threaded=True, prefetch=1)
+    assert reader.read(10) == b"id,name\n0,"
+    reader.close()
+    assert not reader._thread.is_alive()
+
+    with openInput(big_path, threaded=True, read_size=4096) as f:
+        assert f.read().count("\n") == 50 * (len(ROWS) + 1)
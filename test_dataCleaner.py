@@ -0,0 +1,102 @@
+import pytest
+from dataCleaner import cleanData, cleanDataWithReport, cleanRecord, compileSchema, removeDuplicates
+
+
+SCHEMA = {"id": "integer", "name": "string", "score": "float"}
+
+
+def test_cleanData():
+    '''
+    Test cleaning list of records converts types and skips invalid records
+    '''
+    records = [
+        {"id": "1", "name": " a ", "score": "1.5"},
+        {"id": "bad", "name": "b", "score": "2"}
+    ]
+
+    result = cleanData(records, SCHEMA)
+    assert result == [{"id": 1, "name": "a", "score": 1.5}]
+
+
+def test_cleanDataChunkStream():
+    '''
+    Test cleaning chunk stream returns lazily cleaned batches
+    '''
+    chunks = iter([
+        [{"id": "1", "name": "a", "score": "1"}],
+        [{"id": "x", "name": "b", "score": "2"}, {"id": "3", "name": "c", "score": ""}]
+    ])
+
+    result = cleanData(chunks, SCHEMA)
+    assert not isinstance(result, list)
+    assert list(result) == [
+        [{"id": 1, "name": "a", "score": 1.0}],
+        [{"id": 3, "name": "c", "score": None}]
+    ]
+
+
+def test_removeDuplicatesChunkStream():
+    '''
+    Test duplicates are removed across batch boundaries keeping first occurrence
+    '''
+    chunks = iter([
+        [{"id": 1, "v": "a"}, {"id": 2, "v": "b"}],
+        [{"id": 1, "v": "c"}, {"id": 3, "v": "d"}]
+    ])
+
+    result = list(removeDuplicates(chunks, ["id"]))
+    assert result == [[{"id": 1, "v": "a"}, {"id": 2, "v": "b"}], [{"id": 3, "v": "d"}]]
+
+
+def test_compileSchemaCached():
+    '''
+    Test equal schemas share one compiled plan and changed schemas get a new one
+    '''
+    plan = compileSchema(dict(SCHEMA))
+
+    assert compileSchema(dict(SCHEMA)) is plan
+    assert [field for field, _, _ in plan] == ["id", "name", "score"]
+    assert compileSchema({**SCHEMA, "active": "boolean"}) is not plan
+
+
+def test_cleanRecordTypedFastPath():
+    '''
+    Test already-typed values pass through and blank strings become None
+    '''
+    schema = {"id": "integer", "score": "float", "active": "boolean", "name": "string", "extra": "unknown"}
+    record = {"id": 5, "score": 1.5, "active": "Yes", "name": "   ", "extra": " "}
+
+    assert cleanRecord(record, schema) == {"id": 5, "score": 1.5, "active": True, "name": None, "extra": None}
+    assert cleanRecord({"id": " 7 ", "score": " "}, schema)["id"] == 7
+
+
+def test_cleanDataWithReport():
+    '''
+    Test rejection report records row index, field and reason for each dropped record
+    '''
+    records = [
+        {"id": "1", "name": "a", "score": "1"},
+        {"id": "2", "name": "", "score": "1"},
+        {"id": "3", "name": "c", "score": "high"},
+        "not a record"
+    ]
+
+    cleaned, rejections = cleanDataWithReport(records, SCHEMA, required_fields=["name"])
+
+    assert cleaned == [{"id": 1, "name": "a", "score": 1.0}]
+    assert rejections == [
+        {"row": 1, "field": "name", "reason": "missing required field"},
+        {"row": 2, "field": "score", "reason": "invalid float"},
+        {"row": 3, "field": None, "reason": "record is not a non-empty dict"}
+    ]
+
+
+def test_cleanDataWithReportChunkStream():
+    '''
+    Test rejection row indices count across batches of a chunk stream
+    '''
+    chunks = iter([[{"id": "1"}, {"id": "x"}], [{"id": "y"}]])
+
+    results = list(cleanDataWithReport(chunks, {"id": "integer"}))
+
+    assert [row["row"] for _, rejections in results for row in rejections] == [1, 2]
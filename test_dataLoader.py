@@ -3,8 +3,9 @@ import json
 import csv
 import tempfile
 import os
+import dataLoader
 from unittest.mock import patch, MagicMock
-from dataLoader import loadFromAPI, loadFromFile
+from dataLoader import loadFromAPI, loadFromFile, iterFile
 
 
 def test_loadFromAPIList():
@@ -18,7 +19,7 @@ def test_loadFromAPIList():
     
     with patch('dataLoader.requests.get') as mock_get:
         mock_response = MagicMock()
-        mock_response.json.return_value = mock_data
+        mock_response.content = json.dumps(mock_data).encode()
         mock_get.return_value = mock_response
         
         result = loadFromAPI("https://api.example.com/data")
@@ -34,7 +35,7 @@ def test_loadFromAPIDict():
     
     with patch('dataLoader.requests.get') as mock_get:
         mock_response = MagicMock()
-        mock_response.json.return_value = mock_data
+        mock_response.content = json.dumps(mock_data).encode()
         mock_get.return_value = mock_response
         
         result = loadFromAPI("https://api.example.com/data")
@@ -74,6 +75,32 @@ def test_loadFromFileJSON():
         os.unlink(temp_file)
 
 
+def test_loadFromFileJSONBatches():
+    '''
+    Test JSON array is decoded in blocks that end between objects, even with braces in strings and nested objects
+    '''
+    test_data = [{"id": i, "note": "a}, {b" if i % 3 else "ü", "lines": [{"n": n} for n in range(i % 4)]} for i in range(40)]
+
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
+        json.dump(test_data, f, indent=2)
+        temp_file = f.name
+
+    try:
+        with open(temp_file, 'rb') as f:
+            batches = list(dataLoader._iterJsonBatches(f, read_size=64))
+
+        assert len(batches) > 1
+        assert [record for batch in batches for record in batch] == test_data
+        assert loadFromFile(temp_file) == test_data
+
+        for content, expected in (('{"id": 1}', [{"id": 1}]), ('[]', []), ('[1, 2]', [1, 2])):
+            with open(temp_file, 'w') as f:
+                f.write(content)
+            assert loadFromFile(temp_file) == expected
+    finally:
+        os.unlink(temp_file)
+
+
 def test_loadFromFileCSV():
     '''
     Test loading data from CSV file
@@ -93,6 +120,21 @@ def test_loadFromFileCSV():
         os.unlink(temp_file)
 
 
+def test_loadFromFileJSONLines():
+    '''
+    Test loading data from NDJSON file, including unterminated last line
+    '''
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.ndjson', delete=False) as f:
+        f.write('{"id": 1}\n\n{"id": 2}')
+        temp_file = f.name
+
+    try:
+        result = loadFromFile(temp_file)
+        assert result == [{"id": 1}, {"id": 2}]
+    finally:
+        os.unlink(temp_file)
+
+
 def test_loadFromFileNotFound():
     '''
     Test loading from non-existent file returns empty list
@@ -112,4 +154,63 @@ def test_loadFromFileUnsupported():
         result = loadFromFile(temp_file)
         assert result == []
     finally:
-        os.unlink(temp_file)
\ No newline at end of file
+        os.unlink(temp_file)
+
+
+def test_iterFileJSONChunks():
+    '''
+    Test streaming JSON array file yields bounded batches in order
+    '''
+    test_data = [{"id": i, "name": f"item{i}"} for i in range(25)]
+
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
+        json.dump(test_data, f, indent=2)
+        temp_file = f.name
+
+    try:
+        chunks = list(iterFile(temp_file, chunk_size=10))
+        assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+        assert [r for chunk in chunks for r in chunk] == test_data
+    finally:
+        os.unlink(temp_file)
+
+
+def test_iterFileJSONLines():
+    '''
+    Test streaming JSON Lines file skips blank lines
+    '''
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.jsonl', delete=False) as f:
+        f.write('{"id": 1}\n\n{"id": 2}\n{"id": 3}\n')
+        temp_file = f.name
+
+    try:
+        chunks = list(iterFile(temp_file, chunk_size=2))
+        assert chunks == [[{"id": 1}, {"id": 2}], [{"id": 3}]]
+    finally:
+        os.unlink(temp_file)
+
+
+def test_iterFileCSV():
+    '''
+    Test streaming CSV file matches loadFromFile output
+    '''
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False) as f:
+        writer = csv.DictWriter(f, fieldnames=['id', 'name'])
+        writer.writeheader()
+        for i in range(5):
+            writer.writerow({'id': str(i), 'name': f'item{i}'})
+        temp_file = f.name
+
+    try:
+        chunks = list(iterFile(temp_file, chunk_size=2))
+        assert len(chunks) == 3
+        assert [r for chunk in chunks for r in chunk] == loadFromFile(temp_file)
+    finally:
+        os.unlink(temp_file)
+
+
+def test_iterFileNotFound():
+    '''
+    Test streaming non-existent file yields no batches
+    '''
+    assert list(iterFile("/nonexistent/file.json")) == []
@@ -0,0 +1,70 @@
+import os
+import tempfile
+import pytest
+from dataCleaner import removeDuplicates
+from dedupeEngine import BloomFilter, DedupeEngine, keyDigest
+
+
+RECORDS = [{"id": i % 300, "seq": i} for i in range(1000)]
+
+
+def test_dedupeEngineSpillsAndKeepsFirstOccurrence():
+    '''
+    Test engine spills past memory budget and still removes duplicates of spilled keys
+    '''
+    with tempfile.TemporaryDirectory() as spill_dir:
+        with DedupeEngine(["id"], max_memory_keys=50, spill_dir=spill_dir) as engine:
+            unique = [r for chunk in engine.filterChunks(iter([RECORDS[:400], RECORDS[400:]])) for r in chunk]
+
+            assert engine.spill_count == 6
+            assert len(os.listdir(spill_dir)) == 1
+
+        assert os.listdir(spill_dir) == []
+
+    assert unique == RECORDS[:300]
+    assert engine.duplicates_removed == 700
+
+
+def test_dedupeEngineWithoutBloom():
+    '''
+    Test engine gives same result when every spilled lookup goes to disk
+    '''
+    with DedupeEngine(["id"], max_memory_keys=20, use_bloom=False) as engine:
+        assert engine.filter(RECORDS) == RECORDS[:300]
+        assert engine.disk_lookups > 0
+
+
+def test_numericKeysMatchInMemoryDedupe():
+    '''
+    Test keys equal as Python values dedupe alike with and without the disk-backed engine
+    '''
+    records = [{"id": 1}, {"id": 1.0}, {"id": True}, {"id": "1"}, {"id": 2.5}, {"id": 2.5}, {"id": -0.0}, {"id": 0}, {"id": None}]
+
+    expected = removeDuplicates(list(records), ["id"])
+    spilled = removeDuplicates(iter([records[:4], records[4:]]), ["id"], max_memory_keys=2)
+    assert [r for chunk in spilled for r in chunk] == expected
+    assert [r["id"] for r in expected] == [1, "1", 2.5, -0.0, None]
+
+
+def test_bloomFilterSkipsDiskForNewKeys():
+    '''
+    Test Bloom filter has no false negatives and rejects most unseen digests
+    '''
+    bloom = BloomFilter(1000, 0.01)
+    added = [keyDigest({"id": i}, ["id"]) for i in range(1000)]
+    for digest in added:
+        bloom.add(digest)
+
+    assert all(digest in bloom for digest in added)
+    false_positives = sum(keyDigest({"id": -i}, ["id"]) in bloom for i in range(1, 5001))
+    assert false_positives < 150
+
+
+def test_removeDuplicatesMemoryBudget():
+    '''
+    Test removeDuplicates uses spilling engine for chunk streams when budget given
+    '''
+    chunks = iter([RECORDS[:500], RECORDS[500:]])
+
+    result = list(removeDuplicates(chunks, ["id"], max_memory_keys=100))
+    assert result == [RECORDS[:300], []]
@@ -0,0 +1,101 @@
+import copy
+import os
+import tempfile
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database import Base
+from featureEngine import applyFeatures
+from featureState import FeaturePipeline, MinMaxScaler, Binner, saveFeatureState, loadFeatureState
+
+
+SPECS = [
+    {"type": "normalize", "field": "value"},
+    {"type": "categorize", "field": "value", "bins": [10, 50]},
+    {"type": "ratio", "numerator": "value", "denominator": "count", "name": "value_per_count"}
+]
+RECORDS = [{"value": float(v), "count": v % 4} for v in range(0, 100, 3)] + [{"value": None, "count": 1}]
+
+
+def test_partialFitMatchesFullBatch():
+    '''
+    Test fitting chunk by chunk gives same output as normalizing full batch at once
+    '''
+    expected = applyFeatures(copy.deepcopy(RECORDS), SPECS)
+
+    pipeline = FeaturePipeline.fromSpecs(SPECS)
+    chunks = [copy.deepcopy(RECORDS[i:i + 5]) for i in range(0, len(RECORDS), 5)]
+    pipeline.fit(chunks)
+
+    result = [r for chunk in pipeline.transform(iter(chunks)) for r in chunk]
+    assert result == expected
+
+
+def test_partialFitDerivedRatioField():
+    '''
+    Test transformers on a ratio output fit on the ratio values without changing the fitted batch
+    '''
+    specs = SPECS + [{"type": "normalize", "field": "value_per_count"}, {"type": "categorize", "field": "value_per_count", "n_bins": 2}]
+    chunks = [copy.deepcopy(RECORDS[i:i + 5]) for i in range(0, len(RECORDS), 5)]
+    pipeline = FeaturePipeline.fromSpecs(specs).fit(chunks)
+
+    assert all("value_per_count" not in r for chunk in chunks for r in chunk)
+    assert (pipeline.transformers[3].min_val, pipeline.transformers[3].max_val) == (1.0, 93.0)
+    assert pipeline.transformers[4].bins == [47.0]
+
+    with pytest.raises(ValueError):
+        FeaturePipeline.fromSpecs(SPECS + [{"type": "normalize", "field": "value_category"}])
+
+
+def test_binnerLearnedThresholds():
+    '''
+    Test equal-width thresholds learned from running min and max
+    '''
+    binner = Binner("v", n_bins=4)
+    binner.partialFit([{"v": 0}, {"v": 10}]).partialFit([{"v": 40}])
+
+    assert binner.bins == [10.0, 20.0, 30.0]
+    assert binner.transform([{"v": 25}])[0]["v_category"] == 2
+
+
+def test_unfittedScalerLeavesRecords():
+    '''
+    Test transform before any values were fitted leaves records unchanged
+    '''
+    assert MinMaxScaler("v").transform([{"v": 1}]) == [{"v": 1}]
+
+
+def test_saveAndLoadFile():
+    '''
+    Test fitted state round-trips through JSON file
+    '''
+    pipeline = FeaturePipeline.fromSpecs(SPECS).partialFit(copy.deepcopy(RECORDS))
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "features.json")
+        pipeline.save(path)
+        loaded = FeaturePipeline.load(path)
+
+    assert loaded.toDict() == pipeline.toDict()
+    new_batch = [{"value": 33.0, "count": 3}]
+    assert loaded.transform(copy.deepcopy(new_batch)) == pipeline.transform(copy.deepcopy(new_batch))
+
+
+def test_saveAndLoadDatabase():
+    '''
+    Test fitted state is stored and replaced in database by name
+    '''
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+
+    pipeline = FeaturePipeline([MinMaxScaler("v", 0.0, 10.0)])
+    saveFeatureState(session, "daily", pipeline)
+    pipeline.transformers[0].max_val = 20.0
+    saveFeatureState(session, "daily", pipeline)
+
+    loaded = loadFeatureState(session, "daily")
+    assert loaded.transformers[0].max_val == 20.0
+    assert loadFeatureState(session, "missing") is None
+
+    session.close()
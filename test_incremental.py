@@ -0,0 +1,262 @@
+import json
+import os
+import tempfile
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from database import Base
+from models import DataSource, RecordHash, StagedRecordHash
+from incremental import IncrementalFileReader, ChangeDetector, WatermarkTracker, contentHash
+from pipeline import buildPipeline
+from profiling import loadSourceProfile
+
+
+def writeLines(path, records, mode='a'):
+    with open(path, mode) as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+@pytest.fixture
+def workDir():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        yield temp_dir
+
+
+@pytest.fixture
+def engine(workDir):
+    engine = create_engine(f"sqlite:///{os.path.join(workDir, 'pipeline.db')}")
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+def readAll(reader):
+    return [record for chunk in reader.chunks(10) for record in chunk]
+
+
+def test_incrementalFileReaderResumesAfterAppend(workDir):
+    '''
+    Test reader returns only appended lines and nothing for unchanged file
+    '''
+    path = os.path.join(workDir, "orders.jsonl")
+    writeLines(path, [{"id": i} for i in range(3)], mode='w')
+
+    first = IncrementalFileReader(path)
+    assert [r["id"] for r in readAll(first)] == [0, 1, 2]
+
+    unchanged = IncrementalFileReader(path, **first.checkpoint)
+    assert readAll(unchanged) == []
+
+    writeLines(path, [{"id": 3}])
+    with open(path, 'a') as f:
+        # Partial trailing line is left for the next run
+        f.write('{"id": 4')
+
+    appended = IncrementalFileReader(path, **first.checkpoint)
+    assert [r["id"] for r in readAll(appended)] == [3]
+    assert appended.checkpoint["last_offset"] < os.path.getsize(path)
+
+
+def test_incrementalFileReaderRereadsTruncatedFile(workDir):
+    '''
+    Test file that shrank since checkpoint is read from the start, CSV header kept
+    '''
+    path = os.path.join(workDir, "orders.csv")
+    with open(path, 'w') as f:
+        f.write("id,name\n1,a\n2,b\n3,c\n")
+
+    first = IncrementalFileReader(path)
+    assert len(readAll(first)) == 3
+
+    with open(path, 'w') as f:
+        f.write("id,name\n9,z\n")
+
+    rewritten = IncrementalFileReader(path, **first.checkpoint)
+    assert readAll(rewritten) == [{"id": "9", "name": "z"}]
+
+
+def test_incrementalFileReaderRereadsRewrittenFile(workDir):
+    '''
+    Test file rewritten with different content of equal or larger size is read from the start
+    '''
+    path = os.path.join(workDir, "orders.jsonl")
+    writeLines(path, [{"id": i} for i in range(3)], mode='w')
+
+    first = IncrementalFileReader(path)
+    readAll(first)
+
+    writeLines(path, [{"id": i} for i in range(5, 9)], mode='w')
+    os.utime(path, (first.checkpoint["last_mtime"] + 10, first.checkpoint["last_mtime"] + 10))
+
+    rewritten = IncrementalFileReader(path, **first.checkpoint)
+    assert [r["id"] for r in readAll(rewritten)] == [5, 6, 7, 8]
+
+    writeLines(path, [{"id": 9}])
+    appended = IncrementalFileReader(path, **rewritten.checkpoint)
+    assert [r["id"] for r in readAll(appended)] == [9]
+
+
+def test_watermarkTrackerKeepsHighestValue():
+    '''
+    Test watermark advances to highest value seen and never moves backwards
+    '''
+    tracker = WatermarkTracker("updated_at", "2024-01-02")
+    chunks = [[{"updated_at": "2024-01-01"}], [{"updated_at": "2024-01-05"}, {"updated_at": None}]]
+
+    assert list(tracker.track(chunks)) == chunks
+    assert tracker.checkpoint["last_watermark"] == "2024-01-05"
+
+
+def test_watermarkTrackerNumericValues():
+    '''
+    Test numeric and epoch watermarks order by value across a digit boundary
+    '''
+    tracker = WatermarkTracker("version", "9")
+    chunks = [[{"version": 8}, {"version": 10}], [{"version": "11"}, {"version": 2}]]
+
+    list(tracker.track(chunks))
+    assert tracker.checkpoint["last_watermark"] == "11"
+
+    epoch = WatermarkTracker("ts", "999999999.5")
+    list(epoch.track([[{"ts": 1000000000}, {"ts": 99999999}]]))
+    assert epoch.checkpoint["last_watermark"] == "1000000000"
+
+
+def test_changeDetectorSkipsUnchangedRecords(engine):
+    '''
+    Test detector passes new and changed records and skips those with committed hash
+    '''
+    with Session(bind=engine) as session:
+        source = DataSource(name="orders", source_type="file", endpoint="orders.jsonl")
+        session.add(source)
+        session.commit()
+
+        detector = ChangeDetector(session, source.id, ["id"])
+        assert len(detector.filter([{"id": 1, "v": "a"}, {"id": 2, "v": "b"}])) == 2
+        detector.commit()
+        session.commit()
+
+        detector = ChangeDetector(session, source.id, ["id"])
+        changed = detector.filter([{"id": 1, "v": "a"}, {"id": 2, "v": "c"}, {"id": 3, "v": "d"}])
+
+    assert changed == [{"id": 2, "v": "c"}, {"id": 3, "v": "d"}]
+    assert (detector.new_count, detector.changed_count, detector.unchanged_count) == (1, 1, 1)
+
+
+def test_changeDetectorStagesPendingHashes(engine):
+    '''
+    Test pending hashes beyond max_pending are staged, committed together and ignored after a failed run
+    '''
+    with Session(bind=engine) as session:
+        source = DataSource(name="orders", source_type="file", endpoint="orders.jsonl")
+        session.add(source)
+        session.commit()
+
+        failed = ChangeDetector(session, source.id, ["id"], max_pending=2)
+        failed.filter([{"id": i, "v": "x"} for i in range(5)])
+        session.rollback()
+
+        detector = ChangeDetector(session, source.id, ["id"], max_pending=2)
+        changed = [r for start in range(0, 9, 3) for r in detector.filter([{"id": i % 6, "v": i} for i in range(start, start + 3)])]
+
+        assert len(changed) == 9
+        assert len(detector.pending) < 2
+        assert (detector.new_count, detector.changed_count) == (6, 3)
+
+        detector.commit()
+        session.commit()
+
+        assert session.query(StagedRecordHash).count() == 0
+        assert session.query(RecordHash).count() == 6
+
+        again = ChangeDetector(session, source.id, ["id"])
+        assert again.filter([{"id": i % 6, "v": i} for i in range(3, 9)]) == []
+
+
+def test_contentHashIgnoresKeyOrder():
+    '''
+    Test content hash depends on values only, not key order
+    '''
+    assert contentHash({"a": 1, "b": 2}) == contentHash({"b": 2, "a": 1})
+    assert contentHash({"a": 1}) != contentHash({"a": 2})
+
+
+def test_incrementalPipelineProcessesOnlyNewData(workDir, engine):
+    '''
+    Test second run of incremental pipeline reads only appended records and saves checkpoint
+    '''
+    path = os.path.join(workDir, "orders.jsonl")
+    writeLines(path, [{"id": str(i), "amount": str(i * 2)} for i in range(20)], mode='w')
+
+    config = {
+        "schema": {"id": "integer", "amount": "float"},
+        "dedupe_keys": ["id"],
+        "sink": {"table": "orders_clean", "upsert": True},
+        "incremental": True,
+        "chunk_size": 5,
+    }
+
+    with Session(bind=engine) as session:
+        source = DataSource(name="orders", source_type="file", endpoint=path)
+        session.add(source)
+        session.commit()
+        source_id = source.id
+
+    def runOnce():
+        with Session(bind=engine) as session:
+            source = session.get(DataSource, source_id)
+            progress = buildPipeline(config, source, engine).run()
+        return {stage["name"]: stage for stage in progress["stages"]}
+
+    first = runOnce()
+    assert first["sink"]["records_out"] == 20
+    assert first["changes"]["new"] == 20
+
+    # Rewrite one old record unchanged and one changed, and append new ones
+    writeLines(path, [{"id": "3", "amount": "6"}, {"id": "4", "amount": "99"}, {"id": "20", "amount": "40"}])
+
+    second = runOnce()
+    assert second["load"]["records_out"] == 3
+    assert (second["changes"]["new"], second["changes"]["changed"], second["changes"]["unchanged"]) == (1, 1, 1)
+    assert second["sink"]["records_out"] == 2
+
+    third = runOnce()
+    assert third["load"]["records_out"] == 0
+
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT COUNT(*) FROM orders_clean")).scalar() == 21
+        assert connection.execute(text("SELECT amount FROM orders_clean WHERE id = 4")).scalar() == 99.0
+        assert connection.execute(text("SELECT COUNT(*) FROM record_hashes")).scalar() == 21
+
+    with Session(bind=engine) as session:
+        source = session.get(DataSource, source_id)
+        assert source.last_offset == os.path.getsize(path)
+        assert source.last_run_at is not None
+
+
+def test_incrementalProfileCommittedWithCheckpoint(workDir, engine, monkeypatch):
+    '''
+    Test profile is not merged when the checkpoint commit fails, so the retried run counts each record once
+    '''
+    path = os.path.join(workDir, "orders.jsonl")
+    writeLines(path, [{"id": str(i)} for i in range(3)], mode='w')
+    config = {"schema": {"id": "integer"}, "dedupe_keys": ["id"], "incremental": True, "profile": True}
+
+    with Session(bind=engine) as session:
+        source = DataSource(name="orders", source_type="file", endpoint=path)
+        session.add(source)
+        session.commit()
+
+        def failCheckpoint(session, source_id, checkpoint):
+            raise RuntimeError("checkpoint write failed")
+
+        with monkeypatch.context() as patch:
+            patch.setattr("pipeline.saveCheckpoint", failCheckpoint)
+            with pytest.raises(RuntimeError):
+                buildPipeline(config, source, engine).run()
+
+        assert loadSourceProfile(session, source.id) is None
+
+        buildPipeline(config, source, engine).run()
+        assert loadSourceProfile(session, source.id).records == 3
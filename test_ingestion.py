@@ -0,0 +1,231 @@
+import asyncio
+import threading
+import time
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+import httpx
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+from asyncLoader import AIMDLimiter, ingest, iterPaginatedAPI, parseRetryAfter
+from dataCleaner import cleanData
+from recordSink import RecordSink
+
+
+RECORDS = [{"id": i, "amount": str(i * 1.5)} for i in range(200)]
+PAGE_SIZE = 10
+OFFSET = {"type": "offset", "page_size": PAGE_SIZE}
+
+
+class RateLimitedHandler:
+    '''
+    Stub API serving RECORDS by offset. Latency is flat up to capacity concurrent requests and grows as they queue beyond it. Above limit it answers 429 with Retry-After.
+    '''
+
+    def __init__(self, capacity=4, limit=None, latency=0.02, retry_after="0.05", fail_first=0):
+        self.capacity = capacity
+        self.limit = limit or capacity * 2
+        self.latency = latency
+        self.retry_after = retry_after
+        self.fail_first = fail_first
+        self.active = 0
+        self.peak_active = 0
+        self.throttled = 0
+        self.served = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, path, query, headers):
+        with self.lock:
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+            active = self.active
+            failing = self.fail_first > 0
+            self.fail_first -= 1
+
+        try:
+            if failing:
+                return 503, {}, {"error": "warming up"}
+
+            if active > self.limit:
+                with self.lock:
+                    self.throttled += 1
+                return 429, {"Retry-After": self.retry_after}, {"error": "slow down"}
+
+            time.sleep(self.latency * max(1.0, active / self.capacity))
+            offset = int(query["offset"])
+
+            with self.lock:
+                self.served += 1
+            return 200, {}, {"results": RECORDS[offset:offset + int(query["limit"])]}
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+def test_parseRetryAfterAndBackoff():
+    '''
+    Test Retry-After accepts seconds and HTTP dates, ignoring junk and capping long waits
+    '''
+    future = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+
+    assert parseRetryAfter("2") == 2.0
+    assert 25 < parseRetryAfter(future) <= 30
+    assert parseRetryAfter("soon") is None and parseRetryAfter(None) is None
+    assert parseRetryAfter("86400") == 60.0
+
+
+def test_aimdLimiterIncreasesAndBacksOff():
+    '''
+    Test limit grows about one per round trip of successes and halves on throttling or latency spikes
+    '''
+    limiter = AIMDLimiter(initial=4, max_limit=8)
+
+    for _ in range(40):
+        limiter.onSuccess(0.01)
+    assert limiter.limit == 8
+
+    limiter.onThrottle(latency=0.01)
+    assert limiter.limit == 4
+    # Responses from the same round trip do not cut again
+    limiter.onThrottle(latency=0.01)
+    assert limiter.limit == 4
+
+    time.sleep(0.02)
+    limiter.onSuccess(0.5)
+    assert limiter.limit == 2
+    assert limiter.stats()["throttled"] == 2
+
+    with pytest.raises(ValueError):
+        AIMDLimiter(initial=10, max_limit=4)
+
+
+def test_aimdLimiterPausesForRetryAfter():
+    '''
+    Test acquire waits out Retry-After pause and never exceeds the limit
+    '''
+    async def run():
+        limiter = AIMDLimiter(initial=4)
+        # Halves limit to two and pauses every acquire
+        limiter.onThrottle(retry_after=0.1)
+        start = time.monotonic()
+        await limiter.acquire()
+        await limiter.acquire()
+        waited = time.monotonic() - start
+
+        blocked = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0.02)
+        assert not blocked.done()
+        await limiter.release()
+        await blocked
+        return waited
+
+    assert asyncio.run(run()) >= 0.09
+
+
+def test_ingestAdaptsToRateLimitsWithoutLoss(stubServer):
+    '''
+    Test end to end run against throttling server cleans and writes every record once while backing off
+    '''
+    handler = RateLimitedHandler(capacity=4, limit=4)
+    server = stubServer(handler)
+    received = []
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    sink = RecordSink(engine, "ingested", {"id": "integer", "amount": "float"}, key_fields=["id"])
+    sink.createTable()
+
+    def cleanAndWrite(page):
+        received.extend(page)
+        sink.writeBatch(cleanData(page, {"id": "integer", "amount": "float"}))
+
+    stats = ingest(server.url + "/items", cleanAndWrite, pagination=OFFSET, max_concurrency=16, initial_concurrency=8, base_delay=0.01, seed=1)
+
+    assert received == RECORDS
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT COUNT(DISTINCT id), SUM(amount) FROM ingested")).one() == (200, sum(i * 1.5 for i in range(200)))
+    assert handler.throttled > 0 and stats["throttled"] > 0
+    assert stats["retries"] >= stats["throttled"] and stats["decreases"] > 0
+    assert stats["pages"] == len(RECORDS) // PAGE_SIZE
+
+
+def test_ingestGrowsConcurrencyTowardsCapacity(stubServer):
+    '''
+    Test limit grows from a low start while the server keeps up
+    '''
+    handler = RateLimitedHandler(capacity=8)
+    server = stubServer(handler)
+    received = []
+
+    stats = ingest(server.url, received.extend, pagination={"type": "offset", "page_size": 2}, max_concurrency=32, initial_concurrency=2)
+
+    assert received == RECORDS
+    assert stats["peak_limit"] >= 4
+    assert handler.peak_active >= 3
+
+
+def test_slowConsumerThrottlesFetching(stubServer):
+    '''
+    Test bounded queue holds fetching back to the pace of a slow consumer
+    '''
+    handler = RateLimitedHandler(capacity=100, latency=0.001)
+    server = stubServer(handler)
+    lead = []
+
+    def slowWrite(page):
+        # Pages fetched but not yet written, must stay bounded by queue and fetch window
+        lead.append(handler.served - len(lead))
+        time.sleep(0.03)
+
+    stats = ingest(server.url, slowWrite, pagination=OFFSET, queue_size=2, max_concurrency=8, initial_concurrency=8)
+
+    assert stats["pages"] == 20
+    assert stats["max_queued"] <= 2
+    assert max(lead) <= 2 + 8 + 2
+
+
+def test_ingestRaisesAfterRetries(stubServer):
+    '''
+    Test failures are retried then raised instead of returning partial data, and client errors are not retried
+    '''
+    handler = RateLimitedHandler(fail_first=2)
+    server = stubServer(handler)
+    records = []
+
+    stats = ingest(server.url, records.extend, pagination=OFFSET, base_delay=0.01)
+    assert records == RECORDS and stats["retries"] >= 2
+
+    failing = stubServer(lambda path, query, headers: (500, {}, {"error": "down"}))
+    with pytest.raises(httpx.HTTPStatusError):
+        ingest(failing.url, records.extend, max_attempts=3, base_delay=0.01)
+    assert len(failing.requests) == 3
+
+    missing = stubServer(lambda path, query, headers: (404, {}, {"error": "missing"}))
+    with pytest.raises(httpx.HTTPStatusError):
+        ingest(missing.url, records.extend, base_delay=0.01)
+    assert len(missing.requests) == 1
+
+
+def test_ingestConsumerErrorStopsRun(stubServer):
+    '''
+    Test consumer failure stops fetching and is raised
+    '''
+    server = stubServer(RateLimitedHandler(capacity=100, latency=0.001))
+
+    async def failingWrite(page):
+        raise RuntimeError("database down")
+
+    with pytest.raises(RuntimeError, match="database down"):
+        ingest(server.url, failingWrite, pagination=OFFSET, queue_size=1)
+    assert len(server.requests) < len(RECORDS) // PAGE_SIZE
+
+
+def test_iterPaginatedAPIAdaptive(stubServer):
+    '''
+    Test synchronous page iterator uses adaptive loader when asked
+    '''
+    handler = RateLimitedHandler(capacity=2)
+    server = stubServer(handler)
+
+    pages = list(iterPaginatedAPI(server.url, pagination=OFFSET, max_concurrency=8, adaptive={"initial_concurrency": 8, "base_delay": 0.01}))
+
+    assert [r for page in pages for r in page] == RECORDS
+    assert handler.throttled > 0
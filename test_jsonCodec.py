@@ -0,0 +1,109 @@
+import json
+import pytest
+from datetime import date, datetime, timezone
+import jsonCodec
+from compactRows import rowType
+from jsonCodec import availableBackends, getCodec, setBackend, loads, dumps
+
+
+BACKENDS = availableBackends()
+DOCUMENT = {"id": 1, "name": "café \U0001F600", "amount": 2.5, "tags": ["a", None, True], "nested": {"x": -3}}
+
+
+@pytest.fixture
+def restoreBackend():
+    '''
+    Put module codec back after tests that switch it
+    '''
+    previous = jsonCodec._codec
+    yield
+    jsonCodec._codec = previous
+
+
+@pytest.mark.parametrize("name", BACKENDS)
+def test_codecRoundTrip(name):
+    '''
+    Test every installed backend decodes bytes, memoryview and str and encodes compact UTF-8
+    '''
+    codec = getCodec(name)
+    encoded = codec.dumps(DOCUMENT)
+
+    assert encoded == json.dumps(DOCUMENT, ensure_ascii=False, separators=(',', ':')).encode()
+    assert codec.loads(encoded) == codec.loads(memoryview(encoded)) == codec.loads(encoded.decode()) == DOCUMENT
+    assert codec.dumps({"b": 1, "a": 2}, sort_keys=True) == b'{"a":2,"b":1}'
+
+
+def test_backendsEncodeRecordsIdentically():
+    '''
+    Test every installed backend encodes NaN, infinities and datetimes of the same record to the same bytes
+    '''
+    record = {
+        "id": 7, "score": float("nan"), "limits": [float("inf"), -float("inf"), 1.5],
+        "created": datetime(2024, 1, 2, 3, 4, 5), "updated": datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc), "day": date(2024, 1, 2),
+    }
+    expected = b'{"id":7,"score":null,"limits":[null,null,1.5],"created":"2024-01-02 03:04:05","updated":"2024-01-02 03:04:05+00:00","day":"2024-01-02"}'
+
+    assert {name: getCodec(name).dumps(record, default=str) for name in BACKENDS} == {name: expected for name in BACKENDS}
+
+    for name in BACKENDS:
+        with pytest.raises(TypeError):
+            getCodec(name).dumps({"created": datetime(2024, 1, 2)})
+
+
+@pytest.mark.parametrize("name", BACKENDS)
+def test_codecMatchesStdlibEdgeCases(name):
+    '''
+    Test values fast backends reject still decode and encode as json does, and invalid input raises JSONDecodeError
+    '''
+    codec = getCodec(name)
+    big = 2 ** 70
+
+    assert codec.loads(b'[NaN, 123456789012345678901234567890]')[1] == 123456789012345678901234567890
+    assert codec.loads(codec.dumps({"n": big})) == {"n": big}
+    assert codec.dumps({1: "a"}) == b'{"1":"a"}'
+
+    with pytest.raises(json.JSONDecodeError):
+        codec.loads(b'{"id": 1,')
+    with pytest.raises(TypeError):
+        codec.dumps({"s": {1, 2}})
+
+
+@pytest.mark.parametrize("name", BACKENDS)
+def test_codecEncodesMappingsAndDefault(name):
+    '''
+    Test compact rows encode as objects and unknown values go through default
+    '''
+    codec = getCodec(name)
+    row = rowType(("id", "name"))(1, "a")
+
+    assert codec.loads(codec.dumps([row])) == [{"id": 1, "name": "a"}]
+    assert codec.dumps({"v": object}, default=lambda value: "custom") == b'{"v":"custom"}'
+
+
+def test_selectBackend(restoreBackend):
+    '''
+    Test module functions follow selected backend and unknown or missing backends are reported
+    '''
+    assert setBackend("json").name == "json"
+    assert loads(b'{"a": [1]}') == {"a": [1]}
+    assert dumps([1, "x"]) == b'[1,"x"]'
+    assert getCodec("auto").name == BACKENDS[0]
+
+    with pytest.raises(ValueError):
+        getCodec("yaml")
+
+    for name in set(jsonCodec.BACKEND_ORDER) - set(BACKENDS):
+        with pytest.raises(ImportError):
+            getCodec(name)
+
+
+def test_codecJSONResponse():
+    '''
+    Test FastAPI response class renders compact JSON through codec
+    '''
+    from main import CodecJSONResponse
+
+    response = CodecJSONResponse({"status": "ok", "count": 2})
+
+    assert response.body == b'{"status":"ok","count":2}'
+    assert response.headers["content-type"] == "application/json"
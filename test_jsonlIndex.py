@@ -0,0 +1,134 @@
+import json
+import os
+import tempfile
+import pytest
+from jsonlIndex import JsonlIndex, iterJsonlRange, INDEX_SUFFIX
+
+
+@pytest.fixture
+def jsonlFile():
+    '''
+    JSON Lines file of 100 records with a blank line, removed with its index afterwards
+    '''
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.jsonl', delete=False) as f:
+        for i in range(100):
+            f.write(json.dumps({"id": i, "pad": "x" * (i % 7)}) + "\n")
+            if i == 50:
+                f.write("\n")
+        temp_file = f.name
+
+    yield temp_file
+
+    for path in (temp_file, temp_file + INDEX_SUFFIX):
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+def test_randomAccessByRecordNumber(jsonlFile):
+    '''
+    Test index maps record numbers to records, skipping blank lines
+    '''
+    with JsonlIndex(jsonlFile) as index:
+        assert len(index) == 100
+        assert index.record(0)["id"] == 0
+        assert index.record(51)["id"] == 51
+        assert index.record(-1)["id"] == 99
+        assert [r["id"] for r in index.records(40, 45)] == [40, 41, 42, 43, 44]
+        assert [len(c) for c in index.chunks(90, chunk_size=4)] == [4, 4, 2]
+
+        with pytest.raises(IndexError):
+            index.record(100)
+
+
+def test_indexCachedAndExtendedOnAppend(jsonlFile):
+    '''
+    Test cached index is reused and extended when file is appended to
+    '''
+    JsonlIndex(jsonlFile).close()
+    assert os.path.exists(jsonlFile + INDEX_SUFFIX)
+
+    with open(jsonlFile, 'a') as f:
+        f.write(json.dumps({"id": 100}) + "\n" + '{"id": 101')
+
+    with JsonlIndex(jsonlFile) as index:
+        assert len(index) == 101
+        assert index.record(100) == {"id": 100}
+        resume_offset = index.indexed_bytes
+
+    with open(jsonlFile, 'a') as f:
+        f.write("}\n")
+
+    with JsonlIndex(jsonlFile) as index:
+        # Resume from a checkpoint saved before the last append
+        start = index.recordAt(resume_offset)
+        assert [r["id"] for r in index.records(start)] == [101]
+
+
+def test_indexRebuiltWhenFileRewritten(jsonlFile):
+    '''
+    Test stale index is discarded when file shrinks
+    '''
+    JsonlIndex(jsonlFile).close()
+
+    with open(jsonlFile, 'w') as f:
+        f.write('{"id": "a"}\n{"id": "b"}\n')
+
+    with JsonlIndex(jsonlFile) as index:
+        assert [r["id"] for r in index.records()] == ["a", "b"]
+
+
+def test_shardsCoverAllRecordsOnce(jsonlFile):
+    '''
+    Test byte-balanced shards are contiguous and byte ranges parse to same records
+    '''
+    with JsonlIndex(jsonlFile) as index:
+        shards = index.shards(4)
+        assert len(shards) == 4
+        assert shards[0][0] == 0 and shards[-1][1] == 100
+        assert all(a[1] == b[0] for a, b in zip(shards, shards[1:]))
+
+        ids = []
+        for start, stop in shards:
+            byte_start, byte_end = index.byteRange(start, stop)
+            ids.extend(r["id"] for r in iterJsonlRange(jsonlFile, byte_start, byte_end))
+
+    assert ids == list(range(100))
+
+
+def test_unalignedByteRangesCoverEachRecordOnce(jsonlFile):
+    '''
+    Test arbitrary byte splits without index still yield every record exactly once
+    '''
+    size = os.path.getsize(jsonlFile)
+    bounds = [0, 17, 333, 334, size // 2, size - 3, size]
+
+    ids = []
+    for start, end in zip(bounds, bounds[1:]):
+        ids.extend(r["id"] for r in iterJsonlRange(jsonlFile, start, end))
+
+    assert ids == list(range(100))
+
+
+def test_emptyFile():
+    '''
+    Test empty file gives empty index and no records
+    '''
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "empty.jsonl")
+        open(path, 'w').close()
+
+        with JsonlIndex(path) as index:
+            assert len(index) == 0
+            assert index.shards(3) == []
+        assert list(iterJsonlRange(path)) == []
+
+
+def test_malformedLineReported(jsonlFile):
+    '''
+    Test malformed line raises with its byte position instead of merging into neighbours
+    '''
+    with open(jsonlFile, 'a') as f:
+        f.write('[1\n2]\n3, 4\n')
+
+    with pytest.raises(ValueError, match="Invalid JSON at byte"):
+        list(iterJsonlRange(jsonlFile))
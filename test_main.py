@@ -1,5 +1,17 @@
 import pytest
+import json
+import os
+import tempfile
+import time
+import yaml
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 from main import app
+import database
+from database import getDb, getAsyncDb, createEngine
+from database import Base
+from models import DataSource
 from fastapi.testclient import TestClient
 
 
@@ -12,4 +24,170 @@ def test_checkHealth():
     '''
     response = client.get("/health")
     assert response.status_code == 200
-    assert response.json()["status"] == "healthy"
\ No newline at end of file
+    assert response.json()["status"] == "healthy"
+
+@pytest.fixture
+def pipelineApi(monkeypatch):
+    '''
+    Register file DataSource in SQLite and point API at temporary pipeline config
+    '''
+    test_engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=test_engine)
+    TestingSession = sessionmaker(bind=test_engine)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        data_path = os.path.join(temp_dir, "orders.jsonl")
+        with open(data_path, 'w') as f:
+            for i in range(30):
+                f.write(json.dumps({"id": str(i % 25), "amount": str(i)}) + "\n")
+
+        config_path = os.path.join(temp_dir, "pipelines.yaml")
+        with open(config_path, 'w') as f:
+            yaml.dump({"PIPELINES": {"orders": {
+                "source": "orders_file",
+                "schema": {"id": "integer", "amount": "float"},
+                "dedupe_keys": ["id"],
+                "features": [{"type": "categorize", "field": "amount", "bins": [10]}],
+                "profile": True,
+                "chunk_size": 7
+            }}}, f)
+
+        session = TestingSession()
+        session.add(DataSource(name="orders_file", source_type="file", endpoint=data_path))
+        session.commit()
+        session.close()
+
+        def overrideSession():
+            session = TestingSession()
+            try:
+                yield session
+            finally:
+                session.close()
+
+        app.dependency_overrides[getDb] = overrideSession
+        monkeypatch.setattr("main.PIPELINE_CONFIG_PATH", config_path)
+        monkeypatch.setattr("main.getEngine", lambda: test_engine)
+
+        yield
+
+        app.dependency_overrides.clear()
+
+
+def test_startPipelineRun(pipelineApi):
+    '''
+    Test starting background run and polling it until per-stage progress is complete
+    '''
+    response = client.post("/pipelines/orders/runs")
+    assert response.status_code == 202
+    run_id = response.json()["id"]
+
+    for _ in range(50):
+        run = client.get(f"/runs/{run_id}").json()
+        if run["status"] in ("succeeded", "failed"):
+            break
+        time.sleep(0.05)
+
+    assert run["status"] == "succeeded"
+    stages = {stage["name"]: stage for stage in run["stages"]}
+    assert stages["load"]["records_out"] == 30
+    assert stages["dedupe"]["duplicates"] == 5
+
+
+def test_getSourceProfile(pipelineApi):
+    '''
+    Test profile stored by a pipeline run is served per data source with quantile bins
+    '''
+    assert client.get("/sources/1/profile").status_code == 404
+    assert client.get("/sources/99/profile").status_code == 404
+
+    run_id = client.post("/pipelines/orders/runs").json()["id"]
+    for _ in range(50):
+        if client.get(f"/runs/{run_id}").json()["status"] in ("succeeded", "failed"):
+            break
+        time.sleep(0.05)
+
+    response = client.get("/sources/1/profile", params={"bins": 2})
+    assert response.status_code == 200
+
+    profile = response.json()
+    assert profile["records"] == 25
+    assert profile["columns"]["id"]["distinct"] == 25
+    assert profile["columns"]["amount"]["min"] == 0.0
+    assert profile["columns"]["amount"]["bins"] == [12.0]
+    assert profile["columns"]["amount_category"]["null_rate"] == 0.0
+
+
+def test_startPipelineRunUnknown(pipelineApi):
+    '''
+    Test unknown pipeline and unknown run ids return 404
+    '''
+    assert client.post("/pipelines/missing/runs").status_code == 404
+    assert client.get("/runs/doesnotexist").status_code == 404
+
+
+def test_streamPipelineRecords(pipelineApi):
+    '''
+    Test processed records stream back as NDJSON lines
+    '''
+    with client.stream("GET", "/pipelines/orders/records") as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        records = [json.loads(line) for line in response.iter_lines() if line]
+
+    assert len(records) == 25
+    assert records[12] == {"id": 12, "amount": 12.0, "amount_category": 1}
+
+
+def test_metricsEndpoint(pipelineApi, monkeypatch, tmp_path):
+    '''
+    Test metrics endpoint exposes per-stage counts of a finished pipeline and pool statistics of the created engine in Prometheus format
+    '''
+    monkeypatch.setattr(database, "_engine", createEngine(f"sqlite:///{tmp_path / 'pool.db'}"))
+
+    with client.stream("GET", "/pipelines/orders/records") as response:
+        list(response.iter_lines())
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+
+    text = response.text
+    assert 'data_pipeline_stage_records_dropped_total{stage="orders.dedupe",reason="duplicate"}' in text
+    assert 'data_pipeline_stage_latency_seconds_bucket{stage="orders.clean",le="+Inf"}' in text
+    assert 'data_pipeline_stage_records_per_second{stage="orders.load"}' in text
+    assert "data_pipeline_process_peak_rss_bytes" in text
+    assert 'data_pipeline_db_pool{engine="sync",stat="checkouts"}' in text
+
+
+def test_listDataSourcesAsync(monkeypatch):
+    '''
+    Test async endpoint reads data sources through async session dependency
+    '''
+    pytest.importorskip("aiosqlite")
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, "sources.db")
+        sync_engine = create_engine(f"sqlite:///{db_path}")
+        Base.metadata.create_all(bind=sync_engine)
+        session = sessionmaker(bind=sync_engine)()
+        session.add_all([DataSource(name="b_api", source_type="api", endpoint="https://b"), DataSource(name="a_file", source_type="file", endpoint="/a.csv")])
+        session.commit()
+        session.close()
+        sync_engine.dispose()
+
+        async_factory = async_sessionmaker(create_async_engine(f"sqlite+aiosqlite:///{db_path}"))
+
+        async def overrideAsyncSession():
+            async with async_factory() as async_session:
+                yield async_session
+
+        app.dependency_overrides[getAsyncDb] = overrideAsyncSession
+
+        try:
+            response = client.get("/sources")
+        finally:
+            app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert [source["name"] for source in response.json()] == ["a_file", "b_api"]
@@ -0,0 +1,113 @@
+import pytest
+from chunking import chunkRecords
+from dataCleaner import cleanData, removeDuplicates
+from featureEngine import normalizeNumeric
+from metrics import (
+    MetricsRegistry, REGISTRY, StageTimer, instrumentStage,
+    STAGE_RECORDS_IN, STAGE_DROPPED, STAGE_LATENCY,
+)
+
+
+def counterValue(counter, **labels):
+    return counter.value(**labels) or 0
+
+
+def test_renderPrometheusText():
+    '''
+    Test counters, gauges and histograms render in Prometheus exposition format
+    '''
+    registry = MetricsRegistry()
+    rows = registry.counter("rows_total", "Rows seen", ("stage",))
+    latency = registry.histogram("latency_seconds", "Latency", ("stage",), buckets=(0.1, 1.0))
+    registry.gauge("up", "Up").set(1)
+
+    rows.inc(5, stage="clean")
+    rows.inc(2, stage="clean")
+    latency.observe(0.05, stage="clean")
+    latency.observe(0.5, stage="clean")
+
+    text = registry.render()
+
+    assert "# TYPE rows_total counter" in text
+    assert 'rows_total{stage="clean"} 7' in text
+    assert 'latency_seconds_bucket{stage="clean",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{stage="clean",le="+Inf"} 2' in text
+    assert 'latency_seconds_count{stage="clean"} 2' in text
+    assert "up 1" in text
+
+    with pytest.raises(ValueError):
+        rows.inc(1, step="clean")
+    with pytest.raises(ValueError):
+        registry.gauge("rows_total", "Rows seen", ("stage",))
+
+
+def test_histogramQuantiles():
+    '''
+    Test quantiles are estimated from recent observations
+    '''
+    histogram = MetricsRegistry().histogram("latency_seconds", "Latency", ("stage",))
+
+    for i in range(1, 101):
+        histogram.observe(i / 100, stage="s")
+
+    quantiles = histogram.quantiles(stage="s")
+    assert quantiles[0.5] == pytest.approx(0.51)
+    assert quantiles[0.99] == pytest.approx(1.0)
+    assert histogram.quantiles(stage="other") == {}
+
+
+def test_instrumentedCleanerRecordsRejections():
+    '''
+    Test cleanData and removeDuplicates record records in, out and dropped with reason
+    '''
+    in_before = counterValue(STAGE_RECORDS_IN, stage="cleanData")
+    rejected_before = counterValue(STAGE_DROPPED, stage="cleanData", reason="rejected")
+    duplicates_before = counterValue(STAGE_DROPPED, stage="removeDuplicates", reason="duplicate")
+
+    records = [{"id": "1"}, {"id": "1"}, {"id": "x"}, {"id": "2"}]
+    cleaned = cleanData(records, {"id": "integer"})
+    removeDuplicates(cleaned, ["id"])
+
+    assert counterValue(STAGE_RECORDS_IN, stage="cleanData") - in_before == 4
+    assert counterValue(STAGE_DROPPED, stage="cleanData", reason="rejected") - rejected_before == 1
+    assert counterValue(STAGE_DROPPED, stage="removeDuplicates", reason="duplicate") - duplicates_before == 1
+
+
+def test_chunkStreamCountedOncePerChunk():
+    '''
+    Test chunk stream is recorded per chunk without double counting nested per-chunk calls
+    '''
+    def observations():
+        state = STAGE_LATENCY.value(stage="normalizeNumeric")
+        return state["count"] if state else 0
+
+    in_before = counterValue(STAGE_RECORDS_IN, stage="normalizeNumeric")
+    observations_before = observations()
+
+    records = [{"value": i} for i in range(25)]
+    chunks = list(normalizeNumeric(chunkRecords(records, 10), "value"))
+
+    assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+    assert counterValue(STAGE_RECORDS_IN, stage="normalizeNumeric") - in_before == 25
+    assert observations() - observations_before == 3
+
+
+def test_decoratorAndTimer():
+    '''
+    Test decorator with counts_input disabled and StageTimer context manager
+    '''
+    @instrumentStage("test.loader", counts_input=False)
+    def load(path):
+        return [{"id": 1}, {"id": 2}]
+
+    load("ignored.csv")
+    assert STAGE_RECORDS_IN.value(stage="test.loader") == 2
+
+    with StageTimer("test.block", records_in=10, dropped_reason="filtered") as timer:
+        timer.records_out = 7
+
+    assert STAGE_DROPPED.value(stage="test.block", reason="filtered") == 3
+
+    text = REGISTRY.render()
+    assert 'data_pipeline_stage_records_per_second{stage="test.block"}' in text
+    assert 'data_pipeline_stage_latency_quantile_seconds{stage="test.block",quantile="0.5"}' in text
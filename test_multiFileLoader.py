@@ -0,0 +1,94 @@
+import gzip
+import json
+import os
+import tempfile
+import pytest
+from concurrent.futures import ProcessPoolExecutor
+from dataLoader import loadFromFile
+from multiFileLoader import expandPaths, isMultiFileSource, iterFiles, loadFromFiles, loadFromFilesWithReport
+
+
+@pytest.fixture
+def shardDir():
+    '''
+    Directory of daily shards in mixed formats plus one corrupt shard and one unsupported file
+    '''
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for day in range(12):
+            rows = [{"day": str(day), "n": str(n)} for n in range(25)]
+            name = os.path.join(temp_dir, f"day{day:02d}")
+
+            if day % 3 == 0:
+                with open(name + ".csv", 'w') as f:
+                    f.write("day,n\n" + "".join(f"{row['day']},{row['n']}\n" for row in rows))
+            elif day % 3 == 1:
+                with gzip.open(name + ".jsonl.gz", 'wt') as f:
+                    f.write("".join(json.dumps(row) + "\n" for row in rows))
+            else:
+                with open(name + ".json", 'w') as f:
+                    json.dump(rows, f)
+
+        with open(os.path.join(temp_dir, "day99.jsonl"), 'w') as f:
+            f.write('{"day": "99", "n": "0"}\n{broken\n')
+        with open(os.path.join(temp_dir, "notes.txt"), 'w') as f:
+            f.write("not data")
+
+        yield temp_dir
+
+
+def serialRecords(paths):
+    return [record for path in paths for record in loadFromFile(path)]
+
+
+def test_expandPaths(shardDir):
+    '''
+    Test directories list supported files sorted, globs expand sorted and plain paths pass through once
+    '''
+    paths = expandPaths(shardDir)
+    missing = os.path.join(shardDir, "missing.csv")
+
+    assert len(paths) == 13
+    assert paths == sorted(paths)
+    assert not any(path.endswith(".txt") for path in paths)
+    assert expandPaths(os.path.join(shardDir, "*.csv")) == [p for p in paths if p.endswith(".csv")]
+    assert expandPaths([paths[0], missing, paths[0]]) == [paths[0], missing]
+    assert isMultiFileSource(shardDir) and isMultiFileSource("drops/*.csv") and not isMultiFileSource(paths[0])
+
+
+def test_loadFromFilesOrderedWithReport(shardDir):
+    '''
+    Test concurrent load keeps path order and reports the corrupt file without dropping the others
+    '''
+    paths = expandPaths(shardDir)
+    records, results = loadFromFilesWithReport(shardDir, max_workers=4)
+
+    assert records == serialRecords(paths[:12])
+    assert [result["path"] for result in results] == paths
+    assert [result["records"] for result in results] == [25] * 12 + [0]
+    assert results[-1]["error"].startswith("ValueError")
+    assert all(result["error"] is None for result in results[:12])
+
+
+def test_iterFilesUnorderedAndMissing(shardDir):
+    '''
+    Test completion-order batches hold the same records and missing files are reported, not raised
+    '''
+    results = []
+    pattern = os.path.join(shardDir, "day0*")
+    chunks = list(iterFiles([pattern, os.path.join(shardDir, "gone.csv")], chunk_size=10, ordered=False, results=results))
+
+    assert all(len(chunk) <= 10 for chunk in chunks)
+    assert sorted((r["day"], r["n"]) for chunk in chunks for r in chunk) == sorted((r["day"], r["n"]) for r in serialRecords(expandPaths(pattern)))
+    assert [r["error"].split(":")[0] for r in results if r["error"]] == ["FileNotFoundError"]
+    assert list(iterFiles(os.path.join(shardDir, "*.parquet"))) == []
+
+
+def test_loadFromFilesProcessPool(shardDir):
+    '''
+    Test process pool parses files in workers and matches thread pool output
+    '''
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        records = loadFromFiles(os.path.join(shardDir, "*.csv"), processes=True, executor=executor)
+
+    assert records == loadFromFiles(os.path.join(shardDir, "*.csv"))
+    assert len(records) == 4 * 25
@@ -0,0 +1,96 @@
+import random
+import pytest
+from dataCleaner import removeNearDuplicates, findNearDuplicateClusters
+from nearDuplicates import NearDuplicateDetector, chooseBands, normalizeText
+
+
+PRODUCTS = [
+    {"id": 1, "title": "Stainless Steel Water Bottle 750ml", "vendor": "Acme"},
+    {"id": 2, "title": "stainless  steel water bottle 750ML ", "vendor": "ACME"},
+    {"id": 3, "title": "Wireless Optical Mouse, Black", "vendor": "Globex"},
+    {"id": 4, "title": "Stainless Steel Water Bottle 750ml", "vendor": "Acme Inc"},
+    {"id": 5, "title": "Ceramic Coffee Mug 350ml", "vendor": "Initech"},
+]
+
+
+def test_normalizeTextIgnoresCasingAndWhitespace():
+    '''
+    Test casing and whitespace differences normalize to the same text and blank fields to empty text
+    '''
+    assert normalizeText(PRODUCTS[0], ["title", "vendor"]) == normalizeText(PRODUCTS[1], ["title", "vendor"])
+    assert normalizeText({"title": " ", "vendor": None}, ["title", "vendor"]) == ""
+
+
+def test_removeNearDuplicatesKeepsRepresentatives():
+    '''
+    Test near-duplicates differing in whitespace, casing or one field are removed keeping first occurrence
+    '''
+    result = removeNearDuplicates(PRODUCTS, ["title", "vendor"], threshold=0.7)
+
+    assert [record["id"] for record in result] == [1, 3, 5]
+
+
+def test_removeNearDuplicatesChunkStream():
+    '''
+    Test near-duplicates are removed across batch boundaries and records with blank fields are kept
+    '''
+    chunks = iter([PRODUCTS[:2], PRODUCTS[2:] + [{"id": 6, "title": None}, {"id": 7, "title": None}]])
+
+    result = removeNearDuplicates(chunks, ["title"])
+
+    assert not isinstance(result, list)
+    assert [[record["id"] for record in chunk] for chunk in result] == [[1], [3, 5, 6, 7]]
+
+
+def test_findNearDuplicateClusters():
+    '''
+    Test clusters report representative row and all member rows
+    '''
+    clusters = findNearDuplicateClusters(PRODUCTS, ["title", "vendor"], threshold=0.7)
+
+    assert clusters == [{"representative": 0, "rows": [0, 1, 3]}]
+
+
+def test_pythonSignaturesMatchNumpy():
+    '''
+    Test pure Python fallback produces the same signatures as the vectorised NumPy path
+    '''
+    pytest.importorskip("numpy")
+    detector = NearDuplicateDetector(["title", "vendor"])
+    fallback = NearDuplicateDetector(["title", "vendor"])
+    fallback._np = None
+
+    assert detector.signatures(PRODUCTS) == fallback.signatures(PRODUCTS)
+    assert detector.similarity(*detector.signatures(PRODUCTS[:2])) == 1.0
+
+
+def test_chooseBandsTracksThreshold():
+    '''
+    Test chosen bands put the LSH similarity cutoff near the requested threshold
+    '''
+    for threshold in (0.5, 0.8, 0.9):
+        bands, rows = chooseBands(128, threshold)
+        assert bands * rows <= 128
+        assert abs((1 / bands) ** (1 / rows) - threshold) < 0.1
+
+
+def test_detectorComparesOnlyCandidates():
+    '''
+    Test distinct records trigger few comparisons while every planted near-duplicate is found
+    '''
+    rng = random.Random(7)
+    alphabet = "abcdefghijklmnopqrstuvwxyz"
+    records = []
+
+    for i in range(3000):
+        title = "".join(rng.choice(alphabet) for _ in range(40))
+        records.append({"title": title})
+        if i % 10 == 0:
+            records.append({"title": title.upper() + "  "})
+
+    detector = NearDuplicateDetector(["title"])
+    representatives = detector.filter(records)
+
+    assert len(representatives) == 3000
+    assert detector.duplicates_removed == 300
+    assert detector.comparisons < len(records)
@@ -0,0 +1,89 @@
+import copy
+import pytest
+from concurrent.futures import ProcessPoolExecutor
+from dataCleaner import cleanDataWithReport, removeDuplicates
+from featureEngine import applyFeatures
+from parallel import parallelCleanDataWithReport, parallelRemoveDuplicates, parallelApplyFeatures, mergeRanges
+
+
+SCHEMA = {"id": "integer", "group": "string", "value": "float"}
+RECORDS = [{"id": str(i), "group": f"g{i % 7}", "value": "bad" if i % 13 == 0 else str(i * 1.5)} for i in range(500)]
+FEATURES = [
+    {"type": "normalize", "field": "value"},
+    {"type": "categorize", "field": "value", "bins": [100, 300]},
+    {"type": "ratio", "numerator": "value", "denominator": "id", "name": "value_per_id"}
+]
+
+
+@pytest.fixture(scope="module")
+def executor():
+    '''
+    Shared two-worker process pool for parallel tests
+    '''
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        yield pool
+
+
+def test_parallelCleanDataWithReport(executor):
+    '''
+    Test parallel cleaning matches serial output order and merged rejection rows
+    '''
+    expected = cleanDataWithReport(RECORDS, SCHEMA)
+    result = parallelCleanDataWithReport(RECORDS, SCHEMA, chunk_size=60, executor=executor)
+
+    assert result == expected
+    assert len(result[1]) == 39
+
+
+def test_parallelRemoveDuplicates(executor):
+    '''
+    Test two-phase dedupe keeps first occurrence across chunk boundaries
+    '''
+    result = parallelRemoveDuplicates(RECORDS, ["group"], chunk_size=3, executor=executor)
+
+    assert result == removeDuplicates(list(RECORDS), ["group"])
+    assert [r["id"] for r in result] == [str(i) for i in range(7)]
+
+
+def test_parallelRemoveDuplicatesChunkStream(executor):
+    '''
+    Test two-phase dedupe accepts chunk streams
+    '''
+    chunks = iter([RECORDS[:200], RECORDS[200:]])
+
+    assert parallelRemoveDuplicates(chunks, ["group"], executor=executor) == RECORDS[:7]
+
+
+def test_parallelApplyFeaturesGlobalRange(executor):
+    '''
+    Test normalization across chunks uses global min and max like serial path
+    '''
+    cleaned, _ = cleanDataWithReport(RECORDS, SCHEMA)
+    expected = applyFeatures(copy.deepcopy(cleaned), FEATURES)
+
+    assert parallelApplyFeatures(cleaned, FEATURES, chunk_size=50, executor=executor) == expected
+
+
+def test_parallelApplyFeaturesDerivedField(executor):
+    '''
+    Test normalize on a ratio output uses its global range and normalize on a fitted output is rejected
+    '''
+    cleaned, _ = cleanDataWithReport(RECORDS, SCHEMA)
+    specs = FEATURES + [{"type": "normalize", "field": "value_per_id"}]
+    expected = applyFeatures(copy.deepcopy(cleaned), specs)
+    result = parallelApplyFeatures(copy.deepcopy(cleaned), specs, chunk_size=50, executor=executor)
+
+    assert result == expected
+    assert all("value_per_id_normalized" in r for r in result)
+
+    with pytest.raises(ValueError):
+        parallelApplyFeatures(cleaned, specs + [{"type": "normalize", "field": "value_normalized"}], chunk_size=50, executor=executor)
+
+
+def test_mergeRanges():
+    '''
+    Test per-chunk ranges reduce to global bounds and empty fields stay None
+    '''
+    merged = mergeRanges([{"a": (1, 5), "b": None}, {"a": (-2, 3), "b": None}])
+
+    assert merged == {"a": (-2, 5), "b": None}
@@ -0,0 +1,345 @@
+import json
+import os
+import tempfile
+import time
+import pytest
+import yaml
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+from columnarStore import ColumnarReader
+from database import Base
+from models import DataSource
+from pipeline import Pipeline, PipelineStage, PipelineError, buildPipeline, loadPipelineConfig
+from pipelineRuns import RunRegistry
+
+
+PIPELINE_CONFIG = {
+    "source": "orders_file",
+    "schema": {"id": "integer", "amount": "float", "qty": "integer"},
+    "required_fields": ["id"],
+    "dedupe_keys": ["id"],
+    "features": [
+        {"type": "categorize", "field": "amount", "bins": [50]},
+        {"type": "ratio", "numerator": "amount", "denominator": "qty", "name": "unit_price"}
+    ],
+    "sink": {"table": "orders_clean"},
+    "chunk_size": 10,
+    "queue_size": 2
+}
+
+
+@pytest.fixture
+def ordersFile():
+    '''
+    JSON Lines file with duplicates and one invalid record
+    '''
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.jsonl', delete=False) as f:
+        for i in range(45):
+            f.write(json.dumps({"id": str(i % 40), "amount": str(i * 2.5), "qty": str(i % 3)}) + "\n")
+        f.write(json.dumps({"id": "", "amount": "1", "qty": "1"}) + "\n")
+        temp_file = f.name
+
+    yield temp_file
+    os.unlink(temp_file)
+
+
+def test_buildPipelineRunsAllStages(ordersFile):
+    '''
+    Test configured pipeline loads, cleans, dedupes, adds features and writes to sink
+    '''
+    # Single shared connection so the sink thread sees the same in-memory database
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    source = DataSource(name="orders_file", source_type="file", endpoint=ordersFile)
+
+    pipeline = buildPipeline(PIPELINE_CONFIG, source, engine)
+    progress = pipeline.run()
+
+    stages = {stage["name"]: stage for stage in progress["stages"]}
+    assert [stage["name"] for stage in progress["stages"]] == ["load", "clean", "dedupe", "features", "sink"]
+    assert stages["load"]["records_out"] == 46
+    assert stages["clean"]["rejected"] == 1
+    assert stages["dedupe"]["duplicates"] == 5
+    assert stages["sink"]["records_out"] == 40
+    assert all(stage["status"] == "done" for stage in stages.values())
+
+    with engine.connect() as connection:
+        row = connection.execute(text("SELECT amount_category, unit_price FROM orders_clean WHERE id = 22")).one()
+    assert tuple(row) == (1, 55.0)
+
+
+def test_buildPipelineColumnarOutput(ordersFile):
+    '''
+    Test output section writes processed records to columnar file typed by schema and features
+    '''
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "orders.col")
+        config = {**PIPELINE_CONFIG, "sink": None, "output": {"path": path, "compression": {"default": "zlib", "id": "none"}}}
+        source = DataSource(name="orders_file", source_type="file", endpoint=ordersFile)
+
+        progress = buildPipeline(config, source).run()
+        reader = ColumnarReader(path)
+
+        assert progress["stages"][-1]["name"] == "output"
+        assert reader.num_rows == 40
+        assert reader.column_types["unit_price"] == "float"
+        assert reader.readColumns(["id"])["id"] == list(range(40))
+
+
+def collectRecords(config, source):
+    results = []
+    pipeline = buildPipeline(config, source)
+    pipeline.stages.append(PipelineStage("collect", lambda chunk: results.extend(chunk) or chunk))
+    pipeline.run()
+    return results
+
+
+def test_buildPipelineFeatureStateAcrossRuns(ordersFile):
+    '''
+    Test features fitted by one run are applied to every chunk of the next, and state built from other specs is refit or rejected
+    '''
+    with tempfile.TemporaryDirectory() as temp_dir:
+        state_path = os.path.join(temp_dir, "features.json")
+        config = {**PIPELINE_CONFIG, "sink": None, "features": [{"type": "normalize", "field": "amount"}], "feature_state": state_path}
+        source = DataSource(name="orders_file", source_type="file", endpoint=ordersFile)
+
+        first = collectRecords(config, source)
+        assert all("amount_normalized" not in record for record in first)
+
+        # Deduplicated amounts span 0 to 97.5, fitted on the records that reached the features stage
+        second = collectRecords(config, source)
+        assert all(record["amount_normalized"] == round(record["amount"] / 97.5, 4) for record in second)
+
+        other = {**config, "features": [{"type": "normalize", "field": "qty"}]}
+        assert all("qty_normalized" not in record for record in collectRecords(other, source))
+
+        with pytest.raises(ValueError):
+            buildPipeline({**config, "fit_features": False}, source)
+
+
+def test_buildPipelinePrefitFeatures(ordersFile):
+    '''
+    Test prefit reads the source first so every chunk is normalized with bounds of the whole cleaned source, and unfitted state is rejected when fitting is off
+    '''
+    config = {**PIPELINE_CONFIG, "sink": None, "features": [{"type": "normalize", "field": "amount"}], "fit_features": "prefit"}
+    source = DataSource(name="orders_file", source_type="file", endpoint=ordersFile)
+
+    # Cleaned source amounts span 0 to 110, the first chunk alone only reaches 22.5
+    results = collectRecords(config, source)
+    assert all(record["amount_normalized"] == round(record["amount"] / 110, 4) for record in results)
+
+    with pytest.raises(ValueError):
+        buildPipeline({**config, "fit_features": False}, source)
+
+
+def test_buildPipelineReadOnly(ordersFile):
+    '''
+    Test read-only pipeline streams transformed records without writing output, feature state or sink rows
+    '''
+    with tempfile.TemporaryDirectory() as temp_dir:
+        state_path = os.path.join(temp_dir, "features.json")
+        output_path = os.path.join(temp_dir, "orders.col")
+        config = {**PIPELINE_CONFIG, "features": [{"type": "normalize", "field": "amount"}], "feature_state": state_path, "output": {"path": output_path}}
+        source = DataSource(name="orders_file", source_type="file", endpoint=ordersFile)
+        collectRecords({**config, "output": None}, source)
+        saved = os.path.getmtime(state_path)
+
+        engine = create_engine("sqlite://")
+        pipeline = buildPipeline(config, source, engine, read_only=True)
+        assert [stage.name for stage in pipeline.stages] == ["clean", "dedupe", "features"]
+
+        records = [record for chunk in pipeline.stream() for record in chunk]
+        assert all(record["amount_normalized"] == round(record["amount"] / 97.5, 4) for record in records)
+        assert os.listdir(temp_dir) == ["features.json"]
+        assert os.path.getmtime(state_path) == saved
+        assert not inspect(engine).get_table_names()
+
+
+def test_buildPipelineFetchesAPIWhenRun(stubServer):
+    '''
+    Test non-paginated API source is fetched by the running pipeline, not while it is built
+    '''
+    server = stubServer(lambda path, query, headers: (200, {}, [{"id": i} for i in range(25)]))
+    source = DataSource(name="orders_api", source_type="api", endpoint=server.url)
+
+    pipeline = buildPipeline({"schema": {"id": "integer"}, "chunk_size": 10}, source)
+    assert server.requests == []
+
+    progress = pipeline.run()
+    assert len(server.requests) == 1
+    assert progress["stages"][1]["records_out"] == 25
+
+
+def test_buildPipelineNearDedupe():
+    '''
+    Test near_dedupe section adds stage dropping records whose fields differ only in casing or whitespace
+    '''
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.jsonl', delete=False) as f:
+        for i, name in enumerate(["Acme Water Bottle", "acme  water bottle", "Globex Mouse", "ACME WATER BOTTLE "]):
+            f.write(json.dumps({"id": i, "name": name}) + "\n")
+
+    try:
+        config = {"schema": {"id": "integer", "name": "string"}, "near_dedupe": {"fields": ["name"], "threshold": 0.9}}
+        source = DataSource(name="products", source_type="file", endpoint=f.name)
+        results = []
+
+        pipeline = buildPipeline(config, source)
+        pipeline.stages.append(PipelineStage("collect", lambda chunk: results.extend(chunk) or chunk))
+        progress = pipeline.run()
+    finally:
+        os.unlink(f.name)
+
+    stages = {stage["name"]: stage for stage in progress["stages"]}
+    assert stages["near_dedupe"]["near_duplicates"] == 2
+    assert [record["id"] for record in results] == [0, 2]
+
+
+@pytest.mark.parametrize("dedupe_keys", [["id"], None])
+def test_buildPipelineIncrementalNearDedupe(dedupe_keys):
+    '''
+    Test incremental run with near_dedupe commits change hashes and checkpoint, with and without change keys
+    '''
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "products.jsonl")
+        with open(path, 'w') as f:
+            for i, name in enumerate(["Acme Water Bottle", "acme  water bottle", "Globex Mouse"]):
+                f.write(json.dumps({"id": i, "name": name}) + "\n")
+
+        engine = create_engine(f"sqlite:///{os.path.join(temp_dir, 'pipeline.db')}")
+        Base.metadata.create_all(bind=engine)
+
+        with Session(bind=engine) as session:
+            source = DataSource(name="products", source_type="file", endpoint=path)
+            session.add(source)
+            session.commit()
+
+            config = {"schema": {"id": "integer", "name": "string"}, "dedupe_keys": dedupe_keys, "incremental": True, "near_dedupe": {"fields": ["name"], "threshold": 0.9}}
+            progress = buildPipeline(config, source, engine).run()
+
+        stages = {stage["name"]: stage for stage in progress["stages"]}
+        assert stages["near_dedupe"]["near_duplicates"] == 1
+        assert stages.get("changes", {}).get("new") == (3 if dedupe_keys else None)
+
+        with engine.connect() as connection:
+            assert connection.execute(text("SELECT COUNT(*) FROM record_hashes")).scalar() == (3 if dedupe_keys else 0)
+            assert connection.execute(text("SELECT last_offset FROM data_sources")).scalar() == os.path.getsize(path)
+
+        engine.dispose()
+
+
+def test_pipelineBackpressure():
+    '''
+    Test slow consumer keeps source from running ahead of bounded queues
+    '''
+    produced = []
+
+    def source():
+        for i in range(50):
+            produced.append(i)
+            yield [i]
+
+    pipeline = Pipeline(source(), [PipelineStage("identity", lambda chunk: chunk)], queue_size=2)
+    stream = pipeline.stream()
+
+    assert next(stream) == [0]
+    time.sleep(0.3)
+    # Two queues of two chunks, one chunk held by each thread and the one consumed
+    assert len(produced) <= 8
+
+    stream.close()
+    assert pipeline.source_stage.status == "stopped"
+
+
+def test_pipelineStageFailure():
+    '''
+    Test stage exception stops pipeline and is raised with stage name
+    '''
+    def explode(chunk):
+        raise ValueError("bad chunk")
+
+    pipeline = Pipeline(iter([[1], [2]]), [PipelineStage("explode", explode)])
+
+    with pytest.raises(PipelineError, match="explode"):
+        pipeline.run()
+
+    assert pipeline.stages[0].status == "failed"
+
+
+def test_runRegistryEvictsFinishedRuns():
+    '''
+    Test only the most recently used finished runs are kept
+    '''
+    registry = RunRegistry(max_runs=1, max_finished=2)
+    runs = []
+
+    try:
+        for _ in range(3):
+            runs.append(registry.submit("numbers", Pipeline(iter([[1]]), [])))
+            runs[-1].future.result()
+            if len(runs) == 2:
+                registry.get(runs[0].id)
+
+        registry.submit("numbers", Pipeline(iter([[1]]), [])).future.result()
+    finally:
+        registry.shutdown()
+
+    assert registry.get(runs[0].id) is runs[0]
+    assert registry.get(runs[1].id) is None
+    assert registry.get(runs[2].id) is runs[2]
+    assert len(registry.runs) == 3
+
+
+def test_loadPipelineConfig():
+    '''
+    Test pipeline definition is read from PIPELINES section of YAML config
+    '''
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.yaml', delete=False) as f:
+        yaml.dump({"DATABASE_URL": "sqlite://", "PIPELINES": {"orders": PIPELINE_CONFIG}}, f)
+        temp_file = f.name
+
+    try:
+        assert loadPipelineConfig("orders", temp_file)["dedupe_keys"] == ["id"]
+        with pytest.raises(ValueError):
+            loadPipelineConfig("missing", temp_file)
+    finally:
+        os.unlink(temp_file)
+
+
+def test_buildPipelineGlobSource():
+    '''
+    Test glob file source reads every matching file concurrently and reports each file
+    '''
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for i in range(3):
+            with open(os.path.join(temp_dir, f"part{i}.jsonl"), 'w') as f:
+                f.write("".join(json.dumps({"id": str(i * 10 + n), "amount": "1", "qty": "1"}) + "\n" for n in range(10)))
+        with open(os.path.join(temp_dir, "part9.jsonl"), 'w') as f:
+            f.write("{broken\n")
+
+        config = {key: value for key, value in PIPELINE_CONFIG.items() if key != "sink"}
+        source = DataSource(name="orders_file", source_type="file", endpoint=os.path.join(temp_dir, "part*.jsonl"))
+        pipeline = buildPipeline({**config, "max_workers": 2}, source)
+        progress = pipeline.run()
+
+    stages = {stage["name"]: stage for stage in progress["stages"]}
+    assert stages["load"]["records_out"] == 30
+    assert [result["records"] for result in pipeline.file_results] == [10, 10, 10, 0]
+    assert pipeline.file_results[-1]["error"] is not None
+
+
+def test_buildPipelineCompactRows(ordersFile):
+    '''
+    Test compact_rows pipeline carries slotted rows through every stage and writes the same sink rows as dicts
+    '''
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    source = DataSource(name="orders_file", source_type="file", endpoint=ordersFile)
+    config = {**PIPELINE_CONFIG, "compact_rows": True}
+
+    chunks = list(buildPipeline({**config, "sink": None}, source).stream())
+    pipeline = buildPipeline(config, source, engine)
+    pipeline.run()
+
+    assert all(not isinstance(record, dict) and "unit_price" in record for chunk in chunks for record in chunk)
+    with engine.connect() as connection:
+        row = connection.execute(text("SELECT amount_category, unit_price FROM orders_clean WHERE id = 22")).one()
+    assert tuple(row) == (1, 55.0)
@@ -0,0 +1,161 @@
+import json
+import random
+import pytest
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database import Base
+from featureEngine import categorizeField
+from featureState import FeaturePipeline
+from models import DataSource
+from parallel import parallelProfile
+from profiling import KLLSketch, HyperLogLog, profileRecords, saveSourceProfile, loadSourceProfile
+
+
+RNG = random.Random(3)
+VALUES = [RNG.gauss(100, 15) for _ in range(50000)]
+RECORDS = [
+    {"id": i, "amount": value, "status": None if i % 10 == 0 else ("" if i % 10 == 1 else f"s{i % 40}")}
+    for i, value in enumerate(VALUES)
+]
+
+
+def exactQuantile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def test_kllSketchQuantilesWithinRankError():
+    '''
+    Test sketch quantiles land within one percent rank of exact ones while holding a bounded number of items
+    '''
+    sketch = KLLSketch()
+    for start in range(0, len(VALUES), 1000):
+        sketch.update(VALUES[start:start + 1000])
+
+    ordered = sorted(VALUES)
+
+    for fraction in (0.05, 0.25, 0.5, 0.75, 0.95):
+        estimate = sketch.quantile(fraction)
+        rank = sum(1 for value in ordered if value <= estimate) / len(ordered)
+        assert abs(rank - fraction) < 0.01
+
+    assert sketch.quantiles([0, 1]) == [min(VALUES), max(VALUES)]
+    assert sum(len(items) for items in sketch.compactors) < 3 * sketch.k
+
+
+def test_kllSketchMergeMatchesSinglePass():
+    '''
+    Test merging sketches of separate chunks estimates the quantiles of their concatenation
+    '''
+    merged = KLLSketch()
+
+    for start in range(0, len(VALUES), 5000):
+        merged.merge(KLLSketch().update(VALUES[start:start + 5000]))
+
+    assert merged.count == len(VALUES)
+    assert abs(merged.quantile(0.5) - exactQuantile(VALUES, 0.5)) < 1.0
+
+    restored = KLLSketch.fromDict(json.loads(json.dumps(merged.toDict())))
+    assert restored.quantile(0.5) == merged.quantile(0.5)
+
+
+def test_hyperLogLogCountAndMerge():
+    '''
+    Test distinct estimates stay within a few percent and merging counts the union
+    '''
+    first = HyperLogLog().update(range(30000))
+    second = HyperLogLog().update(range(20000, 50000))
+
+    assert abs(first.count() - 30000) / 30000 < 0.05
+    assert HyperLogLog().update(["a", "b", "a", "c"]).count() == 3
+
+    first.merge(second)
+    assert abs(first.count() - 50000) / 50000 < 0.05
+
+    with pytest.raises(ValueError):
+        first.merge(HyperLogLog(precision=10))
+
+
+def test_dataProfileColumnStatistics():
+    '''
+    Test profile reports null and empty rates, distinct counts and min and max per column
+    '''
+    profile = profileRecords(iter([RECORDS[:20000], RECORDS[20000:] + [{"id": -1, "extra": "late"}]]))
+    summary = profile.summary(n_bins=4)
+    status = summary["columns"]["status"]
+
+    assert summary["records"] == 50001
+    assert status["null_rate"] == pytest.approx(5001 / 50001)
+    assert status["empty_rate"] == pytest.approx(5000 / 50001)
+    assert abs(status["distinct"] - 32) <= 1
+    assert (status["min"], status["max"]) == ("s12", "s9")
+    assert summary["columns"]["id"]["min"] == -1
+    assert summary["columns"]["extra"]["nulls"] == 50000
+    assert len(summary["columns"]["amount"]["bins"]) == 3
+
+
+def test_dataProfileMergeAndParallel():
+    '''
+    Test profiles of separate chunks merge into the profile of all records, including across processes
+    '''
+    merged = profileRecords(RECORDS[:100]).merge(profileRecords([{"other": 1}]))
+
+    assert merged.records == 101
+    assert merged.columns["id"].nulls == 1
+    assert merged.columns["other"].nulls == 100
+
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        profile = parallelProfile(RECORDS, chunk_size=10000, executor=executor)
+
+    serial = profileRecords(RECORDS)
+    assert profile.records == serial.records
+    assert profile.columns["status"].nulls == serial.columns["status"].nulls
+    assert profile.columns["status"].distinct.count() == serial.columns["status"].distinct.count()
+    assert abs(profile.columns["amount"].numbers.quantile(0.5) - exactQuantile(VALUES, 0.5)) < 1.0
+
+
+def test_categorizeFieldWithQuantileSketch():
+    '''
+    Test sketch-derived thresholds split values into roughly equal-count categories
+    '''
+    sketch = KLLSketch().update(VALUES)
+    records = categorizeField([{"amount": value} for value in VALUES], "amount", sketch, n_bins=4)
+    counts = [sum(1 for r in records if r["amount_category"] == category) for category in range(4)]
+
+    assert all(abs(count - len(VALUES) / 4) < len(VALUES) * 0.02 for count in counts)
+    assert categorizeField([{"amount": float("nan")}], "amount", [1, 2])[0]["amount_category"] == 0
+
+
+def test_quantileBinnerStateRoundTrip():
+    '''
+    Test quantile strategy fits thresholds across batches and reloads to the same bins
+    '''
+    pipeline = FeaturePipeline.fromSpecs([{"type": "categorize", "field": "amount", "strategy": "quantile", "n_bins": 4}])
+    pipeline.fit(RECORDS[start:start + 5000] for start in range(0, len(RECORDS), 5000))
+    restored = FeaturePipeline.fromDict(json.loads(json.dumps(pipeline.toDict())))
+
+    assert restored.transformers[0].bins == pipeline.transformers[0].bins
+    assert len(pipeline.transformers[0].bins) == 3
+    assert restored.transform([{"amount": 1e9}])[0]["amount_category"] == 3
+
+
+def test_saveSourceProfileMerges():
+    '''
+    Test stored profile is replaced by default and accumulated with merge
+    '''
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add(DataSource(id=1, name="orders", source_type="file", endpoint="orders.csv"))
+    session.commit()
+
+    assert loadSourceProfile(session, 1) is None
+
+    saveSourceProfile(session, 1, profileRecords(RECORDS[:10]))
+    saveSourceProfile(session, 1, profileRecords(RECORDS[10:30]), merge=True)
+    assert loadSourceProfile(session, 1).records == 30
+
+    saveSourceProfile(session, 1, profileRecords(RECORDS[:5]))
+    assert loadSourceProfile(session, 1).records == 5
+    session.close()
@@ -0,0 +1,65 @@
+import pytest
+from sqlalchemy import create_engine, select
+from recordSink import RecordSink, buildCopyBuffer
+
+
+COLUMN_TYPES = {"id": "integer", "name": "string", "score": "float", "active": "boolean"}
+
+
+def makeSink(**options):
+    '''
+    Create sink writing into fresh in-memory SQLite table
+    '''
+    engine = create_engine("sqlite:///:memory:")
+    sink = RecordSink(engine, "records", COLUMN_TYPES, **options)
+    sink.createTable()
+    return sink
+
+
+def readAll(sink):
+    '''
+    Read every row from sink table ordered by id
+    '''
+    with sink.engine.connect() as connection:
+        return [dict(row._mapping) for row in connection.execute(select(sink.table).order_by(sink.table.c.id))]
+
+
+def test_writeBatches():
+    '''
+    Test records are written in batches with one transaction each
+    '''
+    sink = makeSink(key_fields=["id"], batch_size=4)
+    records = [{"id": i, "name": f"n{i}", "score": i / 2, "active": i % 2 == 0, "extra": "ignored"} for i in range(10)]
+
+    assert sink.write(iter([records[:5], records[5:]])) == 10
+    assert sink.batches_written == 3
+    assert readAll(sink)[3] == {"id": 3, "name": "n3", "score": 1.5, "active": False}
+
+
+def test_writeUpsert():
+    '''
+    Test upsert updates existing keys and last duplicate in a batch wins
+    '''
+    sink = makeSink(key_fields=["id"], upsert=True)
+    sink.write([{"id": 1, "name": "old", "score": 1.0, "active": True}])
+    sink.write([{"id": 1, "name": "mid"}, {"id": 1, "name": "new", "score": 2.0}, {"id": 2, "name": "b"}])
+
+    rows = readAll(sink)
+    assert [(r["id"], r["name"], r["score"]) for r in rows] == [(1, "new", 2.0), (2, "b", None)]
+
+
+def test_upsertRequiresKeys():
+    '''
+    Test upsert without key fields is rejected
+    '''
+    with pytest.raises(ValueError):
+        RecordSink(create_engine("sqlite:///:memory:"), "records", COLUMN_TYPES, upsert=True)
+
+
+def test_buildCopyBuffer():
+    '''
+    Test COPY CSV buffer distinguishes NULL from empty string and escapes quotes
+    '''
+    buffer = buildCopyBuffer([{"id": 1, "name": 'say "hi"', "score": None, "active": True}, {"id": 2, "name": ""}], list(COLUMN_TYPES))
+
+    assert buffer.read() == '1,"say ""hi""",,t\n2,"",,\n'
@@ -0,0 +1,141 @@
+import os
+import tempfile
+import time
+import pytest
+from dataLoader import loadFromAPI
+from responseCache import ResponseCache, CachedResponse, cacheKey
+
+
+def etagHandler(payload, etag='"v1"'):
+    '''
+    Stub handler answering 304 when client already holds current ETag
+    '''
+    def handler(path, query, headers):
+        if headers.get("If-None-Match") == etag:
+            return 304, {"ETag": etag}, b""
+        return 200, {"ETag": etag, "Content-Type": "application/json"}, payload
+    return handler
+
+
+def test_freshResponseServedWithoutRequest(stubServer):
+    '''
+    Test second call within TTL is a cache hit and makes no request
+    '''
+    server = stubServer(etagHandler([{"id": 1}, {"id": 2}]))
+    cache = ResponseCache(ttl=60)
+
+    assert loadFromAPI(server.url + "/ref", cache=cache) == [{"id": 1}, {"id": 2}]
+    assert loadFromAPI(server.url + "/ref", cache=cache) == [{"id": 1}, {"id": 2}]
+
+    assert len(server.requests) == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_staleResponseRevalidatedWithETag(stubServer):
+    '''
+    Test expired entry sends If-None-Match and 304 is served from cache
+    '''
+    server = stubServer(etagHandler({"results": [{"id": 7}]}))
+    cache = ResponseCache(ttl=0)
+
+    assert loadFromAPI(server.url + "/ref", {"page": 1}, cache=cache) == [{"id": 7}]
+    assert loadFromAPI(server.url + "/ref", {"page": 1}, cache=cache) == [{"id": 7}]
+
+    assert server.requests[1][2].get("If-None-Match") == '"v1"'
+    assert cache.stats()["revalidations"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_lastModifiedRevalidation(stubServer):
+    '''
+    Test Last-Modified validator is sent back as If-Modified-Since
+    '''
+    stamp = "Wed, 01 May 2024 10:00:00 GMT"
+
+    def handler(path, query, headers):
+        if headers.get("If-Modified-Since") == stamp:
+            return 304, {}, b""
+        return 200, {"Last-Modified": stamp}, [{"id": 3}]
+
+    server = stubServer(handler)
+    cache = ResponseCache(ttl=0)
+
+    loadFromAPI(server.url, cache=cache)
+    assert loadFromAPI(server.url, cache=cache) == [{"id": 3}]
+    assert cache.stats()["revalidations"] == 1
+
+
+def test_changedResponseReplacesEntry(stubServer):
+    '''
+    Test new ETag from server replaces cached body
+    '''
+    state = {"etag": '"v1"', "payload": [{"id": 1}]}
+
+    def handler(path, query, headers):
+        if headers.get("If-None-Match") == state["etag"]:
+            return 304, {}, b""
+        return 200, {"ETag": state["etag"]}, state["payload"]
+
+    server = stubServer(handler)
+    cache = ResponseCache(ttl=0)
+
+    loadFromAPI(server.url, cache=cache)
+    state.update(etag='"v2"', payload=[{"id": 2}])
+
+    assert loadFromAPI(server.url, cache=cache) == [{"id": 2}]
+    assert cache.stats()["misses"] == 2
+
+
+def test_diskTierSurvivesNewCacheInstance(stubServer):
+    '''
+    Test entries written to disk are revalidated by a fresh cache using same directory
+    '''
+    server = stubServer(etagHandler([{"id": 1}]))
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        loadFromAPI(server.url, cache=ResponseCache(disk_dir=cache_dir, ttl=0))
+
+        cache = ResponseCache(disk_dir=cache_dir, ttl=0)
+        assert loadFromAPI(server.url, cache=cache) == [{"id": 1}]
+        assert cache.stats()["revalidations"] == 1
+
+
+def test_memoryBudgetEvictsLeastRecentlyUsed():
+    '''
+    Test memory tier drops least recently used entries past byte budget
+    '''
+    cache = ResponseCache(memory_bytes=25)
+    cache.put("a", CachedResponse(b"x" * 10))
+    cache.put("b", CachedResponse(b"x" * 10))
+    cache.get("a")
+    cache.put("c", CachedResponse(b"x" * 10))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.stats()["memory_bytes"] == 20
+
+
+def test_diskBudgetEvictsOldestFiles():
+    '''
+    Test disk tier stays within byte budget
+    '''
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = ResponseCache(memory_bytes=0, disk_dir=cache_dir, disk_bytes=1500)
+
+        for i in range(5):
+            cache.put(f"key{i}", CachedResponse(b"x" * 400))
+            # Distinct mtimes so eviction order is deterministic
+            os.utime(cache._diskPath(f"key{i}"), (time.time() - 100 + i, time.time() - 100 + i))
+
+        assert cache.stats()["disk_bytes"] <= 1500
+        assert cache.get("key0") is None
+        assert cache.get("key4").body == b"x" * 400
+
+
+def test_cacheKeyIgnoresParamOrder():
+    '''
+    Test cache key does not depend on query parameter order
+    '''
+    assert cacheKey("http://x/a", {"b": 2, "a": 1}) == cacheKey("http://x/a", {"a": 1, "b": 2})
+    assert cacheKey("http://x/a") == "http://x/a"
@@ -0,0 +1,78 @@
+import json
+import os
+import subprocess
+import sys
+import pytest
+
+# Generous wall-clock budgets for a fresh interpreter, override on slow CI machines
+IMPORT_BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", 3.0))
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", 1.0))
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def runFresh(code, **env):
+    '''
+    Run code in new interpreter from repository root so earlier imports in this process do not hide import costs. Returns decoded JSON printed by code.
+    '''
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=REPO_DIR,
+        env={**os.environ, **env},
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize("module, deferred", [
+    ("config", ["yaml"]),
+    ("dataLoader", ["requests", "httpx", "numpy"]),
+    ("dataCleaner", ["requests", "numpy", "sqlalchemy"]),
+    ("featureEngine", ["numpy", "sqlalchemy"]),
+    ("columnarStore", ["numpy", "pyarrow"]),
+    ("pipeline", ["yaml", "requests", "httpx", "numpy", "pyarrow"]),
+])
+def test_heavyImportsDeferred(module, deferred):
+    '''
+    Test importing module leaves optional and source-specific dependencies unloaded until first use
+    '''
+    loaded = runFresh(f"import json, sys; import {module}; print(json.dumps([name for name in {deferred!r} if name in sys.modules]))")
+
+    assert loaded == []
+
+
+def test_engineCreatedOnFirstUse():
+    '''
+    Test importing database and models opens no engine until getEngine is called
+    '''
+    state = runFresh(
+        "import json, database, models; before = database._engine is None; "
+        "engine = database.engine; print(json.dumps([before, database._engine is engine, database.SessionLocal is database.getSessionFactory()]))",
+        DATABASE_URL="sqlite://",
+    )
+
+    assert state == [True, True, True]
+
+
+def test_apiStartupBudget():
+    '''
+    Test API module imports and starts within budget when table creation is left to migrate.py
+    '''
+    timings = runFresh(
+        "import json, sys, time; start = time.perf_counter(); import main; imported = time.perf_counter() - start; "
+        "loaded = [name for name in ('yaml', 'requests', 'httpx', 'numpy') if name in sys.modules]; "
+        "from fastapi.testclient import TestClient; start = time.perf_counter(); client = TestClient(main.app); client.__enter__(); "
+        "started = time.perf_counter() - start; client.__exit__(None, None, None); import database; "
+        "print(json.dumps({'import': imported, 'startup': started, 'engine': database._engine is not None, "
+        "'loaded': loaded}))",
+        DATABASE_URL="sqlite://",
+        DB_AUTO_CREATE="false",
+    )
+
+    assert timings["import"] < IMPORT_BUDGET_SECONDS
+    assert timings["startup"] < STARTUP_BUDGET_SECONDS
+    assert timings["engine"] is False
+    assert timings["loaded"] == []